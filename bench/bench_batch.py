@@ -0,0 +1,52 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Throughput of `translate_files` against the number of worker processes.
+
+Writes a few hundred synthetic chapters to a temporary directory, and
+translates them all with 1, 2, 4, ... processes, up to the number of CPUs.
+
+    PYTHONPATH=. python bench/bench_batch.py [NFILES]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from vertex2tex.batch import translate_files
+
+PARAGRAPH = (
+    "Let $@a%(k)d, a1, ddd, an-1@$ be a sequence in $@bbZ@$, and suppose that\n"
+    "$$@sum over n from 0 to infty; an xuu%(k)d = frac 1 over 1 - x;@$$\n"
+    "for all $@abs x; < %(k)d@$. Some plain prose follows here.\n\n"
+)
+
+
+def main():
+    nfiles = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        for i in range(nfiles):
+            path = os.path.join(d, 'ch%d.tex' % i)
+            with open(path, 'w') as f:
+                f.write(''.join(PARAGRAPH % {'k': i * 100 + k} for k in range(100)))
+            paths.append(path)
+        cpus = os.cpu_count() or 1
+        jobs = 1
+        base = None
+        while True:
+            t0 = time.perf_counter()
+            for _ in translate_files(paths, jobs=jobs):
+                pass
+            t = time.perf_counter() - t0
+            base = base or t
+            print('jobs=%-3d %8.2f s   speedup %5.2f' % (jobs, t, base / t))
+            if jobs >= cpus:
+                break
+            jobs = min(2 * jobs, cpus)
+
+
+if __name__ == '__main__':
+    main()
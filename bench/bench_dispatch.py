@@ -0,0 +1,78 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Per-token cost of keyword classification in `Node.xlat`.
+
+Compares the old chain of membership tests against the tables in `config.py`
+with the single probe into `dispatch_index`, over a realistic token mix. (The index also holds the font words, which
+the chain used to leave to `fontword`.)
+
+    PYTHONPATH=. python bench/bench_dispatch.py
+"""
+
+import timeit
+
+from vertex2tex.config import *
+from vertex2tex.v2t import FONTWORD, clear_caches, specialnodes, sync_tables, tokenize, translate_snippet
+
+SNIPPETS = [
+    'a0, a1, ddd, an-1',
+    'alpha, beta, gamma',
+    'frp in bbZ',
+    'frac 2 over 3;',
+    'sum over n from 0 to infty; an',
+    'f supp n; leq abs x; plus mapsto y',
+    'x in bbR, x geq 0, lam cdot xi',
+    '&lt; a, b &gt; equ Ome',
+]
+
+TOKENS = [T for text in SNIPPETS for T in tokenize(text)]
+
+
+def classify_chain(T):
+    if T in html_exceptions: return 0
+    elif T in unarynodes: return 1
+    elif T in binarynodes: return 2
+    elif T in tertiarynodes: return 3
+    elif T in rangenodes: return 4
+    elif T in specialnodes: return 5
+    elif T in builtins: return 6
+    elif T in bsmes: return 7
+    return None
+
+
+def classify_index(T, index=sync_tables()):
+    entry = index.get(T)
+    return None if entry is None else entry[0]
+
+
+def per_token_ns(fn, number=200):
+    toks = TOKENS
+    def run():
+        for T in toks:
+            fn(T)
+    t = min(timeit.repeat(run, number=number, repeat=5))
+    return t / (number * len(toks)) * 1e9
+
+
+def per_token_translate_ns(number=200):
+    def run():
+        clear_caches()
+        for s in SNIPPETS:
+            translate_snippet(s)
+    t = min(timeit.repeat(run, number=number, repeat=5))
+    return t / (number * len(TOKENS)) * 1e9
+
+
+def main():
+    assert all(classify_chain(T) == classify_index(T) for T in TOKENS
+               if classify_index(T) != FONTWORD)
+    print('tokens in mix:           %d' % len(TOKENS))
+    print('chain classification:    %7.1f ns/token' % per_token_ns(classify_chain))
+    print('index classification:    %7.1f ns/token' % per_token_ns(classify_index))
+    print('translate_snippet, cold: %7.1f ns/token' % per_token_translate_ns())
+
+
+if __name__ == '__main__':
+    main()
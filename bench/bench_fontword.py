@@ -0,0 +1,58 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Per-token cost of `fontword`.
+
+Compares the old regex scan of each token (followed by a fresh Node to
+translate the letter) with the probe into the precomputed font word index,
+over the kind of tokens that reach `fontword`: mostly plain identifiers,
+some font words, and a few numbers and symbols.
+
+    PYTHONPATH=. python bench/bench_fontword.py
+"""
+
+import timeit
+
+from vertex2tex import v2t
+from vertex2tex.config import fonts
+from vertex2tex.v2t import Node, TokenStream, fontword
+
+TOKENS = (
+    ['a0', 'an-1', 'xi', 'aijuu2', 'zetauu2r', 'cn+1', 'x', 'y', 'f', 'n', 'pi', 'ai,j'] * 4 +
+    ['frp', 'bbZ', 'bbQ', 'calO', 'scrB', 'sfM', 'bfv', 'hatx', 'tilalpha', 'barz', 'rmd'] * 2 +
+    ['0', '1', '2', '(', ')', '=', ','] * 2
+)
+
+
+def fontword_regex(T):
+    letter_matcher = v2t.letter_matcher
+    s = ''
+    if len(T) > 0 and letter_matcher.split(T)[-1] == '':
+        letter = letter_matcher.findall(T)[-1]
+        prefix = T[:-len(letter)]
+        if prefix in fonts:
+            letter = Node(TokenStream([letter])).xlat()
+            s = '\\%s{%s}' % (fonts[prefix], letter)
+    return s
+
+
+def per_token_ns(fn, number=500):
+    toks = TOKENS
+    def run():
+        for T in toks:
+            fn(T)
+    t = min(timeit.repeat(run, number=number, repeat=5))
+    return t / (number * len(toks)) * 1e9
+
+
+def main():
+    v2t.sync_tables()
+    assert all(fontword_regex(T) == fontword(T) for T in TOKENS)
+    print('tokens in mix:           %d' % len(TOKENS))
+    print('regex fontword:          %7.1f ns/token' % per_token_ns(fontword_regex))
+    print('indexed fontword:        %7.1f ns/token' % per_token_ns(fontword))
+
+
+if __name__ == '__main__':
+    main()
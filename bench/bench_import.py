@@ -0,0 +1,101 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Startup time, against a budget.
+
+Imports each module in a fresh interpreter, several times, and takes the best
+time that `python -X importtime` reports for it, with all that it imports.
+Also times, in a fresh interpreter, importing `v2t` and translating a first
+snippet, which includes building the keyword tables. Exits with status 1 if anything is over
+its budget. The budgets are for a fast machine; scale them for a slower one.
+
+Bytecode is written and used, as it would be by an installed package, even if
+PYTHONDONTWRITEBYTECODE is set.
+
+    PYTHONPATH=. python bench/bench_import.py [--repeat N] [--scale X]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Budgets, in milliseconds.
+BUDGETS = [
+    ('vertex2tex', 2),
+    ('vertex2tex.v2t', 20),
+    ('vertex2tex.document', 25),
+    ('vertex2tex.cli', 30),
+]
+FIRST_SNIPPET_BUDGET = 35
+
+FIRST_SNIPPET = '''
+import time
+t0 = time.perf_counter()
+from vertex2tex.v2t import translate_snippet
+translate_snippet('sum over n from 0 to infty; an xuun')
+print(time.perf_counter() - t0)
+'''
+
+
+def run(args):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    p = subprocess.run([sys.executable] + args, env=env, capture_output=True, text=True, check=True)
+    return p
+
+
+def top_level_imports(args):
+    """
+    :return: dict mapping the modules imported at top level in a fresh
+        interpreter to their cumulative import times in microseconds.
+    """
+    p = run(['-X', 'importtime'] + args)
+    times = {}
+    for line in p.stderr.splitlines():
+        fields = line.split('|')
+        # Nested imports are indented.
+        if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2].startswith('  '):
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def import_ms(module, startup):
+    """
+    :param startup: the modules the interpreter imports on its own.
+    :return: the time to import a module in a fresh interpreter, with all that
+        it imports, in milliseconds.
+    """
+    times = top_level_imports(['-c', 'import %s' % module])
+    return sum(t for m, t in times.items() if m not in startup) / 1000
+
+
+def first_snippet_ms():
+    return float(run(['-c', FIRST_SNIPPET]).stdout) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time importing VerTeX, against a budget.')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the budgets by this')
+    args = parser.parse_args()
+    # Write the bytecode.
+    run(['-c', 'import vertex2tex.cli, vertex2tex.tree, vertex2tex.incremental'])
+    startup = set(top_level_imports(['-c', 'pass']))
+    rows = [(module, min(import_ms(module, startup) for _ in range(args.repeat)), budget)
+            for module, budget in BUDGETS]
+    rows.append(('first snippet', min(first_snippet_ms() for _ in range(args.repeat)),
+                 FIRST_SNIPPET_BUDGET))
+    over = 0
+    print('%-22s %10s %10s' % ('', 'ms', 'budget'))
+    for name, ms, budget in rows:
+        budget *= args.scale
+        flag = '' if ms <= budget else '  OVER'
+        over += bool(flag)
+        print('%-22s %10.1f %10.1f%s' % (name, ms, budget, flag))
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Time per edit of an `IncrementalDocument`, with document size.
+
+Each document is 1x, 10x and 100x a base unit, as in bench_scaling. Each edit
+types a character into a math mode (so that it is translated again), at one
+of 20 places spread over the document, jumping from place to place. The time
+per edit should stay flat as the document grows.
+
+    PYTHONPATH=. python bench/bench_incremental.py [--edits N]
+"""
+
+import argparse
+import time
+
+from vertex2tex.incremental import IncrementalDocument
+from vertex2tex.v2t import clear_caches
+
+from bench_scaling import document
+
+
+def edit_times(text, edits):
+    doc = IncrementalDocument(text)
+    step = len(text) // 20
+    places = [text.index('@a', k * step) + 1 for k in range(20)]
+    times = []
+    for n in range(edits):
+        k = n * 7 % 20
+        p = places[k]
+        t0 = time.perf_counter()
+        doc.edit(p, p, 'x')
+        times.append(time.perf_counter() - t0)
+        for m in range(k, 20):
+            places[m] += 1
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time edits of an incremental document.')
+    parser.add_argument('--edits', type=int, default=200)
+    args = parser.parse_args()
+    clear_caches()
+    print('%6s %10s %12s %12s' % ('', 'KB', 'best us', 'median us'))
+    for factor in [1, 10, 100]:
+        text = document(20 * factor)
+        best, median = edit_times(text, args.edits)
+        print('%5dx %10.1f %12.1f %12.1f' % (factor, len(text) / 1024, best * 1e6, median * 1e6))
+
+
+if __name__ == '__main__':
+    main()
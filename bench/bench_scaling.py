@@ -0,0 +1,64 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Scaling of `translate_document` and of a single long snippet with input size.
+
+Each document (or snippet) is 1x, 10x and 100x a base unit. Formulas are
+numbered so that the snippet cache cannot hide the work. With linear-time
+output assembly, the time per kilobyte should stay flat.
+
+    PYTHONPATH=. python bench/bench_scaling.py
+"""
+
+import time
+
+from vertex2tex import translate_document, translate_snippet
+from vertex2tex.v2t import clear_caches
+
+PARAGRAPH = (
+    "Let $@a%(k)d, a1, ddd, an-1@$ be a sequence in $@bbZ@$, and suppose that\n"
+    "$$@sum over n from 0 to infty; an xuu%(k)d = frac 1 over 1 - x;@$$\n"
+    "for all $@abs x; < %(k)d@$. Some plain prose follows here, with no math in it, "
+    "to keep the math sparse, as it is in most chapters of a book.\n\n"
+)
+
+MATRIX_ROW = "%(k)d; zeta; zeta^^2r; zetauu2r-1;\n"
+
+
+def document(units):
+    return ''.join(PARAGRAPH % {'k': k} for k in range(units))
+
+
+def snippet(units):
+    rows = ''.join(MATRIX_ROW % {'k': k} for k in range(units))
+    return 'abs matrix 4 cols\n' + rows + 'endmatrix;'
+
+
+def timed(fn, arg, repeat=3):
+    best = None
+    for _ in range(repeat):
+        clear_caches()
+        t0 = time.perf_counter()
+        fn(arg)
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return best
+
+
+def report(name, fn, make, base):
+    print(name)
+    for factor in [1, 10, 100]:
+        text = make(base * factor)
+        t = timed(fn, text)
+        kb = len(text) / 1024
+        print('  %4dx  %9.1f KB  %9.2f ms  %7.3f ms/KB' % (factor, kb, t * 1e3, t * 1e3 / kb))
+
+
+def main():
+    report('translate_document', translate_document, document, 20)
+    report('translate_snippet (matrix)', translate_snippet, snippet, 20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Round-trip latency of the translation server, against starting a process.
+
+Starts a server on a Unix socket (or a port on localhost), and times requests
+on a warm connection: a snippet (from the cache, after the first), a new
+snippet each time, and a short document. For comparison, times translating
+the same document by running the `vertex2tex` command, and by running the
+client from the command line.
+
+    PYTHONPATH=. python bench/bench_server.py [--repeat N]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from vertex2tex.client import Client
+
+DOC = 'Let $@f : bbR to bbR@$ be\nsuch that $$@sum over n from 0 to infty; an xuun@$$.\n'
+
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[0] * 1000, times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time requests to the translation server.')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp()
+    if hasattr(socket, 'AF_UNIX'):
+        address = os.path.join(tmp, 'bench.sock')
+    else:
+        address = '127.0.0.1:8764'
+    server = subprocess.Popen([sys.executable, '-m', 'vertex2tex.server', '--address', address],
+                              stderr=subprocess.PIPE, text=True)
+    try:
+        server.stderr.readline()
+        with Client(address) as c:
+            c.ping()
+            counter = iter(range(10 ** 9))
+            rows = [
+                ('ping', lambda: c.ping()),
+                ('cached snippet', lambda: c.translate_snippet('sum over n; an xuun')),
+                ('new snippet', lambda: c.translate_snippet('a%d over bet' % next(counter))),
+                ('document', lambda: c.translate_document(DOC)),
+            ]
+            print('%-26s %10s %10s' % ('', 'best ms', 'median ms'))
+            for name, fn in rows:
+                print('%-26s %10.3f %10.3f' % ((name,) + best_ms(fn, args.repeat)))
+            n = max(3, args.repeat // 20)
+            env = dict(os.environ)
+            env.pop('PYTHONDONTWRITEBYTECODE', None)
+            for name, cmd in [
+                ('client process', [sys.executable, '-m', 'vertex2tex.client', '--address', address]),
+                ('vertex2tex process', [sys.executable, '-c',
+                                        'import sys; from vertex2tex.cli import main; sys.exit(main())']),
+            ]:
+                run = lambda: subprocess.run(cmd, input=DOC, capture_output=True, text=True,
+                                             env=env, check=True)
+                print('%-26s %10.3f %10.3f' % ((name,) + best_ms(run, n)))
+            c.shutdown()
+    finally:
+        server.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Throughput of `translate_snippets` against a loop calling `translate_snippet`.
+
+The corpus is N snippets (default one million), as they might be pulled from
+a large collection of documents: a few common formulas recur very often, and
+a long tail of numbered ones recur a few times each.
+
+    PYTHONPATH=. python bench/bench_snippets.py [N]
+"""
+
+import os
+import random
+import sys
+import time
+
+from vertex2tex.v2t import clear_caches, translate_snippet, translate_snippets
+
+COMMON = [
+    'n', 'alp', 'frac 1 over 2;', 'a0, a1, ddd, an-1', 'frp in bbZ', 'abs x;',
+    'x in bbR', 'sum over n from 0 to infty; an', 'zetauu2r', 'binom n choose k;',
+]
+
+TAIL = [
+    'a%d + frac 1 over n%d;', 'sum over k from 0 to %d; xk ykuu%d', 'abs z%d; leq %d',
+    'set x in bbZ : x geq %d; cap calOk%d', 'matrix 2 cols a%d; b; c; d%d; endmatrix',
+]
+
+
+def corpus(n):
+    rng = random.Random(0)
+    out = []
+    for _ in range(n):
+        if rng.random() < 0.5:
+            out.append(rng.choice(COMMON))
+        else:
+            k = rng.randrange(n // 8)
+            out.append(rng.choice(TAIL) % (k, k))
+    return out
+
+
+def timed(label, fn, base=None):
+    clear_caches()
+    t0 = time.perf_counter()
+    result = fn()
+    t = time.perf_counter() - t0
+    print('%-32s %8.2f s%s' % (label, t, '   speedup %5.2f' % (base / t) if base else ''))
+    return t, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    snippets = corpus(n)
+    print('%d snippets, %d distinct' % (n, len(set(snippets))))
+    base, expected = timed('loop of translate_snippet', lambda: [translate_snippet(s) for s in snippets])
+    t, out = timed('translate_snippets', lambda: translate_snippets(snippets), base)
+    assert out == expected
+    jobs = os.cpu_count() or 1
+    if jobs > 1:
+        t, out = timed('translate_snippets, jobs=%d' % jobs,
+                       lambda: translate_snippets(snippets, jobs=jobs), base)
+        assert out == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark suite, timing each stage of the translation pipeline separately,
+over synthetic and realistic corpora.
+
+    PYTHONPATH=. python bench/suite.py                      # print a table
+    PYTHONPATH=. python bench/suite.py --json base.json     # also save results
+    PYTHONPATH=. python bench/suite.py --compare base.json  # flag regressions
+
+Each benchmark is timed several times in each of several runs of the suite,
+in passes over all of the benchmarks, and the median of the run medians is
+reported. How much those medians differ from run to run is its spread. With
+--compare, the exit status is 1 if any benchmark got slower than the baseline
+by more than the noise allows: by more than --sigmas (default 3) times the
+combined spread of the two results, and by more than --threshold (default 3%).
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from vertex2tex import translate_document, translate_snippet
+from vertex2tex.document import SegmentStream
+from vertex2tex.v2t import (
+    Node, TokenStream, autosub, clear_caches, compress, fontword, tokenize,
+)
+
+###########
+# Corpora
+
+SMALL_SNIPPETS = [
+    'n', 'alp', 'frac 1 over 2;', 'a0, a1, ddd, an-1', 'alpha, beta, gamma',
+    'frp in bbZ', 'n eth', 'abs x;', 'f supp n;', 'f inv', 'xi', 'bbQ(alp)',
+    'sum over n from 0 to infty; an', 'x in bbR', 'lam cdot xi', 'zetauu2r',
+    'ai,j', 'aijuu2', 'binom n choose k;', 'set x in bbZ : x geq 0;',
+]
+
+IDENTIFIERS = [
+    'an-1', 'zetauu2r', 'xi', 'aijuu2', 'xivv1', 'bbZm', 'alphan', 'ai__j^^^r',
+    'cn+1', 'ai,j', 'auurvvk', 'pi', 'x0', 'yk+1', 'thetavvi', 'calOK',
+]
+
+FONT_TOKENS = (
+    ['frp', 'bbZ', 'bbQ', 'calO', 'scrB', 'sfM', 'bfv', 'hatx', 'tilalpha', 'barz'] +
+    ['a0', 'xi', 'n', 'an-1', 'f', 'x', '2', '(', ')', '=']
+)
+
+
+def nested(depth):
+    """
+    Deeply nested fractions and sums.
+    """
+    s = 'x'
+    for k in range(depth):
+        if k % 2:
+            s = 'frac 1 over a%d + %s;' % (k, s)
+        else:
+            s = 'sum over n%d from 0 to infty; qnt %s;' % (k, s)
+    return s
+
+
+def matrix(rows, cols=6):
+    entries = ' '.join(
+        '%s;' % random.Random(r * cols + c).choice(IDENTIFIERS + ['0', '1', 'alp', 'frac 1 over n;'])
+        for r in range(rows) for c in range(cols)
+    )
+    return 'bqnt matrix %d cols %s endmatrix;' % (cols, entries)
+
+
+PARAGRAPH = (
+    "Let $@a%(k)d, a1, ddd, an-1@$ be a sequence in $@bbZ@$, and suppose that\n"
+    "$$@sum over n from 0 to infty; an xuu%(k)d = frac 1 over 1 - x;@$$\n"
+    "for all $@abs x; < %(k)d@$. Some plain prose follows here, with no math in it, "
+    "to keep the math sparse, as it is in most chapters of a book. We write \\$5 for "
+    "five dollars, and $x$ for a math mode that is not to be translated.\n\n"
+)
+
+
+def long_document(paragraphs):
+    return ''.join(PARAGRAPH % {'k': k} for k in range(paragraphs))
+
+
+CORPORA = {
+    'small': SMALL_SNIPPETS * 50,
+    'nested': [nested(60)],
+    'matrix': [matrix(200)],
+}
+
+###########
+# Benchmarks
+#
+# Each benchmark is a function of no arguments, along with the number of
+# items (snippets, tokens, ...) that it processes per call.
+
+def benchmarks():
+    docs = long_document(400)
+    marks = {}
+
+    for name, corpus in CORPORA.items():
+        tokens = [tokenize(s) for s in corpus]
+        outputs = [translate_snippet(s) + '  \n  x ' for s in corpus]
+        ntokens = sum(map(len, tokens))
+
+        marks['tokenize/' + name] = (lambda c=corpus: [tokenize(s) for s in c], ntokens)
+
+        def xlat(tokens=tokens):
+            clear_caches()
+            for t in tokens:
+                Node(TokenStream(t)).xlat()
+        marks['xlat/' + name] = (xlat, ntokens)
+
+        marks['compress/' + name] = (lambda o=outputs: [compress(s) for s in o], len(outputs))
+
+        def cold(corpus=corpus):
+            clear_caches()
+            for s in corpus:
+                translate_snippet(s)
+        marks['translate_snippet/%s/cold' % name] = (cold, len(corpus))
+        marks['translate_snippet/%s/warm' % name] = (
+            lambda c=corpus: [translate_snippet(s) for s in c], len(corpus))
+
+    def autosub_cold(ids=IDENTIFIERS * 20):
+        clear_caches()
+        for s in ids:
+            autosub(s)
+    marks['autosub/cold'] = (autosub_cold, len(IDENTIFIERS) * 20)
+    marks['autosub/warm'] = (lambda ids=IDENTIFIERS * 20: [autosub(s) for s in ids], len(IDENTIFIERS) * 20)
+    marks['fontword'] = (lambda toks=FONT_TOKENS * 20: [fontword(T) for T in toks], len(FONT_TOKENS) * 20)
+
+    marks['segments/long'] = (lambda: list(SegmentStream(docs)), len(docs) // 1024)
+
+    def document_cold():
+        clear_caches()
+        translate_document(docs)
+    marks['translate_document/long/cold'] = (document_cold, len(docs) // 1024)
+    marks['translate_document/long/all-math'] = (
+        lambda: translate_document(docs, keychar=None), len(docs) // 1024)
+
+    return marks
+
+
+def calibrate(fn, min_time=0.02):
+    """
+    :return: the number of calls to time together, so that they take at
+        least `min_time` seconds.
+    """
+    fn()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t0 >= min_time or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def run(pattern=None, repeat=5, runs=5):
+    """
+    Time each benchmark `repeat` times in each of `runs` runs, one pass over
+    all of them at a time.
+
+    :return: dict mapping the name of each benchmark to its results.
+    """
+    marks = [(name, fn, items, calibrate(fn))
+             for name, (fn, items) in benchmarks().items()
+             if not pattern or pattern in name]
+    samples = {name: [[] for _ in range(runs)] for name, fn, items, number in marks}
+    for k in range(runs):
+        for _ in range(repeat):
+            for name, fn, items, number in marks:
+                t0 = time.perf_counter()
+                for _ in range(number):
+                    fn()
+                samples[name][k].append((time.perf_counter() - t0) / number)
+    results = {}
+    for name, fn, items, number in marks:
+        medians = [statistics.median(times) for times in samples[name]]
+        median = statistics.median(medians)
+        results[name] = {
+            'min': min(map(min, samples[name])),
+            'median': median,
+            'runs': medians,
+            'spread': spread(medians),
+            'items': items,
+            'per_item_ns': median / max(items, 1) * 1e9,
+        }
+        print('%-40s %12.1f us %12.1f ns/item %6.1f%%' % (
+            name, median * 1e6, results[name]['per_item_ns'], results[name]['spread'] * 100),
+            file=sys.stderr)
+    return results
+
+
+def spread(medians):
+    """
+    :return: the standard error of the median of the run medians, relative to
+        it. Runs, more than the timings within a run, differ with the state of
+        the machine, so this is the noise in comparing two sets of results.
+    """
+    if len(medians) < 2:
+        return 0.0
+    # The standard error of the median of n samples is 1.2533 sd / sqrt(n).
+    m = statistics.median(medians)
+    return 1.2533 * statistics.stdev(medians) / m / len(medians) ** 0.5
+
+
+def compare(results, baseline, threshold, sigmas):
+    """
+    Print the change in each benchmark against the baseline.
+
+    A benchmark regressed if its median got slower by more than `sigmas`
+    times the combined spread of the two results (see `spread`), and by more
+    than `threshold`.
+
+    :return: list of the names of the benchmarks that regressed.
+    """
+    regressed = []
+    print('%-40s %12s %12s %8s %8s' % ('benchmark', 'baseline us', 'now us', 'change', 'allowed'))
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            print('%-40s %12s %12.1f %8s' % (name, '-', r['median'] * 1e6, 'new'))
+            continue
+        # Results saved by an older suite have no spread.
+        noise = (b.get('spread', 0.0) ** 2 + r['spread'] ** 2) ** 0.5
+        allowed = max(threshold, sigmas * noise)
+        ratio = r['median'] / b['median']
+        flag = ''
+        if ratio > 1 + allowed:
+            flag = '  REGRESSION'
+            regressed.append(name)
+        print('%-40s %12.1f %12.1f %+7.1f%% %7.1f%%%s' % (
+            name, b['median'] * 1e6, r['median'] * 1e6, (ratio - 1) * 100,
+            allowed * 100, flag))
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--json', metavar='FILE', help='save the results to this file')
+    parser.add_argument('--compare', metavar='FILE', help='compare with the results saved in this file')
+    parser.add_argument('--threshold', type=float, default=0.03,
+                        help='least slowdown counted as a regression (default 0.03)')
+    parser.add_argument('--sigmas', type=float, default=3.0,
+                        help='slowdown counted as a regression, in units of the spread '
+                             'of the timings (default 3)')
+    parser.add_argument('--filter', metavar='TEXT', help='run only benchmarks whose names contain this')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timings of each benchmark in each run (default 5)')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='runs of the suite, whose medians give the spread (default 5)')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.runs)
+    doc = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(doc, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold, args.sigmas):
+            return 1
+    elif not args.json:
+        json.dump(doc, sys.stdout, indent=2, sort_keys=True)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
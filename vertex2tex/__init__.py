@@ -1,5 +1,32 @@
 # VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
 # SPDX-License-Identifier: MIT
 
-from vertex2tex.v2t import translate_snippet, cond_translate_snippet
-from vertex2tex.document import translate_document
+__version__ = '0.3.4'
+
+# The names exported here, and the modules that define them. Each module is
+# imported only when one of its names is first used, so that importing the
+# package (or one of its modules, as the command line tool does) stays quick.
+_exports = {
+    'translate_snippet': 'vertex2tex.v2t',
+    'translate_snippets': 'vertex2tex.v2t',
+    'cond_translate_snippet': 'vertex2tex.v2t',
+    'translate_document': 'vertex2tex.document',
+    'translate_stream': 'vertex2tex.document',
+    'parse_snippet': 'vertex2tex.tree',
+    'Profiler': 'vertex2tex.profiling',
+    'Dialect': 'vertex2tex.dialect',
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
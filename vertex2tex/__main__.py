@@ -0,0 +1,8 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import sys
+
+from vertex2tex.cli import main
+
+sys.exit(main())
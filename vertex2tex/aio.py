@@ -0,0 +1,270 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Translating from an asyncio event loop, without blocking it.
+
+The translation itself is handed to an executor: by default a small pool of
+threads, which keeps the loop responsive; or, for translation in parallel,
+any other `concurrent.futures.Executor`, such as a ProcessPoolExecutor.
+
+    >>> from vertex2tex import aio
+    >>> out = await aio.translate_document(text)
+
+Identical requests that arrive while one is being translated share its
+result, instead of being translated again, and at most `max_concurrency`
+translations are handed to the executor at a time, the others waiting their
+turn. Snippets already in the cache are answered at once, in the loop.
+
+The keyword tables (in `config`, or of a dialect) should not be changed while
+translations are in flight.
+"""
+
+import asyncio
+from functools import partial
+
+from vertex2tex import v2t
+from vertex2tex.excep import *
+
+
+def _translate_each(snippets, keychar, dialect):
+    """
+    Translate snippets, one by one. This is the function run by the executor.
+
+    :return: list of the translations, each replaced by its VerTeXError if it
+        cannot be translated.
+    """
+    out = []
+    for text in snippets:
+        try:
+            out.append(v2t.translate_snippet(text, keychar=keychar, dialect=dialect))
+        except VerTeXError as ve:
+            out.append(ve)
+    return out
+
+
+def _translate_document(text, keychar, scanner, dialect):
+    from vertex2tex.document import translate_document
+    return translate_document(text, keychar=keychar, scanner=scanner, dialect=dialect)
+
+
+class Translator:
+    """
+    Translates snippets and documents on an executor, combining identical
+    concurrent requests, and limiting how many run at once.
+    """
+
+    def __init__(self, executor=None, max_concurrency=4):
+        """
+        :param executor: the `concurrent.futures.Executor` on which to
+            translate. By default, a pool of `max_concurrency` threads, made when
+            first needed, and shut down by `close`.
+        :param max_concurrency: how many translations may be handed to the
+            executor at a time.
+        """
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self._own_executor = None
+        # Per event loop: the limit, and the jobs in flight, by request.
+        self._loop = None
+        self._limit = None
+        self._pending = {}
+        self.submitted = 0
+        self.coalesced = 0
+        self.cached = 0
+        self.running = 0
+        self.waiting = 0
+
+    def stats(self):
+        """
+        :return: dict of the counts of jobs submitted to the executor, of
+            requests answered by a job already in flight (coalesced), and of
+            snippets answered from the cache; and of the jobs now running, and
+            now waiting for their turn.
+        """
+        return {
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'cached': self.cached,
+            'running': self.running,
+            'waiting': self.waiting,
+        }
+
+    def close(self):
+        """
+        Shut down the executor, if it was made here.
+        """
+        if self._own_executor is not None:
+            self._own_executor.shutdown()
+            self._own_executor = None
+
+    def _get_executor(self):
+        if self.executor is not None:
+            return self.executor
+        if self._own_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._own_executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix='vertex2tex')
+        return self._own_executor
+
+    def _sync(self, dialect):
+        """
+        Bring the tables up to date here, in the loop, rather than in the
+        executor, where concurrent jobs would race to do it.
+
+        :return: the Tables, and the request key of their version.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+            self._pending = {}
+        tables = v2t.get_tables(dialect)
+        return tables, (dialect, tables.version)
+
+    def _submit(self, key, fn, *args):
+        """
+        Start a job, which runs `fn(*args)` on the executor in its turn, and
+        record it as in flight under `key`.
+
+        :return: the job, an asyncio Task.
+        """
+        job = asyncio.ensure_future(self._run(fn, args))
+        self._pending[key] = job
+        job.add_done_callback(partial(self._forget, key))
+        return job
+
+    def _forget(self, key, job):
+        if self._pending.get(key) is job:
+            del self._pending[key]
+
+    async def _run(self, fn, args):
+        self.waiting += 1
+        try:
+            await self._limit.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        self.submitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args))
+        finally:
+            self.running -= 1
+            self._limit.release()
+
+    async def translate_snippet(self, text, keychar=None, dialect=None):
+        """
+        As `v2t.translate_snippet` (without an emitter).
+        """
+        return (await self.translate_snippets([text], keychar=keychar, dialect=dialect))[0]
+
+    async def translate_snippets(self, snippets, keychar=None, dialect=None):
+        """
+        As `v2t.translate_snippets`. The snippets not in the cache, nor
+        already being translated, are translated together, in one job.
+
+        :raises VerTeXError: for the first snippet that cannot be translated.
+        """
+        tables, version = self._sync(dialect)
+        snippets = list(snippets)
+        done = {}
+        waits = {}
+        new = []
+        for text in dict.fromkeys(snippets):
+            if not text:
+                done[text] = ''
+                continue
+            out = tables.snippet_cache.get((text, keychar), v2t._MISSING)
+            if out is not v2t._MISSING:
+                done[text] = out
+                self.cached += 1
+                continue
+            job = self._pending.get(('snippet', text, keychar, version))
+            if job is None:
+                new.append(text)
+            else:
+                waits[text] = job
+                self.coalesced += 1
+        if new:
+            # One job for the batch, and a future for each snippet in it, on
+            # which the requests for that snippet alone can wait.
+            loop = asyncio.get_running_loop()
+            jobs = []
+            for text in new:
+                key = ('snippet', text, keychar, version)
+                job = waits[text] = self._pending[key] = loop.create_future()
+                job.add_done_callback(partial(self._forget, key))
+                jobs.append(job)
+            batch = asyncio.ensure_future(self._run(_translate_each, (new, keychar, dialect)))
+            batch.add_done_callback(partial(self._deliver, new, keychar, tables, version[1], jobs))
+        if waits:
+            # Wait for them all, so that every error is retrieved, and not
+            # only the one raised (or asyncio would log the others).
+            results = await asyncio.gather(*map(asyncio.shield, waits.values()),
+                                           return_exceptions=True)
+            done.update(zip(waits, results))
+        out = []
+        for text in snippets:
+            t = done[text]
+            if isinstance(t, BaseException):
+                raise t
+            out.append(t)
+        return out
+
+    def _deliver(self, texts, keychar, tables, version, jobs, batch):
+        """
+        Settle the futures of the snippets translated together in a batch, and
+        keep the translations in the cache here (which a process pool would not).
+        """
+        if batch.cancelled():
+            for job in jobs:
+                job.cancel()
+            return
+        e = batch.exception()
+        results = [e] * len(jobs) if e is not None else batch.result()
+        for text, job, out in zip(texts, jobs, results):
+            if job.done():
+                continue
+            if isinstance(out, BaseException):
+                job.set_exception(out)
+            else:
+                job.set_result(out)
+                if tables.version == version:
+                    tables.snippet_cache.put((text, keychar), out)
+
+    async def translate_document(self, text, keychar="@", scanner=None, dialect=None):
+        """
+        As `document.translate_document`.
+        """
+        tables, version = self._sync(dialect)
+        key = ('document', text, keychar, scanner, version)
+        job = self._pending.get(key)
+        if job is None:
+            job = self._submit(key, _translate_document, text, keychar, scanner, dialect)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(job)
+
+
+# The Translator used by the functions below.
+default_translator = Translator()
+
+async def translate_snippet(text, keychar=None, dialect=None):
+    """
+    Translate a snippet, as `v2t.translate_snippet` does, on `default_translator`.
+    """
+    return await default_translator.translate_snippet(text, keychar=keychar, dialect=dialect)
+
+async def translate_snippets(snippets, keychar=None, dialect=None):
+    """
+    Translate snippets, as `v2t.translate_snippets` does, on `default_translator`.
+    """
+    return await default_translator.translate_snippets(snippets, keychar=keychar, dialect=dialect)
+
+async def translate_document(text, keychar="@", scanner=None, dialect=None):
+    """
+    Translate a document, as `document.translate_document` does, on `default_translator`.
+    """
+    return await default_translator.translate_document(text, keychar=keychar, scanner=scanner,
+                                                       dialect=dialect)
@@ -0,0 +1,182 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Translating many documents at once, on a pool of worker processes.
+"""
+
+import os
+from collections import deque
+
+from vertex2tex import v2t
+from vertex2tex.excep import *
+from vertex2tex.document import Segment, advance, lex_chunks, translate_document
+
+# Documents longer than this many characters are split at math mode
+# boundaries, and the pieces translated on separate workers.
+SPLIT_SIZE = 1 << 20
+
+
+def split_document(text, size=SPLIT_SIZE):
+    """
+    Cut a document into pieces of roughly `size` characters, each of which
+    begins outside of any math mode, so that the pieces can be translated
+    independently, and their translations joined.
+
+    :return: list of triples (piece, line, column), giving the line and column
+        in `text` at which each piece begins.
+    """
+    pieces = []
+    start = 0
+    offset = 0
+    math = False
+    line, col = 1, 1
+    for seg in lex_chunks([text]):
+        s = seg.getStr()
+        offset += len(s)
+        if seg.getType() == Segment.BDRY:
+            math = not math
+            if not math and offset - start >= size:
+                pieces.append((text[start:offset], line, col))
+                start = offset
+                line, col = advance(seg.getLine(), seg.getCol(), s)
+    if start < len(text) or not pieces:
+        pieces.append((text[start:], line, col))
+    return pieces
+
+
+def translate_piece(task):
+    """
+    Translate one document, or piece of a document. This is the function
+    run by the workers.
+
+    :param task: tuple (index, name, text, line, column, keychar). If text is
+        None, then name is the path of a file to be read.
+    :return: pair (index, translated text).
+    """
+    index, name, text, line, col, keychar = task
+    try:
+        if text is None:
+            with open(name, encoding='utf-8', newline='') as f:
+                text = f.read()
+        return index, translate_document(text, keychar=keychar)
+    except VerTeXError as ve:
+        seg = ve.segment
+        if seg is not None and (line, col) != (1, 1):
+            # Report the position in the whole document, not in the piece.
+            L, C, T, S = seg.getLCTS()
+            if L == 1:
+                C += col - 1
+            ve.set_segment(Segment(L + line - 1, C, T, S))
+        if name is not None:
+            ve.set_filename(name)
+        raise ve
+
+
+def ordered_map(fn, tasks, jobs=None):
+    """
+    Like the builtin `map`, but running `fn` on a pool of `jobs` processes,
+    with only a bounded number of tasks in flight at a time.
+
+    :param jobs: number of worker processes. None means one per CPU; 1 means
+        run everything in this process.
+    :return: generator of results, in the order of the tasks.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        yield from map(fn, tasks)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    # Workers share this process's disk cache, if any.
+    dc = v2t.disk_cache
+    initargs = (None, 0) if dc is None else (dc.directory, dc.max_bytes)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=initargs) as executor:
+        window = deque()
+        try:
+            for task in tasks:
+                window.append(executor.submit(fn, task))
+                if len(window) >= 4 * jobs:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
+
+
+def _init_worker(cache_dir, max_bytes):
+    if cache_dir is not None:
+        v2t.use_disk_cache(cache_dir, max_bytes=max_bytes)
+
+
+def _assemble(tasks, jobs):
+    """
+    Translate tasks (see `translate_piece`), and join the translated pieces
+    of each document.
+
+    :return: generator of pairs (index, translated text), in order.
+    """
+    current = None
+    parts = []
+    for index, result in ordered_map(translate_piece, tasks, jobs=jobs):
+        if index != current and current is not None:
+            yield current, ''.join(parts)
+            parts = []
+        current = index
+        parts.append(result)
+    if current is not None:
+        yield current, ''.join(parts)
+
+
+def translate_files(paths, keychar="@", jobs=None, split_size=SPLIT_SIZE):
+    """
+    Translate many files, on a pool of worker processes.
+
+    Small files are read by the workers. Files longer than `split_size` are
+    read here, split at math mode boundaries, and their pieces spread over
+    the workers.
+
+    A VerTeXError raised for any file is re-raised here, with the name of the
+    file, and the line and column in it, where the error occurred.
+
+    :param paths: iterable of paths of files, encoded in UTF-8. Their line
+        endings are read as they are, and so kept in the translations.
+    :param keychar: As for `translate_document`.
+    :param jobs: number of worker processes. None means one per CPU.
+    :param split_size: see above.
+    :return: generator of pairs (path, translated text), in the order of `paths`.
+    """
+    paths = list(paths)
+    def tasks():
+        for index, path in enumerate(paths):
+            if os.path.getsize(path) <= split_size:
+                yield (index, path, None, 1, 1, keychar)
+            else:
+                with open(path, encoding='utf-8', newline='') as f:
+                    text = f.read()
+                for piece, line, col in split_document(text, split_size):
+                    yield (index, path, piece, line, col, keychar)
+    for index, text in _assemble(tasks(), jobs):
+        yield paths[index], text
+
+
+def translate_documents(texts, keychar="@", jobs=None, split_size=SPLIT_SIZE):
+    """
+    Translate many documents, on a pool of worker processes.
+
+    Documents longer than `split_size` are split at math mode boundaries, and
+    their pieces spread over the workers.
+
+    :param texts: iterable of documents.
+    :param keychar: As for `translate_document`.
+    :param jobs: number of worker processes. None means one per CPU.
+    :param split_size: see above.
+    :return: list of the translated documents, in order.
+    """
+    def tasks():
+        for index, text in enumerate(texts):
+            for piece, line, col in split_document(text, split_size):
+                yield (index, None, piece, line, col, keychar)
+    return [text for index, text in _assemble(tasks(), jobs)]
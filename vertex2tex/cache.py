@@ -0,0 +1,274 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Bounded caches, in memory, and on disk.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A mapping of bounded size, which evicts the least recently used entry
+    when full, and keeps count of its hits, misses, and evictions.
+
+    A cache of size 0 stores nothing.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """
+        Return the value stored under `key`, marking it as most recently used,
+        or return `default` if there is none.
+        """
+        try:
+            value = self.data[key]
+            self.data.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, evicting the least recently used entries
+        as needed to stay within the size bound.
+        """
+        if self.maxsize <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        self.trim()
+
+    def trim(self):
+        while len(self.data) > self.maxsize:
+            try:
+                self.data.popitem(last=False)
+            except KeyError:
+                break
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        """
+        Change the size bound, evicting entries if it has shrunk.
+        """
+        self.maxsize = maxsize
+        self.trim()
+
+    def clear(self):
+        """
+        Drop all entries. The counters are kept; see `reset_stats`.
+        """
+        self.data.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        :return: dict giving the counters, along with the current and maximum size.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+        }
+
+
+class DiskCache:
+    """
+    A persistent cache of strings, in an SQLite database in a given directory,
+    which may be shared by any number of processes, reading and writing at
+    once.
+
+    Keys are strings (such as hashes). The database is bounded in size:
+    when it grows beyond `max_bytes`, the least recently used entries are
+    evicted, down to 90% of the bound. Times of use are recorded only to
+    within `touch_interval` seconds, so that hits seldom have to write.
+
+    Each process, and each thread, opens its own connection on first use, so
+    a DiskCache may be made before worker processes are forked, and used from
+    any number of threads.
+    """
+
+    FILENAME = 'vertex2tex-cache.sqlite3'
+
+    # Check the size of the database after this many puts.
+    CHECK_EVERY = 256
+
+    def __init__(self, directory, max_bytes=1 << 28, touch_interval=3600):
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILENAME)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        # The connection of each thread, and the process that opened it.
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def connect(self):
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            import sqlite3
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'size INTEGER NOT NULL, atime INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime)')
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def get(self, key, default=None):
+        conn = self.connect()
+        row = conn.execute('SELECT value, atime FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        value, atime = row
+        now = int(time.time())
+        if now - atime > self.touch_interval:
+            conn.execute('UPDATE entries SET atime = ? WHERE key = ?', (now, key))
+        return value
+
+    def get_many(self, keys):
+        """
+        :return: dict mapping those of the keys that are present to their values.
+        """
+        conn = self.connect()
+        keys = list(keys)
+        found = {}
+        now = int(time.time())
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            marks = ','.join('?' * len(batch))
+            stale = []
+            for key, value, atime in conn.execute(
+                    'SELECT key, value, atime FROM entries WHERE key IN (%s)' % marks, batch):
+                found[key] = value
+                if now - atime > self.touch_interval:
+                    stale.append(key)
+            if stale:
+                conn.execute('UPDATE entries SET atime = ? WHERE key IN (%s)' % ','.join('?' * len(stale)),
+                             [now] + stale)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Store many (key, value) pairs, in a single transaction.
+        """
+        conn = self.connect()
+        now = int(time.time())
+        rows = [(k, v, len(k) + len(v.encode('utf-8')), now) for k, v in items]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?)', rows
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._puts += len(rows)
+        if self._puts >= self.CHECK_EVERY:
+            self._puts = 0
+            self.trim()
+
+    def put(self, key, value):
+        conn = self.connect()
+        size = len(key) + len(value.encode('utf-8'))
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?)',
+            (key, value, size, int(time.time()))
+        )
+        self._puts += 1
+        if self._puts >= self.CHECK_EVERY:
+            self._puts = 0
+            self.trim()
+
+    def total_bytes(self):
+        return self.connect().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def trim(self):
+        """
+        Evict the least recently used entries, if the database is over its bound.
+        """
+        conn = self.connect()
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        target = total - self.max_bytes * 9 // 10
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            freed = 0
+            doomed = []
+            for key, size in conn.execute('SELECT key, size FROM entries ORDER BY atime'):
+                if freed >= target:
+                    break
+                doomed.append((key,))
+                freed += size
+            conn.executemany('DELETE FROM entries WHERE key = ?', doomed)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self.evictions += len(doomed)
+
+    def clear(self):
+        self.connect().execute('DELETE FROM entries')
+
+    def close(self):
+        """
+        Close this thread's connection (which is opened again if needed).
+        """
+        local = self._local
+        if getattr(local, 'conn', None) is not None and local.pid == os.getpid():
+            local.conn.close()
+        local.conn = None
+
+    def stats(self):
+        """
+        :return: dict giving this process's counters, along with the number of
+            entries and bytes in the database, and its bound.
+        """
+        conn = self.connect()
+        entries, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'path': self.path,
+        }
@@ -0,0 +1,159 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Command-line interface.
+"""
+
+import argparse
+import os
+import sys
+
+from vertex2tex import v2t
+from vertex2tex.excep import *
+from vertex2tex.batch import translate_files
+from vertex2tex.document import translate_stream
+
+# Exit codes
+EXIT_OK = 0
+EXIT_VERTEX_ERROR = 1  # translation failed
+EXIT_USAGE = 2         # bad arguments, or files not found (as for argparse)
+
+# Environment variable giving a default for --cache-dir.
+CACHE_DIR_VAR = 'VERTEX2TEX_CACHE_DIR'
+
+
+def expand_paths(patterns):
+    """
+    Expand glob patterns (with ** for any depth of directories), in order,
+    and without repeats.
+
+    :raises FileNotFoundError: if a pattern matches nothing.
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if any(c in pattern for c in '*?['):
+            import glob
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern] if os.path.exists(pattern) else []
+        if not matches:
+            raise FileNotFoundError('no such file: %s' % pattern)
+        for path in matches:
+            if path not in seen and not os.path.isdir(path):
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def mirror_paths(paths, out_dir):
+    """
+    Place files in a directory, each at its path relative to the deepest
+    directory which contains them all, so that no two of them collide.
+
+    :return: list of the new paths, in the order of `paths`.
+    """
+    full = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in full])
+    return [os.path.join(out_dir, os.path.relpath(path, root)) for path in full]
+
+
+def write_atomic(path, text):
+    """
+    Replace the contents of a file, so that readers see either the old
+    contents or the new, never a mixture.
+    """
+    import shutil
+    import tempfile
+    d, name = os.path.split(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=d, prefix='.%s.' % name, suffix='.tmp')
+    try:
+        with open(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='vertex2tex',
+        description='Translate the math modes of documents from VerTeX to TeX. '
+                    'With no paths (or "-"), read stdin and write stdout.',
+    )
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help='files to translate, or glob patterns (quoted, and '
+                             'using ** for any depth of directories)')
+    parser.add_argument('-i', '--in-place', action='store_true',
+                        help='rewrite each file with its translation')
+    parser.add_argument('-o', '--out-dir',
+                        help='write each translated file into this directory, '
+                             'below which the files keep their paths relative to '
+                             'the directory they are all in')
+    parser.add_argument('-k', '--keychar', default='@',
+                        help='translate only math modes beginning or ending with '
+                             'this character (default "@")')
+    parser.add_argument('-a', '--all-math', action='store_true',
+                        help='translate all math modes, with no keychar')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes (0 for one per CPU; default 1)')
+    parser.add_argument('--cache-dir', default=os.environ.get(CACHE_DIR_VAR) or None,
+                        help='keep translated snippets in a cache in this directory, '
+                             'for use by later runs (default $%s)' % CACHE_DIR_VAR)
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help='size to which the cache is bounded (default 256)')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='print statistics of the cache, and exit')
+    parser.add_argument('--cache-clear', action='store_true',
+                        help='empty the cache, and exit')
+    args = parser.parse_args(argv)
+
+    keychar = None if args.all_math else args.keychar
+    if keychar is not None and (len(keychar) != 1 or keychar in '\\$'):
+        parser.error('keychar must be a single character, other than $ or \\')
+    if args.in_place and args.out_dir:
+        parser.error('use only one of --in-place and --out-dir')
+    if (args.cache_stats or args.cache_clear) and not args.cache_dir:
+        parser.error('--cache-stats and --cache-clear need --cache-dir')
+
+    try:
+        if args.cache_dir:
+            cache = v2t.use_disk_cache(args.cache_dir, max_bytes=args.cache_size << 20)
+            if args.cache_clear:
+                cache.clear()
+            if args.cache_stats:
+                for k, v in cache.stats().items():
+                    print('%s: %s' % (k, v))
+            if args.cache_clear or args.cache_stats:
+                return EXIT_OK
+
+        if not args.paths or args.paths == ['-']:
+            if args.in_place or args.out_dir:
+                parser.error('--in-place and --out-dir need paths')
+            for piece in translate_stream(sys.stdin, keychar=keychar):
+                sys.stdout.write(piece)
+            return EXIT_OK
+
+        paths = expand_paths(args.paths)
+        if args.out_dir:
+            out_paths = dict(zip(paths, mirror_paths(paths, args.out_dir)))
+        for path, text in translate_files(paths, keychar=keychar, jobs=args.jobs or None):
+            if args.in_place:
+                write_atomic(path, text)
+            elif args.out_dir:
+                out_path = out_paths[path]
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with open(out_path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(text)
+            else:
+                sys.stdout.write(text)
+    except VerTeXError as ve:
+        print('vertex2tex: %s' % ve, file=sys.stderr)
+        return EXIT_VERTEX_ERROR
+    except OSError as e:
+        print('vertex2tex: %s' % e, file=sys.stderr)
+        return EXIT_USAGE
+    return EXIT_OK
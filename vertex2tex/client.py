@@ -0,0 +1,271 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+A client of the translation server (see `server`), and the protocol they speak.
+
+Each message is a JSON object, encoded in UTF-8, and preceded by its length
+in bytes, as a 4-byte unsigned big-endian integer. The client sends requests,
+
+    {"id": 1, "op": "translate_snippet", "text": "alp", "keychar": null}
+
+and the server answers each one, in order, with the same id, and either the
+result or an error:
+
+    {"id": 1, "result": "\\\\alpha"}
+    {"id": 2, "error": {"type": "VerTeXError", "message": "1:12: ...",
+                        "span": [0, 4], "position": [1, 12]}}
+
+The message of an error is as the exception would print; the span and the
+position (line and column, in a document) are given when known. Other types
+of error are "BadRequest" and "InternalError".
+
+The operations are `translate_snippet` (text, keychar), `translate_snippets`
+(snippets, keychar), `translate_document` (text, keychar), `stats`, `ping` and
+`shutdown`. The keychar of a snippet defaults to null; of a document, to "@".
+
+This module imports nothing of the translator itself, so a client starts
+quickly:
+
+    >>> from vertex2tex.client import Client
+    >>> with Client() as c:
+    ...     c.translate_snippet('alp')
+    '\\\\alpha'
+
+or from the command line, translating a document from stdin to stdout:
+
+    python -m vertex2tex.client [--address ADDRESS] < doc.tex
+"""
+
+import json
+import os
+import socket
+import struct
+import sys
+
+from vertex2tex.excep import *
+
+# Environment variable giving the address of the server.
+ADDRESS_VAR = 'VERTEX2TEX_SERVER'
+
+# Largest message accepted, in bytes.
+MAX_MESSAGE = 1 << 28
+
+HEADER = struct.Struct('>I')
+
+# Exit codes, as of the command line tool.
+EXIT_OK = 0
+EXIT_VERTEX_ERROR = 1
+EXIT_USAGE = 2
+
+
+class ServerError(Exception):
+    """
+    An error reported by the server, other than a VerTeXError: a bad request,
+    or a failure of the server itself.
+    """
+
+
+def default_address():
+    """
+    :return: the address in $VERTEX2TEX_SERVER, or else a Unix socket of this
+        user's in the temporary directory (or where there are no Unix sockets,
+        a port on localhost).
+    """
+    address = os.environ.get(ADDRESS_VAR)
+    if address:
+        return address
+    if hasattr(socket, 'AF_UNIX'):
+        import tempfile
+        user = os.environ.get('USER') or str(os.getuid())
+        return os.path.join(tempfile.gettempdir(), 'vertex2tex-%s.sock' % user)
+    return 'localhost:8763'
+
+
+def parse_address(address):
+    """
+    :param address: the path of a Unix socket (containing a slash, or prefixed
+        with "unix:"), or "host:port", or ":port" for localhost.
+    :return: pair (family, address), as for `socket.socket` and `connect`.
+    """
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[5:]
+    if os.sep in address or '/' in address:
+        return socket.AF_UNIX, address
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError('bad address: %r' % address)
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def encode(message):
+    """
+    :return: the bytes of a message, framed.
+    """
+    data = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(data)) + data
+
+
+def decode(data):
+    """
+    :return: the message of the bytes of a frame, without its header.
+    :raises ValueError: if it is not a JSON object.
+    """
+    message = json.loads(data.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ValueError('message is not an object')
+    return message
+
+
+def error_of(error):
+    """
+    :return: the exception for an error reported by the server.
+    """
+    if error.get('type') == 'VerTeXError':
+        ve = VerTeXError(error.get('message', ''))
+        if error.get('span') is not None:
+            ve.set_span(tuple(error['span']))
+        return ve
+    return ServerError('%s: %s' % (error.get('type'), error.get('message')))
+
+
+class Client:
+    """
+    A connection to the server, made when first used. Requests are answered
+    in turn; use one Client per thread.
+    """
+
+    def __init__(self, address=None, timeout=None):
+        """
+        :param address: as for `parse_address`; by default, `default_address()`.
+        :param timeout: seconds to wait for the server, or None to wait forever.
+        """
+        self.address = address or default_address()
+        self.timeout = timeout
+        self.sock = None
+        self.next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        family, addr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+        except OSError:
+            sock.close()
+            raise
+        if family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _recv(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError('connection closed by server')
+            buf += chunk
+        return bytes(buf)
+
+    def request(self, op, **params):
+        """
+        Make a request, and wait for its answer.
+
+        :return: the result.
+        :raises VerTeXError: if the translation failed.
+        :raises ServerError: if the server refused the request.
+        :raises OSError: if the server could not be reached.
+        """
+        if self.sock is None:
+            self.connect()
+        self.next_id += 1
+        params.update(id=self.next_id, op=op)
+        try:
+            self.sock.sendall(encode(params))
+            n, = HEADER.unpack(self._recv(HEADER.size))
+            if n > MAX_MESSAGE:
+                raise ConnectionError('answer too long')
+            answer = decode(self._recv(n))
+        except BaseException:
+            # The connection is out of step.
+            self.close()
+            raise
+        if answer.get('id') != self.next_id:
+            self.close()
+            raise ConnectionError('answer out of step with request')
+        if 'error' in answer:
+            raise error_of(answer['error'])
+        return answer.get('result')
+
+    def translate_snippet(self, text, keychar=None):
+        return self.request('translate_snippet', text=text, keychar=keychar)
+
+    def translate_snippets(self, snippets, keychar=None):
+        return self.request('translate_snippets', snippets=list(snippets), keychar=keychar)
+
+    def translate_document(self, text, keychar="@"):
+        return self.request('translate_document', text=text, keychar=keychar)
+
+    def stats(self):
+        return self.request('stats')
+
+    def ping(self):
+        return self.request('ping')
+
+    def shutdown(self):
+        """
+        Ask the server to stop, once it has answered.
+        """
+        return self.request('shutdown')
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='vertex2tex-client',
+        description='Translate a document from stdin to stdout, on a running '
+                    'translation server (see vertex2tex-server).',
+    )
+    parser.add_argument('--address', default=None,
+                        help='address of the server (default $%s, or %s)' % (
+                            ADDRESS_VAR, default_address()))
+    parser.add_argument('-k', '--keychar', default='@',
+                        help='translate only math modes beginning or ending with '
+                             'this character (default "@")')
+    parser.add_argument('-a', '--all-math', action='store_true',
+                        help='translate all math modes, with no keychar')
+    parser.add_argument('--stats', action='store_true',
+                        help='print the statistics of the server, and exit')
+    parser.add_argument('--shutdown', action='store_true', help='stop the server')
+    args = parser.parse_args(argv)
+    keychar = None if args.all_math else args.keychar
+    try:
+        with Client(args.address) as client:
+            if args.stats:
+                print(json.dumps(client.stats(), indent=2))
+            elif args.shutdown:
+                client.shutdown()
+            else:
+                sys.stdout.write(client.translate_document(sys.stdin.read(), keychar=keychar))
+    except VerTeXError as ve:
+        print('vertex2tex-client: %s' % ve, file=sys.stderr)
+        return EXIT_VERTEX_ERROR
+    except (OSError, ServerError, ValueError) as e:
+        print('vertex2tex-client: %s' % e, file=sys.stderr)
+        return EXIT_USAGE
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
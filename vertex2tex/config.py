@@ -1,8 +1,83 @@
 # VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
 # SPDX-License-Identifier: MIT
 
+# The keyword tables below may be altered at runtime. Each change bumps
+# the table version, so that anything derived from the tables (dispatch
+# indexes, caches) knows to rebuild itself. The values in the dict tables are
+# kept as tuples (any lists in them are made tuples), so a change must replace
+# a value, rather than change it in place, where it would go unnoticed.
+_version = 0
+
+def _touch():
+    global _version
+    _version += 1
+
+def _bumping(method):
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._touch()
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+def _freeze(value):
+    """
+    :return: the value, with any lists in it (to any depth) made tuples.
+    """
+    if type(value) is list or type(value) is tuple:
+        return tuple(map(_freeze, value))
+    return value
+
+class KeywordDict(dict):
+    """
+    A dict that bumps the table version whenever it is changed, and keeps its
+    values frozen (see `_freeze`).
+    (Subclasses may bump another version, by overriding `_touch`.)
+    """
+    _touch = staticmethod(_touch)
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        for key, value in self.items():
+            dict.__setitem__(self, key, _freeze(value))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, _freeze(value))
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, _freeze(value))
+        self._touch()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+class KeywordList(list):
+    """
+    A list that bumps the table version whenever it is changed.
+    (Subclasses may bump another version, by overriding `_touch`.)
+    """
+    _touch = staticmethod(_touch)
+
+for _cls, _names in [
+    (KeywordDict, ['__delitem__', 'clear', 'pop', 'popitem']),
+    (KeywordList, ['__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+                   'clear', 'extend', 'insert', 'pop', 'remove', 'reverse', 'sort']),
+]:
+    for _name in _names:
+        setattr(_cls, _name, _bumping(getattr(_cls.__base__, _name)))
+del _cls, _names, _name
+
 # Built-ins (special abbreviations)
-builtins = {
+builtins = KeywordDict({
     # Dots
     'ccc':'\\cdots', 'ddd':'\\ldots', 'vvv':'\\vdots',
     # Arrows
@@ -33,10 +108,10 @@ builtins = {
     'eth':'^{\\mathrm{th}}',
     # (3) Other
     'star':'^*', 'mult':'^\\times', 'deg':'^\\circ',
-}
+})
 
 # Three-letter names for every Greek letter:
-Greek_three_letter = {
+Greek_three_letter = KeywordDict({
     # (1) Those whose names are ordinarily longer than three letters:
     # (1a) Lowercase:
     'alp':'\\alpha', 'bet':'\\beta', 'gam':'\\gamma',
@@ -54,14 +129,14 @@ Greek_three_letter = {
     # (3) Variants
     'vep':'\\varepsilon', 'vph':'\\varphi',
     'vth':'\\vartheta', 'vpi':'\\varpi',
-}
+})
 
 # Add these to the built-ins.
 builtins.update(Greek_three_letter)
 
 # Backslash-me's; same as an existing LaTeX code; we just add the
 # leading backslash for you.
-bsmes = [
+bsmes = KeywordList([
     'mapsto', 'leq', 'geq', 'neq', 'times',
     'subseteq', 'supseteq', 'subsetneq', 'supsetneq',
     'subset', 'supset',
@@ -77,9 +152,9 @@ bsmes = [
     'int', 'sin', 'cos', 'log', 'exp',
     'tan', 'arctan', 'arcsin', 'arccos',
     'quad', 'qquad',
-]
+])
 
-bsme_letters = [
+bsme_letters = KeywordList([
     'ell',
     # We include all Greek letters. (So you don't have to use the three-letter
     # built-in abbreviations if you don't want to.)
@@ -89,7 +164,7 @@ bsme_letters = [
     'phi', 'chi', 'psi', 'omega',
     'Gamma', 'Delta', 'Theta', 'Lambda', 'Sigma',
     'Phi', 'Psi', 'Omega'
-]
+])
 
 # Include the letters.
 bsmes.extend(bsme_letters)
@@ -100,7 +175,7 @@ all_letter_names = bsme_letters + list(Greek_three_letter.keys())
 all_letter_re_component = "|".join(all_letter_names)
 
 # Font and decorator prefixes.
-fonts = {
+fonts = KeywordDict({
     'fr':'mathfrak',
     'sf':'mathsf',
     'bf':'mathbf',
@@ -111,12 +186,12 @@ fonts = {
     'bar':'bar',
     'hat':'hat',
     'til':'tilde'
-}
+})
 
 font_prefixes = fonts.keys()
 font_prefix_re_component = "|".join(font_prefixes)
 
-unarynodes = {
+unarynodes = KeywordDict({
     'of':('(',')'),
     'qnt':('\\left( ', '\\right)'), # quantity
     'bqnt':('\\left[', '\\right]'), # bracket quantity
@@ -135,9 +210,9 @@ unarynodes = {
     'hat':('\\hat{', '}'),
     'widehat':('\\widehat{', '}'),
     'words':('\\:\\mbox{', '}\\:') #plain text words in math mode
-}
+})
 
-binarynodes = {
+binarynodes = KeywordDict({
     # fraction
     'frac':[ ('\\frac{', '}{', '}'), 'over', [0, 1] ],
     # nth root:
@@ -148,22 +223,22 @@ binarynodes = {
     'binom':[ ('\\binom{', '}{', '}'), 'choose', [0, 1] ],
     # index (of a subgroup), or degree of a field extension
     'index':[ ('\\left[', ' : ', '\\right]'), 'in', [1, 0] ]
-}
+})
 
-tertiarynodes = {
+tertiarynodes = KeywordDict({
     'map':[ ('', ' : ', '\\rightarrow', ''), ('from', 'to'), [0, 1, 2] ]
-}
+})
 
-rangenodes = {
+rangenodes = KeywordDict({
     'sum':'\\sum', 'product':'\\prod', 'prod':'\\prod',
     'limit':'\\lim',
     'union':'\\bigcup', 'inters':'\\bigcap'
-}
+})
 
-html_exceptions = [
+html_exceptions = KeywordList([
     '&gt;',
     '&lt;',
     '&apos;',
     '&quot;',
     '&amp;'
-]
+])
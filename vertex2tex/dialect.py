@@ -0,0 +1,180 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Dialects: keyword tables layered over those in `config`, or over another
+dialect, so that keywords can be added, replaced or removed for some
+translations, without changing (or copying) the tables of the others.
+
+    >>> from vertex2tex.dialect import Dialect
+    >>> analysis = Dialect()
+    >>> analysis.builtins['RR'] = '\\mathbb{R}'
+    >>> analysis.remove('builtins', 'to')
+    >>> translate_snippet('f : RR to RR', dialect=analysis)
+    'f:\\mathbb{R} t_{o}\\mathbb{R}'
+
+Any number of dialects may be used in one process. Each change to a dialect
+bumps its version, and what is derived from its tables (see `v2t.get_tables`)
+is brought up to date when next used: as a rule, from what is derived for its
+parent, by looking up again only the keywords the dialect changes.
+"""
+
+from vertex2tex import config, v2t
+from vertex2tex.config import KeywordDict, KeywordList
+
+# The tables of a dialect, named as in `config`, besides 'specialnodes' (as in
+# `v2t`) and 'letters': the names that count as letters, in automatic
+# subscripts and font words (in `config`, `bsme_letters` and the keys of
+# `Greek_three_letter`).
+DICT_TABLES = ('builtins', 'fonts', 'unarynodes', 'binarynodes', 'tertiarynodes',
+               'rangenodes', 'specialnodes')
+LIST_TABLES = ('bsmes', 'letters', 'html_exceptions')
+TABLES = DICT_TABLES + LIST_TABLES
+
+
+class LayerDict(KeywordDict):
+    """
+    A dialect's own entries in one of its dict tables. Changing it bumps the
+    version of the dialect.
+    """
+
+    def __init__(self, dialect):
+        dict.__init__(self)
+        self.dialect = dialect
+
+    def _touch(self):
+        self.dialect._touch()
+
+
+class LayerList(KeywordList):
+    """
+    A dialect's own entries in one of its list tables. Changing it bumps the
+    version of the dialect.
+    """
+
+    def __init__(self, dialect):
+        list.__init__(self)
+        self.dialect = dialect
+
+    def _touch(self):
+        self.dialect._touch()
+
+
+class Dialect:
+    """
+    Keyword tables layered over those of a parent dialect, or if there is
+    none, over those of `config`.
+
+    The tables are attributes, named as in `TABLES`, and each holds only the
+    dialect's own entries, which are added to those of the parent (replacing
+    any of the same keyword, in dict tables). Use `remove` to remove a keyword
+    that the parent has. Keywords of different kinds take precedence over one
+    another as usual (see `v2t.build_dispatch_index`).
+    """
+
+    def __init__(self, parent=None, name=None, cache_size=10000):
+        """
+        :param parent: the Dialect to layer over, or None for `config`.
+        :param name: a name, for the dialect's repr.
+        :param cache_size: the size of the caches of translations made in the
+            dialect.
+        """
+        self.parent = parent
+        self.name = name
+        self.cache_size = cache_size
+        self._version = 0
+        for table in DICT_TABLES:
+            setattr(self, table, LayerDict(self))
+        for table in LIST_TABLES:
+            setattr(self, table, LayerList(self))
+        # Keywords removed from each table.
+        self.removed = {table: set() for table in TABLES}
+        # What is derived from the tables, once used (see `v2t.get_tables`).
+        self.tables = None
+
+    def __repr__(self):
+        return '<Dialect %s>' % (self.name or hex(id(self)))
+
+    def __getstate__(self):
+        # The layers as plain tables, and nothing derived from them.
+        state = self.__dict__.copy()
+        for table in DICT_TABLES:
+            state[table] = dict(state[table])
+        for table in LIST_TABLES:
+            state[table] = list(state[table])
+        state['tables'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for table in DICT_TABLES:
+            layer = LayerDict(self)
+            dict.update(layer, state[table])
+            setattr(self, table, layer)
+        for table in LIST_TABLES:
+            layer = LayerList(self)
+            list.extend(layer, state[table])
+            setattr(self, table, layer)
+
+    def _touch(self):
+        self._version += 1
+
+    @property
+    def version(self):
+        """
+        A number that grows whenever this dialect, or any it is layered over
+        (or `config`), is changed.
+        """
+        parent = config._version if self.parent is None else self.parent.version
+        return self._version + parent
+
+    def remove(self, table, key):
+        """
+        Remove a keyword from one of the tables. (Adding it again restores it.)
+        """
+        layer = getattr(self, table)
+        if table in DICT_TABLES:
+            dict.pop(layer, key, None)
+        else:
+            layer[:] = [k for k in layer if k != key]
+        self.removed[table].add(key)
+        self._touch()
+
+    def get(self, table, key, default=None):
+        """
+        :return: the value of a keyword in a dict table (or for a list table,
+            the keyword itself, if it is there), as layered; or `default`.
+        """
+        d = self
+        while d is not None:
+            layer = getattr(d, table)
+            if key in layer:
+                return layer[key] if table in DICT_TABLES else key
+            if key in d.removed[table]:
+                return default
+            d = d.parent
+        base = v2t.keyword_table(table)
+        if table in DICT_TABLES:
+            return base.get(key, default)
+        return key if key in base else default
+
+    def merged(self, table):
+        """
+        :return: a table as layered, as a new dict or list.
+        """
+        base = v2t.keyword_table(table) if self.parent is None else self.parent.merged(table)
+        layer = getattr(self, table)
+        removed = self.removed[table]
+        if table in DICT_TABLES:
+            out = {k: v for k, v in base.items() if k not in removed}
+            out.update(layer)
+            return out
+        seen = set(layer)
+        return [k for k in base if k not in removed and k not in seen] + list(dict.fromkeys(layer))
+
+    def changes(self):
+        """
+        :return: dict mapping the name of each table to the set of the keywords
+            this dialect adds, replaces or removes in it.
+        """
+        return {table: set(getattr(self, table)) | self.removed[table] for table in TABLES}
@@ -6,7 +6,9 @@ Processing whole documents.
 """
 
 import re
+from itertools import accumulate, chain
 
+from vertex2tex import profiling
 from vertex2tex.excep import *
 from vertex2tex.v2t import translate_snippet
 
@@ -53,21 +55,157 @@ class Segment:
         s += repr(self.string)
         return s
 
+def advance(line, column, s):
+    """
+    :return: the (line, column) reached by reading the string s, starting
+        from the given line and column.
+    """
+    n = s.count('\n')
+    if n:
+        return line + n, len(s) - s.rfind('\n')
+    return line, column + len(s)
+
+# Math environments, and verbatim environments, by default.
+MATH_ENVIRONMENTS = (
+    'equation', 'equation*', 'align', 'align*', 'gather', 'gather*',
+    'multline', 'multline*',
+)
+VERBATIM_ENVIRONMENTS = ('verbatim', 'verbatim*')
+
+class BoundaryScanner:
+    r"""
+    Finds the boundaries of the math modes in a document, in a single pass.
+
+    The math modes are $...$, $$...$$, \[...\] and \(...\), and the given
+    math environments, like \begin{equation}...\end{equation}. Each math
+    mode ends only with the boundary that matches the one that began it.
+
+    Outside of math modes, % comments, the given verbatim environments, and
+    (if there are any verbatim environments) \verb|...|, are skipped, so that
+    no boundaries are found in them.
+    """
+
+    def __init__(self, math_environments=MATH_ENVIRONMENTS,
+                 verbatim_environments=VERBATIM_ENVIRONMENTS, comments=True):
+        self.math_environments = tuple(math_environments)
+        self.verbatim_environments = tuple(verbatim_environments)
+        self.comments = comments
+        self.closers = {
+            '$': re.compile(r'\$(?<!\\\$)'),
+            '$$': re.compile(r'\$(?<!\\\$)\$'),
+            '\\[': re.compile(r'\\(?<!\\\\)\]'),
+            '\\(': re.compile(r'\\(?<!\\\\)\)'),
+        }
+        for env in self.math_environments:
+            self.closers['\\begin{%s}' % env] = re.compile(re.escape('\\end{%s}' % env))
+        # Each alternative begins with a literal, so that the regex engine can
+        # skip quickly from one candidate to the next, and only then looks
+        # behind it. (Named groups would keep the regex engine from
+        # skipping quickly to candidates, so the kind of each match is told
+        # from its text instead.)
+        alternatives = [r'\$(?<!\\\$)\$?', r'\\(?<!\\\\)[\[(]']
+        envs = self.math_environments + self.verbatim_environments
+        if envs:
+            alternatives.append(r'\\begin\{(?:%s)\}' % '|'.join(map(re.escape, envs)))
+        if comments:
+            alternatives.append(r'%(?<!\\%)')
+        if self.verbatim_environments:
+            alternatives.append(r'\\verb\*?[^\sa-zA-Z*]')
+        self.text_re = re.compile('|'.join(alternatives))
+        self.verbatim_ends = {'\\begin{%s}' % env: '\\end{%s}' % env for env in self.verbatim_environments}
+        # No boundary, comment, or verbatim can begin farther than this from
+        # the end of a text, and still be cut off by it.
+        self.overlap = max([len(k) for k in self.closers] +
+                           [len('\\begin{%s}' % env) for env in self.verbatim_environments] +
+                           [len('\\verb*|')])
+
+    def search(self, text, pos, closer=None, final=True):
+        """
+        Find the next boundary in a text, at or after a given offset.
+
+        :param text: The text.
+        :param pos: The offset, which must be outside of any comment or
+            verbatim, and at the start of, or inside, a math mode or the text
+            between math modes.
+        :param closer: None outside of math modes; inside, the state that was
+            returned with the boundary that began the math mode.
+        :param final: False if more of the document may follow the text.
+        :return: triple (start, end, state) for the boundary that was found,
+            where state is to be passed as `closer` to find the next one; or
+            else pair (None, safe) if there is none, where safe is the offset
+            before which none can begin, even if more of the document follows.
+        """
+        n = len(text)
+        if closer is not None:
+            m = closer.search(text, pos)
+            if m is None:
+                return None, max(pos, n - self.overlap)
+            return m.start(), m.end(), None
+        search = self.text_re.search
+        while True:
+            m = search(text, pos)
+            if m is None:
+                return None, max(pos, n - self.overlap)
+            T = m.group()
+            state = self.closers.get(T)
+            if state is not None:
+                if m.end() == n and not final:
+                    # A "$" might be the first half of "$$".
+                    return None, m.start()
+                return m.start(), m.end(), state
+            if T == '%':
+                end = text.find('\n', m.end())
+            elif T in self.verbatim_ends:
+                E = self.verbatim_ends[T]
+                end = text.find(E, m.end())
+                if end >= 0:
+                    end += len(E)
+            else:
+                # \verb, which must end on the same line.
+                eol = text.find('\n', m.end())
+                end = text.find(T[-1], m.end(), n if eol < 0 else eol)
+                if end >= 0:
+                    end += 1
+                elif eol >= 0 or final:
+                    # Not \verb after all.
+                    end = m.end()
+            if end < 0:
+                # The comment or verbatim runs to the end of the text.
+                return None, n if final else m.start()
+            pos = end
+
+    def finditer(self, text, pos=0):
+        """
+        :return: generator of the spans (start, end) of the boundaries in a
+            whole text, beginning outside of any math mode at `pos`.
+        """
+        closer = None
+        while True:
+            r = self.search(text, pos, closer)
+            if r[0] is None:
+                return
+            a, pos, closer = r
+            yield a, pos
+
+default_scanner = BoundaryScanner()
+
 class SegmentStream:
     """
     SegmentStream lexes a given document into alternating
     text and boundary segments, and then serves as a stream from
     which the segments can be requested, one after another.
+
+    The document is lexed lazily, as the segments are requested, and
+    iterating over the stream yields the segments that remain.
+
+    The boundaries are found by a BoundaryScanner (by default, `default_scanner`),
+    so that the contents of the math modes are the segments of index 2 mod 4.
     """
 
-    def __init__(self, text):
-        self.text = text
+    def __init__(self, text, scanner=None):
         #You pass the text to be parsed.
-        bd = re.compile( # 'bd' is for 'boundary'
-            r'((?<!\\)\$\$|(?<!\\)\$|'+ # $$ or $ (but not when escaped)
-            r'(?<!\\)\\\[|(?<!\\)\\\])' # \[ or \]
-        )
-        self.segs = bd.split(text)
+        self.text = text
+        self.scanner = scanner or default_scanner
         self.reset()
 
     def reset(self):
@@ -75,67 +213,252 @@ class SegmentStream:
         self.line = 1
         self.column = 1
         self.nexttype = Segment.TEXT
+        # Number of segments served so far.
         self.ptr = 0
+        self.segments = self.lex()
 
-    def getTextPos(self):
-        return (self.line, self.column)
+    def lex(self):
+        """
+        Generate the segments in turn, beginning and ending with a text segment.
+        """
+        text = self.text
+        pos = 0
+        for a, b in self.scanner.finditer(text):
+            yield self.serve(text[pos:a])
+            yield self.serve(text[a:b])
+            pos = b
+        yield self.serve(text[pos:])
 
-    def next(self):
-        # If there are no segments left, return 'None'
-        if self.ptr >= len(self.segs): return None
-        # Get next type and segment.
-        nt = self.nexttype
-        ns = self.segs[self.ptr]
+    def serve(self, ns):
         # Build Segment object
+        nt = self.nexttype
         seg = Segment(self.line, self.column, nt, ns)
         # Advance type and pointer
         self.nexttype = Segment.BDRY if nt == Segment.TEXT else Segment.TEXT
         self.ptr += 1
         # Update line and column numbers
-        lines = ns.split('\n')
-        y = len(lines)-1
-        if y > 0:
-            self.line += y
-            self.column = len(lines[-1])
-        else:
-            self.column += len(ns)
-        # Return the Segment
+        self.line, self.column = advance(self.line, self.column, ns)
         return seg
 
-def translate_document(text, keychar="@"):
+    def getTextPos(self):
+        return (self.line, self.column)
+
+    def next(self):
+        # If there are no segments left, return 'None'
+        return next(self.segments, None)
+
+    def __iter__(self):
+        return self.segments
+
+def translate_math(opener, text, keychar, dialect=None):
+    """
+    Translate the contents of a math mode.
+
+    The contents of an environment are usually set on lines of their own, so
+    the whitespace around them is kept as it is, and the keychar looked for
+    inside it.
+
+    :param opener: The boundary that began the math mode.
+    :param text: The contents of the math mode.
+    :param keychar: As for `translate_snippet`.
+    :param dialect: As for `translate_snippet`.
+    :return: The translated text.
+    """
+    if not opener.startswith('\\begin'):
+        return translate_snippet(text, keychar=keychar, dialect=dialect)
+    core = text.strip()
+    if not core:
+        return text
+    lead = len(text) - len(text.lstrip())
+    try:
+        out = translate_snippet(core, keychar=keychar, dialect=dialect)
+    except VerTeXError as ve:
+        ve.shift_span(lead)
+        raise ve
+    return text[:lead] + out + text[lead + len(core):]
+
+def translate_document(text, keychar="@", scanner=None, dialect=None, source_map=False):
     r"""
     Process an entire document, translating from VerTeX to TeX, discovering math modes, and optionally
     checking for a keychar.
 
     NB: Nested math modes are not handled!
-        We only handle $...$, $$...$$, and \[...\] math modes, with no others nested inside them.
+        We handle $...$, $$...$$, \[...\] and \(...\) math modes, and math environments
+        like \begin{equation}...\end{equation}, with no others nested inside them.
+        See `BoundaryScanner`.
 
     :param text: The text to be processed.
     :param keychar: Must be either None or a single character (but not $ or \).
                     Pass None if you want VerTeX to be applied to all text occurring within math modes.
                     Otherwise VerTeX is applied only when the text within the math mode
                     begins or ends with the keychar (or both).
-    :return: The text of the translated document.
+    :param scanner: The BoundaryScanner that finds the math modes. By default,
+                    `default_scanner`.
+    :param dialect: A `dialect.Dialect`, to translate by its keyword tables
+                    instead of those of `config`.
+    :param source_map: Whether to return a `sourcemap.SourceMap` as well.
+    :return: The text of the translated document; or if source_map is true,
+             the pair (text, SourceMap).
     """
     if keychar is not None:
         assert len(keychar) == 1
         assert keychar not in r'\$'
-    segs = SegmentStream(text)
-    out = ''
-    n = 0
-    seg = segs.next()
-    while seg:
+    segs = SegmentStream(text, scanner)
+    smap = None
+    if source_map:
+        from vertex2tex.sourcemap import SourceMap
+        smap = SourceMap()
+    prof = profiling.active
+    if prof is None:
+        out = _translate_segments(segs, keychar, dialect, smap)
+    else:
+        t0 = profiling.clock()
+        try:
+            out = _translate_segments(profiling.timed_iter(prof, 'lex', segs), keychar, dialect, smap)
+        finally:
+            prof.stage('translate_document', profiling.clock() - t0)
+    return out if smap is None else (out, smap)
+
+def _translate_segments(segs, keychar, dialect=None, smap=None):
+    """
+    :param segs: iterable of the Segments of a document, as SegmentStream gives them.
+    :param keychar, dialect: As for `translate_document`.
+    :param smap: A SourceMap, to which to add the runs of the document, or None.
+    :return: The text of the translated document.
+    """
+    out = []
+    # Where the math modes are in `out`, and their lengths in the source.
+    math = [] if smap is not None else None
+    for n, seg in enumerate(segs):
         t = seg.getStr()
         # Math mode contents occur precisely on the segments of index 2 mod 4.
-        if n == 2 and t:
+        if n % 4 == 1:
+            opener = t
+        elif n % 4 == 2 and t:
+            if math is not None:
+                math.append((len(out), len(t)))
+            try:
+                t = translate_math(opener, t, keychar, dialect)
+            except VerTeXError as ve:
+                # Note the segment where the error occurred, and re-raise.
+                ve.set_segment(seg)
+                raise ve
+        out.append(t)
+    if smap is not None:
+        # All else is copied.
+        ends = list(accumulate(map(len, out), initial=0))
+        p = 0
+        for i, a in math:
+            smap.add(ends[i] - p, ends[i] - p)
+            smap.add(a, ends[i + 1] - ends[i])
+            p = ends[i + 1]
+        smap.add(ends[-1] - p, ends[-1] - p)
+    return ''.join(out)
+
+
+def lex_chunks(chunks, scanner=None):
+    """
+    Lex a document, which arrives as a sequence of strings, into alternating
+    text and boundary segments, as SegmentStream does, but without ever holding
+    more of the document than the current math mode (or comment, or verbatim).
+
+    Boundaries that are split across chunks, or whose escaping backslash ends
+    the previous chunk, are recognized just as in the whole text. Text outside
+    math modes may be delivered in several consecutive text Segments.
+
+    :param chunks: iterable of strings.
+    :param scanner: The BoundaryScanner that finds the math modes. By default,
+        `default_scanner`.
+    :return: generator of Segments.
+    """
+    search = (scanner or default_scanner).search
+    buf = ''
+    pos = 0    # where the unconsumed text begins in buf
+    scan = 0   # where to resume searching for a boundary
+    closer = None  # the state of the scanner, which is None outside math modes
+    line, col = 1, 1
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        if not final:
+            if not chunk:
+                continue
+            # Keep one character before pos, for the lookbehind.
+            if pos > 1:
+                buf = buf[pos - 1:]
+                scan -= pos - 1
+                pos = 1
+            buf += chunk
+        while True:
+            r = search(buf, scan, closer, final)
+            if r[0] is None:
+                break
+            a, b, closer = r
+            for T, S in [(Segment.TEXT, buf[pos:a]), (Segment.BDRY, buf[a:b])]:
+                yield Segment(line, col, T, S)
+                line, col = advance(line, col, S)
+            pos = scan = b
+        if final:
+            yield Segment(line, col, Segment.TEXT, buf[pos:])
+            return
+        # Nothing before this can still turn out to be part of a boundary.
+        end = r[1]
+        scan = max(scan, end)
+        if closer is None and end > pos:
+            S = buf[pos:end]
+            yield Segment(line, col, Segment.TEXT, S)
+            line, col = advance(line, col, S)
+            pos = end
+
+def translate_stream(source, keychar="@", chunk_size=65536, scanner=None, dialect=None):
+    r"""
+    Translate a document piece by piece, as it is read, yielding the
+    translated document piece by piece. Only one math mode at a time is held
+    in memory, so arbitrarily large inputs can be piped through.
+
+    Joining the output gives the same as `translate_document` would on the
+    whole text.
+
+    :param source: A text file object, a string, or an iterable of strings.
+    :param keychar: As for `translate_document`.
+    :param chunk_size: How many characters to read from a file at a time.
+                    The output is also yielded in pieces of about this size.
+    :param scanner: As for `translate_document`.
+    :param dialect: As for `translate_document`.
+    :return: generator of strings.
+    """
+    if keychar is not None:
+        assert len(keychar) == 1
+        assert keychar not in r'\$'
+    if isinstance(source, str):
+        chunks = [source]
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), '')
+    else:
+        chunks = source
+    out = []
+    size = 0
+    math = False
+    segs = lex_chunks(chunks, scanner)
+    prof = profiling.active
+    if prof is not None:
+        segs = profiling.timed_iter(prof, 'lex', segs)
+    for seg in segs:
+        t = seg.getStr()
+        if seg.getType() == Segment.BDRY:
+            math = not math
+            opener = t
+        elif math and t:
             try:
-                t = translate_snippet(t, keychar=keychar)
+                t = translate_math(opener, t, keychar, dialect)
             except VerTeXError as ve:
                 # Note the segment where the error occurred, and re-raise.
                 ve.set_segment(seg)
                 raise ve
-        out += t
-        # Increment n mod 4, and get next segment.
-        n = (n + 1) % 4
-        seg = segs.next()
-    return out
+        out.append(t)
+        size += len(t)
+        if size >= chunk_size:
+            yield ''.join(out)
+            out = []
+            size = 0
+    if out:
+        yield ''.join(out)
@@ -6,6 +6,50 @@ class VerTeXError(Exception):
     def __init__(self, msg):
         self.msg = msg
         self.segment = None
+        self.filename = None
+        # Offsets (start, end) of the fault in the snippet, if known.
+        self.span = None
 
     def set_segment(self, seg):
         self.segment = seg
+
+    def set_filename(self, filename):
+        self.filename = filename
+
+    def set_span(self, span):
+        self.span = span
+
+    def shift_span(self, d):
+        if self.span is not None:
+            self.span = (self.span[0] + d, self.span[1] + d)
+
+    def position(self):
+        """
+        :return: pair (line, column) where the error occurred, or None if
+            the segment is not known. This is the start of the segment,
+            advanced to the span within it, if that is known.
+        """
+        if self.segment is None:
+            return None
+        line, col = self.segment.getLine(), self.segment.getCol()
+        if self.span is not None:
+            prefix = self.segment.getStr()[:self.span[0]]
+            n = prefix.count('\n')
+            if n:
+                line += n
+                col = len(prefix) - prefix.rfind('\n')
+            else:
+                col += len(prefix)
+        return line, col
+
+    def __reduce__(self):
+        # So that errors raised in worker processes arrive with their location.
+        return (self.__class__, (self.msg,), self.__dict__)
+
+    def __str__(self):
+        where = []
+        if self.filename is not None:
+            where.append(str(self.filename))
+        if self.segment is not None:
+            where += [str(n) for n in self.position()]
+        return ': '.join([':'.join(where), self.msg]) if where else self.msg
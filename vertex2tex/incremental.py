@@ -0,0 +1,428 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Keeping a document translated while it is being edited.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from vertex2tex.excep import *
+from vertex2tex.document import Segment, advance, default_scanner, translate_math
+
+# Block size for finding where two texts begin and end to differ.
+BLOCK = 4096
+
+# How far past an edit to read at first, to lex it again.
+READ_AHEAD = 256
+
+# Number of segments in a block of `Offsets`.
+BLOCK_SEGMENTS = 64
+
+
+def common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i + BLOCK <= n and a[i:i + BLOCK] == b[i:i + BLOCK]:
+        i += BLOCK
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix(a, b, limit):
+    """
+    Length of the common suffix of a and b, but no longer than `limit`.
+    """
+    n = min(len(a), len(b), limit)
+    i = 0
+    while i + BLOCK <= n and a[len(a) - i - BLOCK:len(a) - i] == b[len(b) - i - BLOCK:len(b) - i]:
+        i += BLOCK
+    while i < n and a[-i - 1] == b[-i - 1]:
+        i += 1
+    return i
+
+
+class Fenwick:
+    """
+    Prefix sums of a list of numbers, which stay up to date as the numbers
+    change, at a cost logarithmic in their number (a Fenwick tree).
+    """
+
+    def __init__(self, values):
+        t = [0]
+        t.extend(values)
+        n = len(t)
+        for i in range(1, n):
+            j = i + (i & -i)
+            if j < n:
+                t[j] += t[i]
+        self.t = t
+
+    def add(self, i, d):
+        """
+        Add d to the number of index i.
+        """
+        t = self.t
+        i += 1
+        while i < len(t):
+            t[i] += d
+            i += i & -i
+
+    def prefix(self, i):
+        """
+        :return: the sum of the first i numbers.
+        """
+        t = self.t
+        s = 0
+        while i:
+            s += t[i]
+            i &= i - 1
+        return s
+
+    def search(self, p):
+        """
+        :return: the greatest i such that the sum of the first i numbers is at
+            most p, for numbers that are not negative.
+        """
+        t = self.t
+        n = len(t)
+        i = 0
+        step = 1 << (n - 1).bit_length()
+        while step:
+            j = i + step
+            if j < n and t[j] <= p:
+                i = j
+                p -= t[j]
+            step >>= 1
+        return i
+
+
+class Offsets:
+    """
+    The offsets at which the segments of a text begin, kept up to date as
+    segments are replaced, at a cost logarithmic in the number of segments.
+
+    The lengths of the segments are kept in blocks of about `BLOCK_SEGMENTS`,
+    with a Fenwick tree of the number of segments in each block, and one of
+    their total length. A block that grows to twice that size is split, by
+    building everything again, which is rare enough to cost little on average.
+    """
+
+    def __init__(self, lengths):
+        self._build(list(lengths))
+
+    def _build(self, lengths):
+        B = BLOCK_SEGMENTS
+        self.blocks = [lengths[k:k + B] for k in range(0, len(lengths), B)] or [[]]
+        self.counts = Fenwick(map(len, self.blocks))
+        self.sums = Fenwick(map(sum, self.blocks))
+        self.n = len(lengths)
+
+    def __len__(self):
+        return self.n
+
+    def _locate(self, i):
+        """
+        :return: pair (block, index in the block) of the segment of index i.
+        """
+        b = self.counts.search(i)
+        if b == len(self.blocks):
+            b -= 1
+            return b, len(self.blocks[b])
+        return b, i - self.counts.prefix(b)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.n
+        b, k = self._locate(i)
+        return self.sums.prefix(b) + sum(self.blocks[b][:k])
+
+    def _offsets(self, b):
+        """
+        :return: list of the offsets in block b.
+        """
+        return list(accumulate(self.blocks[b][:-1], initial=self.sums.prefix(b)))
+
+    def find(self, p):
+        """
+        :return: pair (index, offset) of the last segment that begins at or
+            before p.
+        """
+        # Every block before block b ends at or before p; block b ends after.
+        b = self.sums.search(p)
+        if b == len(self.blocks):
+            return self.n - 1, self[self.n - 1]
+        offsets = self._offsets(b)
+        k = bisect_right(offsets, p) - 1
+        return self.counts.prefix(b) + k, offsets[k]
+
+    def bisect_right(self, p):
+        """
+        :return: the number of offsets at most p.
+        """
+        return self.find(p)[0] + 1
+
+    def bisect_left(self, p):
+        """
+        :return: the number of offsets less than p.
+        """
+        # Every block before block b ends before p; block b ends at or after.
+        b = self.sums.search(p - 1)
+        n = self.counts.prefix(b)
+        if b < len(self.blocks):
+            n += bisect_left(self._offsets(b), p)
+        return n
+
+    def replace(self, i, j, lengths):
+        """
+        Replace the segments from i to j by segments of the given lengths.
+        """
+        lengths = list(lengths)
+        blocks, counts, sums = self.blocks, self.counts, self.sums
+        b, k = self._locate(i)
+        # Remove the old segments, from as many blocks as they span.
+        removed = j - i
+        c = b
+        while removed:
+            block = blocks[c]
+            cut = block[k:k + removed]
+            if cut:
+                del block[k:k + len(cut)]
+                counts.add(c, -len(cut))
+                sums.add(c, -sum(cut))
+                removed -= len(cut)
+            c += 1
+            k = 0
+        block = blocks[b]
+        k = i - counts.prefix(b)
+        block[k:k] = lengths
+        counts.add(b, len(lengths))
+        sums.add(b, sum(lengths))
+        self.n += len(lengths) - (j - i)
+        if len(block) > 2 * BLOCK_SEGMENTS:
+            self._build([x for block in blocks for x in block])
+
+
+class IncrementalDocument:
+    """
+    A document, together with its translation, which can be updated after
+    each edit at a cost proportional to the edit, rather than to the document.
+
+    The document is kept as the list of its segments (alternating text and
+    boundary segments, as from SegmentStream) along with the translation of
+    each. After an edit, only the segments around it are lexed again, until
+    the boundaries fall back in step with the old ones, and only those math
+    segments whose content is new are translated again. The lists are spliced
+    in place, and the offsets of the segments are kept in `Offsets`. The text
+    and the output are joined only when they are asked for.
+
+    The math modes are found by `scanner`, and translated in `dialect`, as in
+    `translate_document`.
+    """
+
+    def __init__(self, text='', keychar="@", scanner=None, dialect=None):
+        if keychar is not None:
+            assert len(keychar) == 1
+            assert keychar not in r'\$'
+        self.keychar = keychar
+        self.dialect = dialect
+        self.scanner = scanner or default_scanner
+        self.segs = ['']   # strings of the segments; even indices are text
+        self.outs = ['']   # translations of the segments
+        self.starts = Offsets([0])  # offsets of the segments in the text
+        self.out_starts = Offsets([0])
+        self.length = 0
+        self.out_len = 0
+        self._text = ''
+        self._output = ''
+        self.update(text)
+
+    @property
+    def text(self):
+        """
+        The text of the document, joined on demand.
+        """
+        if self._text is None:
+            self._text = ''.join(self.segs)
+        return self._text
+
+    @property
+    def output(self):
+        """
+        The translation of the document, joined on demand.
+        """
+        if self._output is None:
+            self._output = ''.join(self.outs)
+        return self._output
+
+    def update(self, text):
+        """
+        Replace the text of the document.
+
+        :return: list of the spans (start, end) in the new output that
+            were rewritten.
+        """
+        old = self.text
+        a = common_prefix(old, text)
+        s = common_suffix(old, text, min(len(old), len(text)) - a)
+        spans = self._apply(a, len(old) - s, text[a:len(text) - s])
+        self._text = text
+        return spans
+
+    def edit(self, start, end, replacement):
+        """
+        Replace the characters from `start` to `end` in the text by `replacement`.
+
+        :return: as for `update`.
+        """
+        return self._apply(start, end, replacement)
+
+    def _slice(self, start, end):
+        """
+        :return: the text from `start` to `end`, joined from the segments.
+        """
+        if self._text is not None:
+            return self._text[start:end]
+        segs = self.segs
+        i, s0 = self.starts.find(start)
+        parts = []
+        while start < end:
+            S = segs[i]
+            parts.append(S[start - s0:end - s0])
+            s0 += len(S)
+            start = s0
+            i += 1
+        return ''.join(parts)
+
+    def _line_start(self, a):
+        """
+        :return: the offset of the start of the line of offset `a`.
+        """
+        if self._text is not None:
+            return self._text.rfind('\n', 0, a) + 1
+        segs = self.segs
+        i, s0 = self.starts.find(a)
+        n = segs[i].rfind('\n', 0, a - s0)
+        while n < 0 and i > 0:
+            i -= 1
+            s0 -= len(segs[i])
+            n = segs[i].rfind('\n')
+        return s0 + n + 1 if n >= 0 else 0
+
+    def _apply(self, a, old_end, replacement):
+        # The old text from a to old_end has become `replacement`.
+        new_end = a + len(replacement)
+        delta = new_end - old_end
+        segs, starts = self.segs, self.starts
+        # Lex again from the start of a text segment outside of math modes,
+        # where the scanner can begin, and from before the boundary preceding
+        # the edit (which may change by the edit).
+        p = a
+        if self.scanner.verbatim_environments:
+            # A \verb before the edit, on its line, that did not close may close
+            # now (or one that did may not), changing the boundaries after it.
+            b = self._line_start(a)
+            n = self._slice(b, a).find('\\verb')
+            if n >= 0:
+                p = b + n
+        i = starts.find(p)[0]
+        i0 = max(0, (i - 2) & ~3)
+        pos = starts[i0]
+
+        # The new text is lexed from `chunk`, which begins at `base` (a
+        # character early, for the scanner to look behind), and is extended
+        # from the old text past the edit, as far as the scanner needs.
+        base = max(0, pos - 1)
+        stop = min(self.length, old_end + READ_AHEAD)
+        chunk = self._slice(base, a) + replacement + self._slice(old_end, stop)
+        search = self.scanner.search
+        window = []
+        resume = len(segs)
+        n = pos - base
+        closer = None
+        while True:
+            r = search(chunk, n, closer, stop == self.length)
+            if r[0] is None:
+                if stop == self.length:
+                    window.append(chunk[n:])
+                    break
+                end = min(self.length, stop + len(chunk))
+                chunk += self._slice(stop, end)
+                stop = end
+                continue
+            m0, m1, state = r
+            B = chunk[m0:m1]
+            if base + m0 > new_end:
+                # Past the edit: is there the same boundary, in the same place,
+                # and at the same parity, among the old segments? If so, the
+                # scanner is in the same state after it, as it was before.
+                j = i0 + len(window) + 1
+                q = base + m0 - delta
+                # The old segments that begin at q are those from k to h.
+                k, h = starts.bisect_left(q), starts.bisect_right(q)
+                while k < h and not segs[k]:
+                    k += 1
+                if k < h and (k - j) % 4 == 0 and segs[k] == B:
+                    window.append(chunk[n:m0])
+                    resume = k
+                    break
+            window.append(chunk[n:m0])
+            window.append(B)
+            n, closer = m1, state
+
+        # Translate the new math segments, reusing the translations of the
+        # old segments that were lexed again.
+        known = {(segs[n - 1], segs[n]): self.outs[n] for n in range(i0, resume) if n % 4 == 2}
+        outs = []
+        for n, S in enumerate(window):
+            # (As i0 is a multiple of 4, a math segment follows its opener here.)
+            if (i0 + n) % 4 == 2 and S:
+                T = known.get((window[n - 1], S))
+                if T is None:
+                    T = self._translate(window[n - 1], S, pos, window[:n])
+            else:
+                T = S
+            outs.append(T)
+
+        out_start = self.out_starts[i0]
+        old_out_end = self.out_starts[resume] if resume < len(segs) else self.out_len
+        out_delta = sum(map(len, outs)) - (old_out_end - out_start)
+        starts.replace(i0, resume, map(len, window))
+        self.out_starts.replace(i0, resume, map(len, outs))
+        segs[i0:resume] = window
+        self.outs[i0:resume] = outs
+        self.length += delta
+        self.out_len += out_delta
+        self._text = None
+        self._output = None
+
+        spans = []
+        for T in outs:
+            spans.append((out_start, out_start + len(T)))
+            out_start += len(T)
+        return spans
+
+    def source_map(self):
+        """
+        :return: the `sourcemap.SourceMap` from the output to the text.
+        """
+        from vertex2tex.sourcemap import SourceMap
+        smap = SourceMap()
+        for S, T in zip(self.segs, self.outs):
+            smap.add(len(S), len(T))
+        return smap
+
+    def _translate(self, opener, S, pos, before):
+        """
+        Translate a math segment, which is preceded in the new text by the
+        old text up to `pos`, and then by the segments `before`.
+        """
+        try:
+            return translate_math(opener, S, self.keychar, self.dialect)
+        except VerTeXError as ve:
+            line, col = advance(1, 1, self._slice(0, pos))
+            line, col = advance(line, col, ''.join(before))
+            ve.set_segment(Segment(line, col, Segment.TEXT, S))
+            raise ve
@@ -0,0 +1,139 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Counting calls, and the time they take, per stage of translation and per
+kind of keyword.
+
+Profiling is off unless a Profiler is active, and then each point where it
+would record something costs only a test:
+
+    with Profiler() as prof:
+        translate_document(text)
+    print(prof.to_json())
+
+The stages are:
+
+    translate_document  translating whole documents
+    lex                 finding the math modes in documents (a call per segment)
+    translate_snippet   translating snippets not found in the memory cache
+    disk_cache          looking them up in, and adding them to, the disk cache
+    tokenize            tokenizing snippets
+    xlat                translating the tokens
+    autosub             making automatic subscripts not found in their cache
+    compress            calls to `compress`
+
+A stage may run inside another one (all but the first two inside
+translate_snippet, for example), and its time is counted in both.
+
+The kinds are the kinds of keyword (html, unary, binary, tertiary, range,
+special, builtin, bsme, fontword) and autosub, the automatically subscripted
+names. For each of them, the count is of the tokens of that kind that were
+translated. The time is that spent on them: for bracket words (unary, binary,
+tertiary, range and special), from the keyword to the closing word, including
+any bracket words nested inside; for autosub, in looking up or making the
+subscripts. Other kinds are only looked up in the dispatch index, and are
+given no time.
+
+Only the translations made in this process are recorded, and not those made
+by worker processes (as with `translate_snippets(jobs=...)` or `batch`).
+"""
+
+import time
+
+# The active Profiler, or None.
+active = None
+
+clock = time.perf_counter
+
+
+class Profiler:
+    """
+    Records counts and times while it is active. Use it as a context manager,
+    or call `start` and `stop`. Profilers may be nested: while one is active,
+    the one that was active before records nothing.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.kinds = {}
+        self.previous = None
+
+    def start(self):
+        global active
+        self.previous = active
+        active = self
+        return self
+
+    def stop(self):
+        global active
+        active = self.previous
+        self.previous = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stage(self, name, seconds):
+        """
+        Record a call to a stage.
+        """
+        rec = self.stages.get(name)
+        if rec is None:
+            rec = self.stages[name] = [0, 0.0]
+        rec[0] += 1
+        rec[1] += seconds
+
+    def kind(self, name, seconds=0.0):
+        """
+        Record a token of a kind.
+        """
+        rec = self.kinds.get(name)
+        if rec is None:
+            rec = self.kinds[name] = [0, 0.0]
+        rec[0] += 1
+        rec[1] += seconds
+
+    def reset(self):
+        self.stages.clear()
+        self.kinds.clear()
+
+    def stats(self):
+        """
+        :return: dict with keys 'stages' and 'kinds', each mapping names to
+            dicts giving the number of 'calls' and the total 'seconds'.
+        """
+        return {
+            table: {name: {'calls': n, 'seconds': t} for name, (n, t) in sorted(recs.items())}
+            for table, recs in [('stages', self.stages), ('kinds', self.kinds)]
+        }
+
+    def to_json(self, **kwargs):
+        """
+        :param kwargs: passed to `json.dumps`.
+        :return: `stats`, as JSON.
+        """
+        import json
+        return json.dumps(self.stats(), **kwargs)
+
+
+def timed_iter(prof, name, it):
+    """
+    Wrap an iterator, recording each step of it as a call to a stage.
+
+    :param prof: the Profiler.
+    :param name: the name of the stage.
+    :param it: the iterator.
+    """
+    it = iter(it)
+    while True:
+        t0 = clock()
+        x = next(it, _END)
+        prof.stage(name, clock() - t0)
+        if x is _END:
+            return
+        yield x
+
+_END = object()
@@ -0,0 +1,275 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+A resident translation server, which keeps the keyword tables compiled and
+the caches warm between requests, for editors and build tools that would
+otherwise start a new process for each one.
+
+It listens on a Unix socket, or a port on localhost, and speaks the protocol
+described in `client`. Connections are served concurrently, each answering
+its requests in turn; translation runs on an `aio.Translator`, so identical
+requests from several connections are translated once.
+
+    vertex2tex-server [--address ADDRESS] [--jobs N] [--cache-dir DIR]
+
+or from Python, `asyncio.run(Server().serve(address))`.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+
+from vertex2tex import v2t
+from vertex2tex.aio import Translator
+from vertex2tex.client import (
+    ADDRESS_VAR, HEADER, MAX_MESSAGE, decode, default_address, encode, parse_address,
+)
+from vertex2tex.excep import *
+
+
+class BadRequest(Exception):
+    pass
+
+
+def check_keychar(keychar):
+    if keychar is not None and (not isinstance(keychar, str) or len(keychar) != 1
+                                or keychar in '\\$'):
+        raise BadRequest('keychar must be null, or a single character, other than $ or \\')
+    return keychar
+
+
+def check_str(value, name):
+    if not isinstance(value, str):
+        raise BadRequest('%s must be a string' % name)
+    return value
+
+
+class Server:
+    """
+    Serves translation requests, and keeps count of them.
+    """
+
+    def __init__(self, translator=None):
+        """
+        :param translator: the `aio.Translator` on which to translate. By
+            default, one of its own.
+        """
+        self.translator = translator or Translator()
+        self.started = time.time()
+        self.connections = 0
+        self.open_connections = 0
+        self.errors = 0
+        # Per operation: number of requests, and seconds spent answering them.
+        self.ops = {}
+        self.stopping = None
+        self.writers = set()
+
+    def stats(self):
+        """
+        :return: dict of the statistics of the server, its translator, and
+            its caches.
+        """
+        out = {
+            'uptime': time.time() - self.started,
+            'connections': self.connections,
+            'open_connections': self.open_connections,
+            'errors': self.errors,
+            'ops': {op: {'calls': n, 'seconds': t} for op, (n, t) in sorted(self.ops.items())},
+            'translator': self.translator.stats(),
+            'snippet_cache': v2t.snippet_cache.stats(),
+        }
+        if v2t.disk_cache is not None:
+            out['disk_cache'] = v2t.disk_cache.stats()
+        return out
+
+    async def answer(self, request):
+        """
+        :return: the result of a request.
+        :raises VerTeXError: if the translation failed.
+        :raises BadRequest: if the request was malformed.
+        """
+        op = request.get('op')
+        tr = self.translator
+        if op == 'translate_snippet':
+            return await tr.translate_snippet(check_str(request.get('text'), 'text'),
+                                              keychar=check_keychar(request.get('keychar')))
+        elif op == 'translate_snippets':
+            snippets = request.get('snippets')
+            if not isinstance(snippets, list):
+                raise BadRequest('snippets must be a list')
+            return await tr.translate_snippets([check_str(s, 'snippet') for s in snippets],
+                                               keychar=check_keychar(request.get('keychar')))
+        elif op == 'translate_document':
+            return await tr.translate_document(check_str(request.get('text'), 'text'),
+                                               keychar=check_keychar(request.get('keychar', '@')))
+        elif op == 'stats':
+            return self.stats()
+        elif op == 'ping':
+            return 'pong'
+        elif op == 'shutdown':
+            self.stopping.set()
+            return None
+        raise BadRequest('unknown op: %r' % (op,))
+
+    async def handle(self, reader, writer):
+        """
+        Serve one connection, until it is closed.
+        """
+        self.connections += 1
+        self.open_connections += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                n, = HEADER.unpack(header)
+                if n > MAX_MESSAGE:
+                    self.errors += 1
+                    writer.write(encode({'id': None, 'error': {
+                        'type': 'BadRequest', 'message': 'message too long'}}))
+                    break
+                data = await reader.readexactly(n)
+                writer.write(encode(await self.dispatch(data)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            self.writers.discard(writer)
+            writer.close()
+
+    async def dispatch(self, data):
+        """
+        :return: the answer to a request, as a message.
+        """
+        t0 = time.perf_counter()
+        try:
+            request = decode(data)
+        except ValueError as e:
+            self.errors += 1
+            return {'id': None, 'error': {'type': 'BadRequest', 'message': str(e)}}
+        answer = {'id': request.get('id')}
+        op = request.get('op')
+        try:
+            answer['result'] = await self.answer(request)
+        except VerTeXError as ve:
+            self.errors += 1
+            answer['error'] = {'type': 'VerTeXError', 'message': str(ve), 'span': ve.span,
+                               'position': ve.position()}
+        except BadRequest as e:
+            self.errors += 1
+            answer['error'] = {'type': 'BadRequest', 'message': str(e)}
+        except Exception as e:
+            self.errors += 1
+            answer['error'] = {'type': 'InternalError', 'message': '%s: %s' % (type(e).__name__, e)}
+        if isinstance(op, str):
+            n, t = self.ops.get(op, (0, 0.0))
+            self.ops[op] = (n + 1, t + time.perf_counter() - t0)
+        return answer
+
+    async def serve(self, address=None, ready=None):
+        """
+        Listen at an address, and serve until asked to shut down.
+
+        :param address: as for `client.parse_address`; by default,
+            `client.default_address()`.
+        :param ready: function to call with the address, once listening.
+        """
+        address = address or default_address()
+        family, addr = parse_address(address)
+        self.stopping = asyncio.Event()
+        # Compile the tables now, not on the first request.
+        v2t.sync_tables()
+        if family == socket.AF_UNIX:
+            claim_socket(addr)
+            server = await asyncio.start_unix_server(self.handle, path=addr)
+        else:
+            server = await asyncio.start_server(self.handle, host=addr[0], port=addr[1])
+            if addr[1] == 0:
+                address = '%s:%d' % server.sockets[0].getsockname()[:2]
+        try:
+            async with server:
+                if ready is not None:
+                    ready(address)
+                await self.stopping.wait()
+                # Let the connections go (once they have sent what is written).
+                for writer in list(self.writers):
+                    writer.close()
+        finally:
+            if family == socket.AF_UNIX and os.path.exists(addr):
+                os.unlink(addr)
+            self.translator.close()
+
+
+def claim_socket(path):
+    """
+    Remove a Unix socket left behind by a server that is gone.
+
+    :raises OSError: if a server is listening there.
+    """
+    if not os.path.exists(path):
+        return
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError('a server is already listening at %s' % path)
+    finally:
+        s.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='vertex2tex-server',
+        description='Serve translations from VerTeX to TeX, over a socket '
+                    '(see vertex2tex.client).',
+    )
+    parser.add_argument('--address', default=None,
+                        help='a Unix socket path, or HOST:PORT (default $%s, or %s)' % (
+                            ADDRESS_VAR, default_address()))
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='number of worker processes (default 0: translate on '
+                             'threads of this process, sharing its caches)')
+    parser.add_argument('--max-concurrency', type=int, default=4,
+                        help='translations run at once (default 4)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='keep translated snippets in a cache in this directory')
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help='size to which the cache is bounded (default 256)')
+    args = parser.parse_args(argv)
+    if args.cache_dir:
+        v2t.use_disk_cache(args.cache_dir, max_bytes=args.cache_size << 20)
+    executor = None
+    if args.jobs > 0:
+        from concurrent.futures import ProcessPoolExecutor
+        from vertex2tex.batch import _init_worker
+        dc = v2t.disk_cache
+        initargs = (None, 0) if dc is None else (dc.directory, dc.max_bytes)
+        executor = ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                       initargs=initargs)
+    server = Server(Translator(executor, max_concurrency=args.max_concurrency))
+    def ready(address):
+        print('vertex2tex-server: listening at %s' % address, file=sys.stderr, flush=True)
+    try:
+        asyncio.run(server.serve(args.address, ready))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print('vertex2tex-server: %s' % e, file=sys.stderr)
+        return 2
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Source maps, relating offsets in a translated document to offsets in its
+VerTeX source, so that an error reported by TeX can be traced back.
+
+A map is a run-length encoding of the document: a sequence of runs, each a
+pair (length in the source, length in the output). A run of equal lengths is
+copied, offset for offset (text outside math modes, boundaries, and math
+modes left as they were, all merged into one run); any other run is a
+translated math mode, every offset in which maps to its start.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class SourceMap:
+
+    def __init__(self, runs=()):
+        """
+        :param runs: iterable of pairs (source length, output length), or a
+            flat list of their lengths, as from `to_list`.
+        """
+        # The lengths, alternately in the source and in the output.
+        self.runs = array('q')
+        self._starts = None
+        runs = list(runs)
+        if runs and not isinstance(runs[0], (tuple, list)):
+            runs = zip(runs[::2], runs[1::2])
+        for a, b in runs:
+            self.add(a, b)
+
+    def __len__(self):
+        return len(self.runs) // 2
+
+    def __iter__(self):
+        r = self.runs
+        return zip(r[::2], r[1::2])
+
+    def __eq__(self, other):
+        return isinstance(other, SourceMap) and self.runs == other.runs
+
+    def __repr__(self):
+        return 'SourceMap(%r)' % list(self)
+
+    def add(self, a, b):
+        """
+        Add a run, of length a in the source, and b in the output, merging it
+        into the last if both are copied.
+        """
+        r = self.runs
+        if a == b:
+            if not a:
+                return
+            if r and r[-1] == r[-2]:
+                r[-2] += a
+                r[-1] += a
+                self._starts = None
+                return
+        r.append(a)
+        r.append(b)
+        self._starts = None
+
+    def to_list(self):
+        """
+        :return: the lengths of the runs, as a flat list, for JSON.
+        """
+        return self.runs.tolist()
+
+    def _index(self):
+        if self._starts is None:
+            r = self.runs
+            self._starts = (list(accumulate(r[::2], initial=0)),
+                            list(accumulate(r[1::2], initial=0)))
+        return self._starts
+
+    def _map(self, offset, frm, to):
+        starts = self._index()
+        i = bisect_right(starts[frm], offset) - 1
+        if i >= len(self):
+            # At or past the end.
+            return starts[to][-1] + offset - starts[frm][-1]
+        d = offset - starts[frm][i]
+        a, b = self.runs[2 * i], self.runs[2 * i + 1]
+        return starts[to][i] + (d if a == b else 0)
+
+    def to_source(self, offset):
+        """
+        :return: the offset in the source of an offset in the output.
+        """
+        return self._map(offset, 1, 0)
+
+    def to_output(self, offset):
+        """
+        :return: the offset in the output of an offset in the source.
+        """
+        return self._map(offset, 0, 1)
+
+    def source_position(self, output, source, line, col=1):
+        """
+        Trace a position in the output back to the source, as for an error
+        reported by TeX.
+
+        :param output: the text of the output.
+        :param source: the text of the source.
+        :param line, col: the position in the output, counting from 1.
+        :return: pair (line, column) in the source.
+        """
+        return position(source, self.to_source(offset(output, line, col)))
+
+
+def offset(text, line, col=1):
+    """
+    :return: the offset in a text of a line and column (counting from 1).
+    """
+    p = 0
+    for _ in range(line - 1):
+        p = text.find('\n', p) + 1
+        if p == 0:
+            return len(text)
+    return min(p + col - 1, len(text))
+
+
+def position(text, offset):
+    """
+    :return: pair (line, column) of an offset in a text, counting from 1.
+    """
+    line = text.count('\n', 0, offset) + 1
+    return line, offset - text.rfind('\n', 0, offset)
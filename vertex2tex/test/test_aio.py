@@ -0,0 +1,145 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from vertex2tex import aio, v2t
+from vertex2tex.aio import Translator
+from vertex2tex.dialect import Dialect
+from vertex2tex.document import translate_document
+from vertex2tex.excep import VerTeXError
+
+doc1 = "Let $@a%d, ddd, an@$ be\nsuch that $$@sum over n; an = %d@$$.\n"
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """
+    Runs each job slowly, keeping count of how many run at once.
+    """
+
+    def __init__(self):
+        super().__init__(max_workers=8)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.jobs = 0
+
+    def submit(self, fn, *args, **kwargs):
+        def run():
+            with self.lock:
+                self.active += 1
+                self.jobs += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.02)
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.active -= 1
+        return super().submit(run)
+
+
+def test_translate_document():
+    text = doc1 % (1, 1)
+    assert asyncio.run(aio.translate_document(text)) == translate_document(text)
+
+
+def test_coalesce_documents():
+    ex = CountingExecutor()
+    tr = Translator(executor=ex)
+    text = doc1 % (2, 2)
+    async def main():
+        return await asyncio.gather(*[tr.translate_document(text) for _ in range(5)])
+    assert asyncio.run(main()) == [translate_document(text)] * 5
+    assert ex.jobs == 1
+    assert tr.stats() == {'submitted': 1, 'coalesced': 4, 'cached': 0, 'running': 0, 'waiting': 0}
+
+
+def test_concurrency_limit():
+    ex = CountingExecutor()
+    tr = Translator(executor=ex, max_concurrency=2)
+    texts = [doc1 % (k, k) for k in range(6)]
+    async def main():
+        return await asyncio.gather(*[tr.translate_document(t) for t in texts])
+    assert asyncio.run(main()) == [translate_document(t) for t in texts]
+    assert ex.jobs == 6
+    assert ex.peak == 2
+
+
+def test_snippets():
+    v2t.clear_caches()
+    ex = CountingExecutor()
+    tr = Translator(executor=ex)
+    async def main():
+        a = tr.translate_snippets(['alp', 'bet', 'alp', ''])
+        b = tr.translate_snippet('bet')
+        c = tr.translate_snippet('@gam', keychar='@')
+        return await asyncio.gather(a, b, c)
+    assert asyncio.run(main()) == [['\\alpha', '\\beta', '\\alpha', ''], '\\beta', '\\gamma']
+    assert ex.jobs == 2
+    assert tr.coalesced == 1
+    # Now from the cache, without the executor.
+    assert asyncio.run(tr.translate_snippet('bet')) == '\\beta'
+    assert ex.jobs == 2
+    assert tr.cached == 1
+
+
+def test_errors():
+    tr = Translator()
+    async def main():
+        return await asyncio.gather(tr.translate_snippets(['alp', 'frac a over b over c;']),
+                                    tr.translate_snippet('gam'), return_exceptions=True)
+    r = asyncio.run(main())
+    assert isinstance(r[0], VerTeXError)
+    assert r[1] == '\\gamma'
+    with pytest.raises(VerTeXError):
+        asyncio.run(tr.translate_document('$@frac a over b over c;@$'))
+    tr.close()
+
+
+def test_errors_retrieved(caplog):
+    """
+    When several snippets of a batch cannot be translated, the errors of the
+    others than the one raised are not left unretrieved.
+    """
+    tr = Translator()
+    bad = ['frac a%d over b over c;' % k for k in range(3)]
+    with pytest.raises(VerTeXError):
+        asyncio.run(tr.translate_snippets(['alp'] + bad))
+    gc.collect()
+    assert 'never retrieved' not in caplog.text
+    tr.close()
+
+
+def test_dialect():
+    d = Dialect()
+    d.builtins['RR'] = '\\mathbb{R}'
+    tr = Translator()
+    async def main():
+        return await asyncio.gather(tr.translate_snippet('RR', dialect=d), tr.translate_snippet('RR'))
+    assert asyncio.run(main()) == ['\\mathbb{R}', 'R_{R}']
+    tr.close()
+
+
+def test_disk_cache_threads(tmp_path):
+    """
+    The threads of a Translator may share the disk cache.
+    """
+    dc = v2t.use_disk_cache(str(tmp_path))
+    try:
+        v2t.clear_caches()
+        tr = Translator(max_concurrency=8)
+        texts = [doc1 % (k, k) for k in range(40)]
+        async def main():
+            return await asyncio.gather(*[tr.translate_document(t) for t in texts])
+        assert asyncio.run(main()) == [translate_document(t) for t in texts]
+        assert dc.stats()['entries'] == 80
+        tr.close()
+    finally:
+        v2t.use_disk_cache(None)
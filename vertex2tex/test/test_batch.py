@@ -0,0 +1,55 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import pickle
+
+import pytest
+
+import vertex2tex.batch
+from vertex2tex.batch import *
+from vertex2tex.document import Segment, translate_document
+from vertex2tex.excep import VerTeXError
+
+doc1 = "Let $@a%d, ddd, an@$ be\nsuch that $$@sum over n; an = %d@$$, \\$%d.\n"
+docs = [''.join(doc1 % (k, k, k) for k in range(n)) for n in [0, 1, 7, 30]]
+
+
+def test_split_1():
+    text = docs[3]
+    pieces = split_document(text, size=100)
+    assert len(pieces) > 1
+    assert ''.join(p for p, L, C in pieces) == text
+    assert ''.join(translate_document(p) for p, L, C in pieces) == translate_document(text)
+    # Every piece after the first begins just after a closing "$$", on the line reported.
+    lines = text.split('\n')
+    for p, L, C in pieces[1:]:
+        assert lines[L - 1].endswith(p.split('\n')[0])
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_translate_documents_1(jobs):
+    out = translate_documents(docs, jobs=jobs, split_size=100)
+    assert out == [translate_document(d) for d in docs]
+
+
+def test_translate_files_1(tmp_path):
+    paths = []
+    for k, d in enumerate(docs):
+        p = tmp_path / ('%d.tex' % k)
+        p.write_text(d, encoding='utf-8')
+        paths.append(str(p))
+    out = list(translate_files(paths, jobs=1, split_size=100))
+    assert out == [(p, translate_document(d)) for p, d in zip(paths, docs)]
+
+
+def test_error_location_1(monkeypatch):
+    def fail(text, keychar):
+        ve = VerTeXError('bad')
+        ve.set_segment(Segment(1, 3, Segment.TEXT, text))
+        raise ve
+    monkeypatch.setattr(vertex2tex.batch, 'translate_document', fail)
+    with pytest.raises(VerTeXError) as info:
+        translate_piece((0, 'ch1.tex', 'foo', 5, 10, '@'))
+    ve = pickle.loads(pickle.dumps(info.value))
+    assert (ve.filename, ve.segment.getLine(), ve.segment.getCol()) == ('ch1.tex', 5, 12)
+    assert str(ve) == 'ch1.tex:5:12: bad'
@@ -0,0 +1,158 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from vertex2tex import config, v2t
+from vertex2tex.batch import translate_documents
+from vertex2tex.cache import DiskCache, LRUCache
+from vertex2tex.v2t import *
+
+
+def test_lru_1():
+    c = LRUCache(maxsize=2)
+    c.put('a', 1)
+    c.put('b', 2)
+    assert c.get('a') == 1
+    c.put('c', 3)
+    # 'b' was least recently used.
+    assert 'b' not in c
+    assert c.get('b') is None
+    assert c.stats() == {'hits': 1, 'misses': 1, 'evictions': 1, 'size': 2, 'maxsize': 2}
+    c.resize(1)
+    assert list(c.data) == ['c']
+    c.clear()
+    assert len(c) == 0
+
+
+def test_lru_2():
+    c = LRUCache(maxsize=0)
+    c.put('a', 1)
+    assert len(c) == 0
+
+
+def test_snippet_cache_1():
+    clear_caches()
+    h = snippet_cache.hits
+    assert cond_translate_snippet('@alp') == '\\alpha'
+    assert cond_translate_snippet('@alp') == '\\alpha'
+    assert snippet_cache.hits == h + 1
+    assert ('@alp', '@') in snippet_cache
+
+
+def test_snippet_cache_2():
+    """
+    Changing the keyword tables invalidates cached translations.
+    """
+    assert translate_snippet('foo') == 'f_{o o}'
+    config.builtins['foo'] = '\\phi'
+    try:
+        assert translate_snippet('foo') == '\\phi'
+    finally:
+        del config.builtins['foo']
+    assert translate_snippet('foo') == 'f_{o o}'
+
+
+def test_snippet_cache_3():
+    """
+    Values in the tables are frozen, so changes replace them, and so
+    invalidate cached translations too.
+    """
+    frac = config.binarynodes['frac']
+    assert frac == (('\\frac{', '}{', '}'), 'over', (0, 1))
+    with pytest.raises(TypeError):
+        frac[1] = 'by'
+    assert translate_snippet('frac 1 by 2;') != '\\frac{1}{2}'
+    config.binarynodes['frac'] = [frac[0], 'by', [0, 1]]
+    try:
+        assert config.binarynodes['frac'][2] == (0, 1)
+        assert translate_snippet('frac 1 by 2;') == '\\frac{1}{2}'
+        config.binarynodes.update(frac=frac)
+        assert translate_snippet('frac 1 over 2;') == '\\frac{1}{2}'
+    finally:
+        config.binarynodes['frac'] = frac
+
+
+def test_autosub_cache_1():
+    clear_caches()
+    h = autosub_cache.hits
+    assert autosub('zetauu2r') == '\\zeta^{ 2 r}'
+    assert autosub('zetauu2r') == '\\zeta^{ 2 r}'
+    assert autosub_cache.hits == h + 1
+
+
+def test_disk_cache_1(tmp_path):
+    c = DiskCache(str(tmp_path), max_bytes=1000)
+    assert c.get('a') is None
+    c.put('a', 'alpha')
+    c.put('b', 'beta')
+    assert c.get('a') == 'alpha'
+    stats = c.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 2)
+    # Another connection sees the same entries.
+    assert DiskCache(str(tmp_path)).get('b') == 'beta'
+    c.clear()
+    assert c.stats()['entries'] == 0
+
+
+def test_disk_cache_2(tmp_path):
+    """
+    The database is trimmed to its bound, least recently used entries first.
+    """
+    c = DiskCache(str(tmp_path), max_bytes=1000)
+    for k in range(100):
+        c.put('%03d' % k, 'x' * 20)
+    c.trim()
+    assert c.total_bytes() <= 900
+    assert c.get('000') is None
+    assert c.get('099') == 'x' * 20
+    assert c.evictions > 0
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    yield use_disk_cache(str(tmp_path))
+    use_disk_cache(None)
+
+
+def test_use_disk_cache_1(disk_cache):
+    clear_caches()
+    assert translate_snippet('frac 1 over alp;') == '\\frac{1}{\\alpha}'
+    assert disk_cache.stats()['entries'] == 1
+    # Found on disk, once dropped from memory.
+    clear_caches()
+    disk_cache.put(disk_key('frac 1 over alp;', None), 'from disk')
+    assert translate_snippet('frac 1 over alp;') == 'from disk'
+    # Keyed by the keychar, and the keyword tables.
+    assert translate_snippet('@alp', keychar='@') == '\\alpha'
+    assert translate_snippet('alp') == '\\alpha'
+    fp = fingerprint()
+    config.builtins['foo'] = '\\phi'
+    try:
+        assert fingerprint() != fp
+        assert disk_key('alp', None) != disk_key('alp', '@')
+        assert translate_snippet('frac 1 over alp;') == '\\frac{1}{\\alpha}'
+    finally:
+        del config.builtins['foo']
+    assert fingerprint() == fp
+
+
+def test_use_disk_cache_3(disk_cache):
+    clear_caches()
+    assert translate_snippets(['alp', 'bet', 'alp']) == ['\\alpha', '\\beta', '\\alpha']
+    assert disk_cache.stats()['entries'] == 2
+    clear_caches()
+    disk_cache.put(disk_key('bet', None), 'from disk')
+    assert translate_snippets(['alp', 'bet', 'gam']) == ['\\alpha', 'from disk', '\\gamma']
+    assert disk_cache.get_many([disk_key('gam', None), 'nothing']) == {disk_key('gam', None): '\\gamma'}
+
+
+def test_use_disk_cache_2(disk_cache):
+    """
+    Worker processes share the disk cache.
+    """
+    clear_caches()
+    docs = ['$@zetauu%d@$' % k for k in range(20)]
+    assert translate_documents(docs, jobs=2)[3] == '$\\zeta^{3}$'
+    assert disk_cache.stats()['entries'] == 20
+    assert v2t.disk_cache is disk_cache
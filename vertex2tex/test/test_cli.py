@@ -0,0 +1,88 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import io
+import sys
+
+import pytest
+
+from vertex2tex.cli import *
+
+doc1 = "Let $@alp@$ and $bet$.\n"
+out1 = "Let $\\alpha$ and $bet$.\n"
+out1_all = "Let $@\\alpha@$ and $\\beta$.\n"
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    for name in ['a.tex', 'b.tex', 'sub/c.tex']:
+        (tmp_path / name).write_text(doc1, encoding='utf-8')
+    return tmp_path
+
+
+def test_in_place_1(tree):
+    assert main(['-i', str(tree / '**' / '*.tex')]) == EXIT_OK
+    for name in ['a.tex', 'b.tex', 'sub/c.tex']:
+        assert (tree / name).read_text(encoding='utf-8') == out1
+    # No temporary files left behind.
+    assert sorted(p.name for p in tree.iterdir()) == ['a.tex', 'b.tex', 'sub']
+
+
+def test_out_dir_1(tree):
+    (tree / 'sub' / 'a.tex').write_text(doc1.replace('alp', 'bet'), encoding='utf-8')
+    out = tree / 'out'
+    assert main(['-o', str(out), str(tree / '**' / '*.tex')]) == EXIT_OK
+    # The files keep their places below the directory they are all in.
+    assert (out / 'a.tex').read_text(encoding='utf-8') == out1
+    assert (out / 'sub' / 'a.tex').read_text(encoding='utf-8') == out1.replace('alpha', 'beta')
+    assert (out / 'sub' / 'c.tex').read_text(encoding='utf-8') == out1
+    assert main(['-o', str(out), str(tree / 'sub' / 'c.tex')]) == EXIT_OK
+    assert (out / 'c.tex').exists()
+
+
+def test_line_endings_1(tree):
+    crlf = (doc1 * 3).replace('\n', '\r\n').encode('utf-8')
+    (tree / 'a.tex').write_bytes(crlf)
+    (tree / 'sub' / 'c.tex').write_bytes(crlf)
+    assert main(['-o', str(tree / 'out'), str(tree / 'a.tex'), str(tree / 'sub' / 'c.tex')]) == EXIT_OK
+    assert main(['-i', str(tree / 'a.tex')]) == EXIT_OK
+    expected = (out1 * 3).replace('\n', '\r\n').encode('utf-8')
+    for path in [tree / 'a.tex', tree / 'out' / 'a.tex', tree / 'out' / 'sub' / 'c.tex']:
+        assert path.read_bytes() == expected
+    # Also for a file long enough to be split.
+    (tree / 'b.tex').write_bytes(crlf)
+    [(path, text)] = translate_files([str(tree / 'b.tex')], jobs=1, split_size=20)
+    assert text.encode('utf-8') == expected
+
+
+def test_stdout_1(tree, capsys):
+    assert main(['--all-math', str(tree / 'a.tex'), str(tree / 'b.tex')]) == EXIT_OK
+    assert capsys.readouterr().out == out1_all * 2
+
+
+def test_stdin_1(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(doc1.replace('@', '!')))
+    assert main(['-k', '!']) == EXIT_OK
+    assert capsys.readouterr().out == out1
+
+
+def test_cache_1(tree, capsys):
+    cache_dir = str(tree / 'cache')
+    v2t.clear_caches()
+    try:
+        assert main(['--cache-dir', cache_dir, str(tree / 'a.tex')]) == EXIT_OK
+        assert capsys.readouterr().out == out1
+        assert main(['--cache-dir', cache_dir, '--cache-stats']) == EXIT_OK
+        assert 'entries: 1\n' in capsys.readouterr().out
+        assert main(['--cache-dir', cache_dir, '--cache-clear']) == EXIT_OK
+        assert v2t.disk_cache.stats()['entries'] == 0
+    finally:
+        v2t.use_disk_cache(None)
+
+
+def test_errors_1(tree, capsys):
+    assert main([str(tree / '*.txt')]) == EXIT_USAGE
+    with pytest.raises(SystemExit) as info:
+        main(['-k', '$', str(tree / 'a.tex')])
+    assert info.value.code == EXIT_USAGE
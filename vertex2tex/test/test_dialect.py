@@ -0,0 +1,149 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import pickle
+
+from vertex2tex import config, v2t
+from vertex2tex.dialect import Dialect
+from vertex2tex.document import translate_document
+from vertex2tex.incremental import IncrementalDocument
+from vertex2tex.tree import parse_snippet, tex_emitter
+from vertex2tex.v2t import Tables, get_tables, translate_snippet, translate_snippets
+
+
+def check_tables(d):
+    """
+    Check that what was derived for a dialect from its parent is what would
+    be built from its tables afresh.
+    """
+    t = get_tables(d)
+    full = Tables()
+    full.build(d.merged)
+    assert t.index == full.index
+    assert t.fontwords == full.fontwords
+    assert t.token_re.pattern == full.token_re.pattern
+
+
+def test_layer():
+    d = Dialect(name='analysis')
+    d.builtins['RR'] = '\\mathbb{R}'
+    d.remove('builtins', 'to')
+    assert translate_snippet('f : RR to RR', dialect=d) == 'f:\\mathbb{R} t_{o}\\mathbb{R}'
+    # The tables of config, and their caches, are untouched.
+    assert translate_snippet('f : RR to RR') == 'f: R_{R}\\rightarrow R_{R}'
+    assert v2t.snippet_cache.get(('f : RR to RR', None)) == 'f: R_{R}\\rightarrow R_{R}'
+    assert get_tables(d).snippet_cache.get(('f : RR to RR', None)) == 'f:\\mathbb{R} t_{o}\\mathbb{R}'
+    assert repr(d) == '<Dialect analysis>'
+    check_tables(d)
+
+
+def test_kinds():
+    d = Dialect()
+    d.unarynodes['brk'] = ('\\langle ', '\\rangle')
+    d.bsmes.append('wp')
+    d.builtins['alp'] = '\\aleph'
+    assert translate_snippet('brk x; wp alp', dialect=d) == '\\langle x\\rangle\\wp\\aleph'
+    assert translate_snippet('alp') == '\\alpha'
+    check_tables(d)
+    # Adding a keyword again restores it.
+    d.remove('builtins', 'to')
+    assert translate_snippet('to', dialect=d) == 't_{o}'
+    d.builtins['to'] = '\\rightarrow'
+    assert translate_snippet('to', dialect=d) == '\\rightarrow'
+    check_tables(d)
+
+
+def test_versions():
+    """
+    Changes to a dialect, to its parent, or to config, are seen by the dialect.
+    """
+    parent = Dialect()
+    child = Dialect(parent)
+    assert translate_snippet('foo', dialect=child) == 'f_{o o}'
+    v = child.version
+    parent.builtins['foo'] = '\\phi'
+    assert child.version > v
+    assert translate_snippet('foo', dialect=child) == '\\phi'
+    child.remove('builtins', 'foo')
+    assert translate_snippet('foo', dialect=child) == 'f_{o o}'
+    assert translate_snippet('foo', dialect=parent) == '\\phi'
+    config.builtins['qux'] = '\\psi'
+    try:
+        assert translate_snippet('qux', dialect=child) == '\\psi'
+        check_tables(child)
+    finally:
+        del config.builtins['qux']
+    assert translate_snippet('qux', dialect=child) == 'q_{u x}'
+
+
+def test_letters_and_fonts():
+    d = Dialect()
+    d.letters.append('aleph')
+    d.bsmes.append('aleph')
+    d.fonts['ff'] = 'mathfrak'
+    assert translate_snippet('alephuu2 ffaleph ffx', dialect=d) == \
+        '\\aleph^{2}\\mathfrak{\\aleph}\\mathfrak{x}'
+    assert translate_snippet('ffx') == 'f_{f x}'
+    check_tables(d)
+
+
+def test_ascii_letter():
+    """
+    A dialect that changes the keyword for an ASCII letter translates as
+    config does, changed in the same way.
+    """
+    d = Dialect()
+    d.builtins['x'] = '\\chi'
+    out = translate_snippet('bfx + x', dialect=d)
+    assert out == '\\mathbf{\\chi}+\\chi'
+    check_tables(d)
+    config.builtins['x'] = '\\chi'
+    try:
+        assert translate_snippet('bfx + x') == out
+    finally:
+        del config.builtins['x']
+    assert translate_snippet('bfx') == '\\mathbf{x}'
+
+
+def test_html_exceptions():
+    d = Dialect()
+    d.html_exceptions.append('&foo;')
+    assert translate_snippet('x&foo;', dialect=d) == 'x&foo;'
+    assert v2t.tokenize('x&foo;', d) == ['x', '&foo;']
+    assert v2t.tokenize('x&foo;') != ['x', '&foo;']
+    check_tables(d)
+
+
+def test_entry_points():
+    d = Dialect()
+    d.builtins['RR'] = '\\mathbb{R}'
+    assert translate_document('Let $@x in RR@$.', dialect=d) == 'Let $x\\in\\mathbb{R}$.'
+    assert translate_snippets(['RR', 'x in RR'], dialect=d) == ['\\mathbb{R}', 'x\\in\\mathbb{R}']
+    v2t.clear_caches(d)
+    assert translate_snippets(['RR', 'x in RR'], jobs=2, chunk_size=1, dialect=d) == \
+        ['\\mathbb{R}', 'x\\in\\mathbb{R}']
+    assert tex_emitter.emit(parse_snippet('x in RR', d)) == 'x\\in\\mathbb{R}'
+    assert parse_snippet('x in RR', d) is not parse_snippet('x in RR')
+    doc = IncrementalDocument('Let $@x in RR@$.', dialect=d)
+    assert doc.output == 'Let $x\\in\\mathbb{R}$.'
+    assert v2t.fontword('bbR', d) == '\\mathbb{R}'
+
+
+def test_fingerprint():
+    d = Dialect()
+    fp = v2t.fingerprint(d)
+    assert fp != v2t.fingerprint()
+    d.builtins['RR'] = '\\mathbb{R}'
+    assert v2t.fingerprint(d) != fp
+    assert v2t.disk_key('RR', None, d) != v2t.disk_key('RR', None)
+
+
+def test_pickle():
+    d = Dialect(Dialect(name='base'), name='child')
+    d.parent.builtins['RR'] = '\\mathbb{R}'
+    d.remove('builtins', 'to')
+    assert translate_snippet('RR to', dialect=d) == '\\mathbb{R} t_{o}'
+    e = pickle.loads(pickle.dumps(d))
+    assert e.tables is None
+    assert translate_snippet('RR to', dialect=e) == '\\mathbb{R} t_{o}'
+    assert v2t.fingerprint(e) == v2t.fingerprint(d)
@@ -0,0 +1,76 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from vertex2tex.excep import VerTeXError
+from vertex2tex.document import (
+    BoundaryScanner, SegmentStream, translate_document, translate_stream,
+)
+from vertex2tex.incremental import IncrementalDocument
+
+doc1 = (
+    "Inline \\(@alp@\\) and $@bet@$$@gam@$, costing 5% of $@del@$ (not math)\n"
+    "\\begin{equation}\n  @frac 1 over 2;@\n\\end{equation}\n"
+    "\\begin{align*}\n@x &= alp \\\\\n  y &= bet@\n\\end{align*}\n"
+    "\\begin{verbatim}\n$@alp@$ \\[ \\end{equation}\n\\end{verbatim}\n"
+    "\\verb|$@alp@$| and \\% $@eps@$ \\begin{gather}@n in bbN@\\end{gather}\n"
+)
+
+out1 = (
+    "Inline \\(\\alpha\\) and $\\beta$$\\gamma$, costing 5% of $@del@$ (not math)\n"
+    "\\begin{equation}\n  \\frac{1}{2}\n\\end{equation}\n"
+    "\\begin{align*}\nx&=\\alpha\\\\ y&=\\beta\n\\end{align*}\n"
+    "\\begin{verbatim}\n$@alp@$ \\[ \\end{equation}\n\\end{verbatim}\n"
+    "\\verb|$@alp@$| and \\% $\\epsilon$ \\begin{gather}n\\in\\mathbb{N}\\end{gather}\n"
+)
+
+
+def test_environments_1():
+    assert translate_document(doc1) == out1
+
+
+def test_environments_2():
+    segs = [s.getStr() for s in SegmentStream(doc1)]
+    assert segs[1::4] == [
+        '\\(', '$', '$', '\\begin{equation}', '\\begin{align*}', '$', '\\begin{gather}',
+    ]
+    assert segs[3::4] == [
+        '\\)', '$', '$', '\\end{equation}', '\\end{align*}', '$', '\\end{gather}',
+    ]
+
+
+@pytest.mark.parametrize('step', [1, 3, 7, 64])
+def test_environments_stream(step):
+    chunks = [doc1[i:i + step] for i in range(0, len(doc1), step)]
+    assert ''.join(translate_stream(chunks)) == out1
+
+
+def test_environments_incremental():
+    doc = IncrementalDocument(doc1)
+    assert doc.output == out1
+    for start, end, replacement in [
+        (doc1.index('5%'), doc1.index('5%') + 2, ''),
+        (doc1.index('\\begin{verbatim}'), doc1.index('\\begin{verbatim}') + 1, ''),
+        (doc1.index('\\end{align*}'), doc1.index('\\end{align*}') + 1, ''),
+    ]:
+        text = doc1[:start] + replacement + doc1[end:]
+        doc.edit(start, end, replacement)
+        assert doc.output == translate_document(text)
+        doc.update(doc1)
+        assert doc.output == out1
+
+
+def test_scanner_options():
+    scanner = BoundaryScanner(math_environments=['mymath'], verbatim_environments=[], comments=False)
+    text = '5% $@alp@$ \\verb|$@bet@$| \\begin{mymath}@gam@\\end{mymath} \\begin{equation}@del@\\end{equation}'
+    assert translate_document(text, scanner=scanner) == (
+        '5% $\\alpha$ \\verb|$\\beta$| \\begin{mymath}\\gamma\\end{mymath} \\begin{equation}@del@\\end{equation}'
+    )
+
+
+def test_environment_error_position():
+    doc = 'Let\n\\begin{equation}\n  @binom n choose k choose j;@\n\\end{equation}\n'
+    with pytest.raises(VerTeXError) as info:
+        translate_document(doc)
+    assert info.value.position() == (3, 21)
@@ -0,0 +1,42 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import subprocess
+import sys
+
+import pytest
+
+import vertex2tex
+
+
+def imported_by(module):
+    """
+    :return: set of the modules loaded by importing a module in a fresh interpreter.
+    """
+    code = 'import sys; import %s; print(" ".join(sys.modules))' % module
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return set(out.split())
+
+
+@pytest.mark.parametrize('module, unwanted', [
+    ['vertex2tex', ['vertex2tex.v2t', 'vertex2tex.document', 'vertex2tex.tree', 're']],
+    ['vertex2tex.cli', ['vertex2tex.tree', 'concurrent.futures', 'sqlite3', 'hashlib', 'json',
+                        'tempfile', 'shutil', 'glob', 'string']],
+    ['vertex2tex.client', ['vertex2tex.v2t', 'vertex2tex.document', 'asyncio', 'tempfile']],
+])
+def test_lazy_imports(module, unwanted):
+    loaded = imported_by(module)
+    assert module in loaded
+    # Leave out whatever the interpreter loads on its own, as from site.
+    assert (loaded - imported_by('sys')).isdisjoint(unwanted)
+
+
+def test_exports():
+    from vertex2tex import v2t, document, tree, profiling
+    assert vertex2tex.translate_snippet is v2t.translate_snippet
+    assert vertex2tex.translate_document is document.translate_document
+    assert vertex2tex.parse_snippet is tree.parse_snippet
+    assert vertex2tex.Profiler is profiling.Profiler
+    assert set(vertex2tex.__all__) <= set(dir(vertex2tex))
+    with pytest.raises(AttributeError):
+        vertex2tex.no_such_name
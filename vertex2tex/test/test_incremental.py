@@ -0,0 +1,105 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+import pytest
+
+import vertex2tex.document
+import vertex2tex.incremental
+from vertex2tex.document import translate_document
+from vertex2tex.incremental import IncrementalDocument, Offsets
+
+doc1 = ''.join(
+    "Let $@a%d, ddd, an@$ be such that\n$$@sum over n; an = %d@$$ at \\$%d.\n" % (k, k, k)
+    for k in range(20)
+)
+
+
+@pytest.mark.parametrize('start, end, replacement', [
+    (200, 200, 'x'),
+    (200, 205, ''),
+    # Open a math mode, and so flip all the rest of the document.
+    (10, 10, '$'),
+    (10, 10, '$@'),
+    # Turn "$$" into "$", and "\$" into "$".
+    (28, 29, ''),
+    (68, 69, ''),
+    (0, len(doc1), 'all $@new@$'),
+])
+def test_edit_1(start, end, replacement):
+    check_edit(doc1, start, end, replacement)
+
+
+doc2 = 'See \\verb|x $@alp@$, $@bet@$ and $@gam@$ y\nand| $@a1@$ and $$@a2@$$.\n'
+eol = doc2.index('\n')
+
+@pytest.mark.parametrize('start, end, replacement', [
+    # Join the lines, so that the \verb closes, and hides the math modes on the first.
+    (eol, eol + 1, ''),
+    (eol, eol + 1, ' '),
+    (eol - 1, eol - 1, '|'),
+])
+def test_edit_verb(start, end, replacement):
+    check_edit(doc2, start, end, replacement)
+
+
+def check_edit(doc1, start, end, replacement):
+    doc = IncrementalDocument(doc1)
+    text = doc1[:start] + replacement + doc1[end:]
+    doc.edit(start, end, replacement)
+    assert doc.text == text
+    assert doc.output == translate_document(text)
+    doc.update(doc1)
+    assert doc.output == translate_document(doc1)
+
+
+def test_edit_2(monkeypatch):
+    """
+    Only the edited math segment is translated again.
+    """
+    doc = IncrementalDocument(doc1)
+    translated = []
+    def translate(text, keychar, dialect=None):
+        translated.append(text)
+        return text.upper()
+    monkeypatch.setattr(vertex2tex.document, 'translate_snippet', translate)
+    p = doc1.index('a7,')
+    spans = doc.edit(p, p + 2, 'b7')
+    assert translated == ['@b7, ddd, an@']
+    assert len(spans) < 5
+    assert '$@B7, DDD, AN@$' in [doc.output[a - 1:b + 1] for a, b in spans]
+
+
+def test_edits():
+    """
+    A run of edits, all over the document, with neither the text nor the
+    output read in between.
+    """
+    doc = IncrementalDocument(doc1)
+    text = doc1
+    for k in range(40):
+        p = text.find('d', len(text) * (k * 7 % 40) // 40)
+        if p < 0:
+            p = text.index('d')
+        r = ['$', 'x', '@alp@', ''][k % 4]
+        doc.edit(p, p + 1, r)
+        text = text[:p] + r + text[p + 1:]
+    assert doc.text == text
+    assert doc.output == translate_document(text)
+    assert len(doc.output) == doc.out_len
+
+
+def test_offsets(monkeypatch):
+    monkeypatch.setattr(vertex2tex.incremental, 'BLOCK_SEGMENTS', 2)
+    lengths = [3, 0, 1, 4, 0, 0, 2]
+    offsets = Offsets(lengths)
+    for i, j, new in [(1, 3, [5, 0, 0, 1]), (0, 0, [2]), (4, 9, []), (3, 4, [0, 7, 1, 1, 0])]:
+        lengths[i:j] = new
+        offsets.replace(i, j, new)
+        starts = list(accumulate(lengths, initial=0))[:-1]
+        assert [offsets[k] for k in range(len(offsets))] == starts
+        for p in range(sum(lengths) + 2):
+            assert offsets.bisect_left(p) == bisect_left(starts, p)
+            assert offsets.bisect_right(p) == bisect_right(starts, p)
@@ -0,0 +1,84 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import json
+
+from vertex2tex import profiling
+from vertex2tex.profiling import Profiler
+from vertex2tex.v2t import clear_caches, translate_snippet, translate_snippets
+from vertex2tex.document import translate_document, translate_stream
+
+
+def test_kinds():
+    clear_caches()
+    with Profiler() as prof:
+        translate_snippet('frac abs x; over alp; + a1 + &lt; + bbR + frac 1 over 2;')
+    kinds = prof.stats()['kinds']
+    assert kinds['binary']['calls'] == 2
+    assert kinds['unary']['calls'] == 1
+    assert kinds['builtin']['calls'] == 1
+    assert kinds['html']['calls'] == 1
+    assert kinds['fontword']['calls'] == 1
+    assert kinds['autosub']['calls'] == 1
+    # The outer frac includes the abs inside it.
+    assert kinds['binary']['seconds'] >= kinds['unary']['seconds'] > 0
+
+
+def test_stages():
+    clear_caches()
+    doc = 'Let $@a1@$ and $$@alp@$$ and $x$, and $@a1@$ again.'
+    with Profiler() as prof:
+        translate_document(doc)
+    stages = prof.stats()['stages']
+    assert stages['translate_document']['calls'] == 1
+    # Four math modes of four segments each, the text before them, and the end.
+    assert stages['lex']['calls'] == 18
+    # The second $@a1@$ comes from the memory cache, and $x$ is looked up but
+    # not translated.
+    assert stages['translate_snippet']['calls'] == 3
+    assert stages['tokenize']['calls'] == stages['xlat']['calls'] == 2
+    assert stages['autosub']['calls'] == 1
+    prof.reset()
+    with prof:
+        ''.join(translate_stream(doc))
+    stages = prof.stats()['stages']
+    assert 'translate_document' not in stages
+    assert stages['lex']['calls'] >= 18
+    assert 'translate_snippet' not in stages
+
+
+def test_translate_snippets():
+    clear_caches()
+    with Profiler() as prof:
+        translate_snippets(['alp', 'bet', 'alp'])
+    stages = prof.stats()['stages']
+    assert stages['xlat']['calls'] == 2
+    assert prof.stats()['kinds']['builtin']['calls'] == 2
+
+
+def test_json():
+    clear_caches()
+    with Profiler() as prof:
+        translate_snippet('abs x;')
+    assert json.loads(prof.to_json()) == prof.stats()
+
+
+def test_inactive():
+    clear_caches()
+    prof = Profiler()
+    translate_snippet('abs x;')
+    assert profiling.active is None
+    assert prof.stats() == {'stages': {}, 'kinds': {}}
+
+
+def test_nesting():
+    clear_caches()
+    with Profiler() as outer:
+        translate_snippet('alp')
+        with Profiler() as inner:
+            translate_snippet('bet')
+        assert profiling.active is outer
+        translate_snippet('gam')
+    assert profiling.active is None
+    assert outer.stats()['kinds']['builtin']['calls'] == 2
+    assert inner.stats()['kinds']['builtin']['calls'] == 1
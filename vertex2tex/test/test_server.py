@@ -0,0 +1,112 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import io
+import socket
+import sys
+import threading
+
+import pytest
+
+from vertex2tex import client as client_module
+from vertex2tex.client import Client, ServerError, encode
+from vertex2tex.document import translate_document
+from vertex2tex.excep import VerTeXError
+from vertex2tex.server import Server
+
+doc1 = "Let $@alp@$ and $bet$.\n"
+out1 = "Let $\\alpha$ and $bet$.\n"
+
+
+def start(address):
+    """
+    Run a server in a thread.
+
+    :return: pair (the thread, the address at which the server listens).
+    """
+    listening = []
+    ready = threading.Event()
+    def run():
+        asyncio.run(Server().serve(address, lambda a: (listening.append(a), ready.set())))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    return thread, listening[0]
+
+
+@pytest.fixture(params=['unix', 'tcp'])
+def address(request, tmp_path):
+    if request.param == 'unix':
+        if not hasattr(socket, 'AF_UNIX'):
+            pytest.skip('no Unix sockets')
+        thread, address = start(str(tmp_path / 'v2t.sock'))
+    else:
+        thread, address = start('127.0.0.1:0')
+    yield address
+    with Client(address) as c:
+        c.shutdown()
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def test_requests(address):
+    with Client(address) as c:
+        assert c.ping() == 'pong'
+        assert c.translate_snippet('alp') == '\\alpha'
+        assert c.translate_snippet('@alp', keychar='@') == '\\alpha'
+        assert c.translate_snippets(['alp', 'bet', 'alp']) == ['\\alpha', '\\beta', '\\alpha']
+        assert c.translate_document(doc1) == out1
+        assert c.translate_document(doc1, keychar=None) == translate_document(doc1, keychar=None)
+        with pytest.raises(VerTeXError) as e:
+            c.translate_document('x\n$@frac a over b over c;@$')
+        assert str(e.value).startswith('2:')
+        with pytest.raises(ServerError):
+            c.request('no_such_op')
+        with pytest.raises(ServerError):
+            c.translate_snippet('alp', keychar='$')
+        # Still in step after the errors.
+        assert c.translate_snippet('gam') == '\\gamma'
+        stats = c.stats()
+    assert stats['ops']['translate_snippet']['calls'] == 4
+    assert stats['errors'] == 3
+    assert stats['open_connections'] == 1
+
+
+def test_connections(address):
+    clients = [Client(address) for _ in range(5)]
+    for k, c in enumerate(clients):
+        assert c.translate_snippet('a%d' % k) == 'a_{%d}' % k
+    with clients[0] as c:
+        assert c.stats()['open_connections'] == 5
+    for c in clients[1:]:
+        c.close()
+
+
+def test_bad_frames(address):
+    family, addr = client_module.parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.connect(addr)
+        s.sendall(encode(['not', 'an', 'object']))
+        c = Client(address)
+        c.sock = s
+        with pytest.raises(ConnectionError):
+            # The answer has no id.
+            c.request('ping')
+
+
+def test_cli(address, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(doc1))
+    assert client_module.main(['--address', address]) == client_module.EXIT_OK
+    assert capsys.readouterr().out == out1
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('$@frac a over b over c;@$'))
+    assert client_module.main(['--address', address]) == client_module.EXIT_VERTEX_ERROR
+
+
+def test_parse_address():
+    assert client_module.parse_address(':8000') == (socket.AF_INET, ('127.0.0.1', 8000))
+    assert client_module.parse_address('localhost:8000') == (socket.AF_INET, ('localhost', 8000))
+    assert client_module.parse_address('/tmp/v.sock')[1] == '/tmp/v.sock'
+    assert client_module.parse_address('unix:v.sock')[1] == 'v.sock'
+    with pytest.raises(ValueError):
+        client_module.parse_address('localhost')
@@ -0,0 +1,56 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+from vertex2tex.document import translate_document
+from vertex2tex.incremental import IncrementalDocument
+from vertex2tex.sourcemap import SourceMap, offset, position
+
+doc1 = (
+    "Let $@alp@$ and $bet$ be such that\n"
+    "\\begin{equation}\n@sum over n; an = 0\n\\end{equation}\n"
+    "and $$@frac 1 over 2;@$$.\n"
+)
+
+
+def test_runs():
+    out, smap = translate_document(doc1, source_map=True)
+    assert out == translate_document(doc1)
+    assert sum(a for a, b in smap) == len(doc1)
+    assert sum(b for a, b in smap) == len(out)
+    # Copied runs are merged: one between each pair of translated math modes.
+    assert len(smap) == 7
+    assert SourceMap(smap.to_list()) == smap
+    assert SourceMap([]).to_list() == []
+
+
+def test_offsets():
+    out, smap = translate_document(doc1, source_map=True)
+    # Text maps offset for offset.
+    for word in ['Let', ' and $bet$ be', 'such that', '\\end{equation}', '$$.']:
+        p = doc1.index(word)
+        assert out[smap.to_output(p):].startswith(word)
+        assert smap.to_source(smap.to_output(p)) == p
+    # A translated math mode maps to its start.
+    p, q = doc1.index('@sum'), out.index('\\sum')
+    assert smap.to_source(q + 5) == p - 1
+    assert smap.to_output(p + 5) == q - 1
+    # Past the end.
+    assert smap.to_source(len(out)) == len(doc1)
+
+
+def test_positions():
+    out, smap = translate_document(doc1, source_map=True)
+    line = out.split('\n').index('\\end{equation}') + 1
+    assert smap.source_position(out, doc1, line) == (4, 1)
+    assert smap.source_position(out, doc1, 5, 5) == position(doc1, doc1.index('$$@frac'))
+    assert offset(doc1, 2) == doc1.index('\\begin')
+    assert offset(doc1, 99) == len(doc1)
+    assert position(doc1, 0) == (1, 1)
+
+
+def test_incremental():
+    doc = IncrementalDocument(doc1)
+    p = doc1.index('alp')
+    doc.edit(p, p + 3, 'gam')
+    text = doc.text
+    assert doc.source_map() == translate_document(text, source_map=True)[1]
@@ -0,0 +1,71 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import io
+
+import pytest
+
+from vertex2tex.document import SegmentStream, translate_document, translate_stream, lex_chunks
+
+doc1 = (
+    "Let $@a0, a1, ddd, an-1@$ be given, at \\$5 each.\n"
+    "$$@sum over n from 0 to infty; an@$$ and \\[@frp in bbZ\\] but not $pie$.\n"
+)
+
+
+@pytest.mark.parametrize('cuts', [
+    [],
+    # Cut inside "$$", between "\" and "$", inside "\[", and inside math modes.
+    [58, 59],
+    [29, 30, 31],
+    [97, 98],
+    list(range(1, len(doc1))),
+])
+def test_stream_1(cuts):
+    chunks = [doc1[a:b] for a, b in zip([0] + cuts, cuts + [len(doc1)])]
+    assert ''.join(translate_stream(chunks)) == translate_document(doc1)
+
+
+def test_stream_2():
+    f = io.StringIO(doc1 * 50)
+    out = list(translate_stream(f, keychar=None, chunk_size=16))
+    assert len(out) > 1
+    assert ''.join(out) == translate_document(doc1 * 50, keychar=None)
+
+
+def test_lex_chunks_1():
+    # The "$$" is split across chunks, as is the escaped "\\$".
+    segs = list(lex_chunks(['x $a', '$ y $', '$\\alp\\', '$$$']))
+    assert [s.getStr() for s in segs if s.getType() == 'bdry'] == ['$', '$', '$$', '$$']
+    math = [s for s in segs if s.getStr() == '\\alp\\$']
+    assert len(math) == 1
+    assert math[0].getLine() == 1 and math[0].getCol() == 11
+
+
+def test_segment_stream_1():
+    segs = list(SegmentStream('ab\ncd $x$\n\\[\ny\\]'))
+    assert [s.getLCTS() for s in segs] == [
+        (1, 1, 'text', 'ab\ncd '),
+        (2, 4, 'bdry', '$'),
+        (2, 5, 'text', 'x'),
+        (2, 6, 'bdry', '$'),
+        (2, 7, 'text', '\n'),
+        (3, 1, 'bdry', '\\['),
+        (3, 3, 'text', '\ny'),
+        (4, 2, 'bdry', '\\]'),
+        (4, 4, 'text', ''),
+    ]
+    # Lexing whole, or in chunks, puts the boundaries in the same places.
+    chunked = lex_chunks(['ab\ncd $x', '$\n\\', '[\ny\\]'])
+    assert [s.getLCTS() for s in chunked if s.getType() == 'bdry'] == \
+        [s.getLCTS() for s in segs if s.getType() == 'bdry']
+
+
+def test_segment_stream_2():
+    segs = SegmentStream('x $a$ y $$b$$')
+    assert segs.next().getStr() == 'x '
+    assert segs.getTextPos() == (1, 3)
+    assert [s.getStr() for s in segs] == ['$', 'a', '$', ' y ', '$$', 'b', '$$', '']
+    assert segs.next() is None
+    segs.reset()
+    assert segs.next().getStr() == 'x '
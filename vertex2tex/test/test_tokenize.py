@@ -1,6 +1,9 @@
 # VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
 # SPDX-License-Identifier: MIT
 
+import re
+
+from vertex2tex import config
 from vertex2tex.v2t import *
 
 text1="""
@@ -41,5 +44,41 @@ def test_tokenize_1():
     assert tokens == tokens1
 
 
+def test_token_spans():
+    text = 'frac x^^2 over 2;'
+    ts = TokenStream(tokenize(text))
+    assert [ts.next() for _ in range(3)] == ['frac', ' ', 'x^^2']
+    assert ts.span(2) == (5, 9)
+    assert ts.getSlice(2, 4) == ['x^^2', ' ']
+    assert ts.showRest() == [' ', 'over', ' ', '2', ';']
+
+
+def test_tokenize_names():
+    assert tokenize('a^^^^b a___b a__b an-1, x^y') == [
+        'a^^^^b', ' ', 'a', '_', '_', '_', 'b', ' ', 'a__b', ' ', 'an-1', ',', ' ',
+        'x', '^', 'y'
+    ]
+    # No backtracking over long runs of marks.
+    assert tokenize('a' + '^' * 100000 + ';')[:2] == ['a', '^']
+
+
+def test_tokenize_html():
+    assert tokenize('a &lt; b &amp;&apos;&') == [
+        'a', ' ', '&lt;', ' ', 'b', ' ', '&amp;', '&apos;', '&'
+    ]
+    config.html_exceptions.append('&ne;')
+    try:
+        assert tokenize('&ne;') == ['&ne;']
+    finally:
+        config.html_exceptions.remove('&ne;')
+    assert tokenize('&ne;') == ['&', 'ne', ';']
+
+
+def test_trie_pattern():
+    assert trie_pattern(['&gt;', '&lt;', '&amp;', '&apos;']) == re.escape('&') + '(?:a(?:mp;|pos;)|gt;|lt;)'
+    assert trie_pattern(['ab', 'abc']) == 'ab(?:c)?'
+    assert trie_pattern([]) == ''
+
+
 if __name__ == "__main__":
     test_tokenize_1()
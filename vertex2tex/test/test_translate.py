@@ -134,5 +134,184 @@ def test_translate_5(raw, expected):
     assert translate_snippet(raw) == expected
 
 
+@pytest.mark.parametrize('raw, expected', [
+    # Font letters that fontword reads differently (as 'c' + 'alp', 'b' + 'beta')
+    # used to recurse forever in autosub.
+    ['calp', '\\mathcal{p}'],
+    ['calpn', '\\mathcal{p}_{n}'],
+    ['bbeta', '\\mathbb{\\eta}'],
+    ['xcalp', 'x_{\\mathcal{p}}'],
+])
+def test_translate_6(raw, expected):
+    assert translate_snippet(raw) == expected
+
+
+@pytest.mark.parametrize('raw, keychar, span', [
+    ['frac a over b over c;', None, (14, 18)],
+    ['sum over n from 0 to 1 to 2;', None, (23, 25)],
+    ['@binom n choose k choose j;', '@', (18, 24)],
+    ['x + matrix 1; 2; endmatrix', None, (4, 10)],
+])
+def test_translate_errors(raw, keychar, span):
+    with pytest.raises(VerTeXError) as info:
+        translate_snippet(raw, keychar=keychar)
+    assert info.value.span == span
+
+
+@pytest.mark.parametrize('keychar', [None, '@'])
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_translate_snippets(keychar, jobs):
+    snippets = ['@alp', 'frac 1 over n;', '', '@', 'bet@', '@abs x; ', '@alp'] * 3
+    clear_caches()
+    out = translate_snippets(iter(snippets), keychar=keychar, jobs=jobs, chunk_size=2)
+    assert out == [translate_snippet(s, keychar=keychar) for s in snippets]
+
+
+def test_translate_snippets_errors():
+    with pytest.raises(VerTeXError) as info:
+        translate_snippets(['alp', '@binom n choose k choose j;', '@x x x'], keychar='@')
+    assert info.value.span == (18, 24)
+
+
+def test_compress_many():
+    texts = ['a  b ', ' c', 'x\0 y', '']
+    assert compress_many(texts) == [compress(t) for t in texts]
+    assert compress_many(texts[:2]) == ['a b', ' c']
+    assert compress_many([]) == []
+
+
+def test_document_error_position():
+    doc = 'Let\n$$@\n  sum over n from 0 to 1 to 2;\n@$$\n'
+    with pytest.raises(VerTeXError) as info:
+        translate_document(doc)
+    assert info.value.position() == (3, 26)
+    assert str(info.value) == "3:26: too many arguments: unexpected 'to' (missing ';'?)"
+
+
+def test_deep_nesting():
+    n = 10000
+    out = translate_snippet('frac 1 over 1 + ' * n + 'x' + ';' * n)
+    assert out == '\\frac{1}{1+' * n + ' x' + '}' * n
+    out = translate_snippet('abs ' * n + 'x' + ';' * n)
+    assert out == '\\left|' * n + ' x' + '\\right|' * n
+
+
+class Boxnode(Node):
+
+    def __init__(self, ts):
+        Node.__init__(self, ts)
+        self.commawords = ['endbox']
+
+    def addcomma(self, T):
+        return True
+
+    def build(self):
+        # Expects strings, as custom nodes always have.
+        return '\\boxed{' + self.output.strip() + '}'
+
+
+def test_custom_node():
+    specialnodes['box'] = Boxnode
+    try:
+        inner = 'frac 1 over 1 + ' * 100 + 'x' + ';' * 100
+        out = translate_snippet('qnt box %s endbox;' % inner)
+        assert out == '\\left(\\boxed{%s}\\right)' % translate_snippet(inner)
+    finally:
+        del specialnodes['box']
+
+
+class Listnode(Node):
+    """
+    A custom node written against strings: it builds its output itself.
+    """
+
+    def __init__(self, ts):
+        Node.__init__(self, ts)
+        self.commawords = [';', 'endlist']
+
+    def buildArg(self, s):
+        self.output += s + ' '
+
+    def addcomma(self, T):
+        if T == ';':
+            self.output = self.output.strip() + ', '
+        return T == 'endlist'
+
+    def build(self):
+        return '[' + self.output.strip() + ']'
+
+
+class Bignode(UnaryNode):
+
+    def __init__(self, ts):
+        UnaryNode.__init__(self, ('\\big(', '\\big)'), ts)
+
+    def build(self):
+        return '\\big(' + self.stuff.upper() + '\\big)'
+
+
+def test_custom_node_strings():
+    specialnodes['list'] = Listnode
+    specialnodes['big'] = Bignode
+    try:
+        assert translate_snippet('list alp; frac 1 over 2;; x endlist') == '[\\alpha,\\frac{1}{2}, x]'
+        assert translate_snippet('big a b; + list c endlist') == '\\big( A B\\big)+[c]'
+    finally:
+        del specialnodes['list']
+        del specialnodes['big']
+
+
+class Catnode(Node):
+    """
+    A custom node that joins its items with nothing between them.
+    """
+
+    def __init__(self, ts):
+        Node.__init__(self, ts)
+        self.commawords = ['endcat']
+
+    def buildArg(self, s):
+        self.output += s
+
+    def addcomma(self, T):
+        return True
+
+    def build(self):
+        return '\\cat{%s}' % self.output.strip()
+
+
+def test_assigned_strings():
+    n = Node(TokenStream([]))
+    n.output = 'ab'
+    n.output += 'cd'
+    assert n.output == 'abcd'
+    n.buildArg('e')
+    assert n.output == 'abcde '
+    assert n.build() == 'abcde'
+    m = Matrixnode(TokenStream([]))
+    m.stuff = '1'
+    m.stuff += '2'
+    m.addcomma('cols')
+    assert m.cols == 12 and m.stuff == ''
+    m.stuff = 'a'
+    m.stuff += 'b'
+    m.buildArg('c')
+    m.addcomma(';')
+    assert m.args == ['abc ']
+    p = Padspnode(TokenStream([]))
+    p.stuff = '1'
+    p.stuff += '2'
+    p.addcomma(';')
+    p.stuff = '3'
+    p.addcomma('end')
+    assert p.build() == '12\\: 3'
+    specialnodes['cat'] = Catnode
+    try:
+        assert translate_snippet('cat 2x endcat') == '\\cat{2x}'
+        assert translate_snippet('qnt cat a frac 1 over 2; b endcat;') == '\\left(\\cat{a\\frac{1}{2} b}\\right)'
+    finally:
+        del specialnodes['cat']
+
+
 if __name__ == "__main__":
     test_translate_1()
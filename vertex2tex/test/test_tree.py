@@ -0,0 +1,103 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from vertex2tex.excep import VerTeXError
+from vertex2tex.v2t import translate_snippet, specialnodes, Node
+from vertex2tex.tree import *
+
+from vertex2tex.test.test_tokenize import text1
+
+
+@pytest.mark.parametrize('raw', [
+    text1,
+    'frac a over b;',
+    'sum over n from 0 to infty; an',
+    'sum over n; an',
+    'sum from 0; x',
+    'x sum;',
+    'binom n choose k;',
+    'matrix 2 cols 1; 2; 3; 4 endmatrix',
+    'matrix 2 cols 1; 2; 3',
+    'matrix x cols 1; 2 endmatrix',
+    'padsp 1; 2; 3 end',
+    'abs frac 1 over qnt x; + y',
+    '\\\\foo \\\\ \\bar &lt; #1 a0, a1, ddd, an-1',
+])
+def test_tex_emitter(raw):
+    assert translate_snippet(raw, emitter=tex_emitter) == translate_snippet(raw)
+
+
+def test_parse():
+    tree = parse_snippet('abs x; + frac a over b;')
+    [a, plus, frac] = [c for c in tree.children if not (type(c) is Leaf and c.token.isspace())]
+    assert (a.word, a.kind, a.commas, a.start, a.marks) == ('abs', UNARY, [';'], 0, [5])
+    assert [[c.token for c in arg] for arg in a.args] == [[' ', 'x'], []]
+    assert (plus.kind, plus.token, plus.start) == (PLAIN, '+', 7)
+    assert (frac.word, frac.commas, frac.marks) == ('frac', ['over', ';'], [16, 22])
+    assert parse_snippet('abs x; + frac a over b;') is tree
+
+
+def test_errors():
+    with pytest.raises(VerTeXError) as info:
+        translate_snippet('@frac a over b over c;', keychar='@', emitter=tex_emitter)
+    assert info.value.span == (15, 19)
+    with pytest.raises(VerTeXError) as info:
+        translate_snippet('x + matrix 1; 2; endmatrix', emitter=tex_emitter)
+    assert info.value.span == (4, 10)
+
+
+def test_deep_nesting():
+    n = 10000
+    raw = 'frac 1 over 1 + ' * n + 'x' + ';' * n
+    assert translate_snippet(raw, emitter=tex_emitter) == translate_snippet(raw)
+
+
+class Boxnode(Node):
+
+    def __init__(self, ts):
+        Node.__init__(self, ts)
+        self.commawords = ['endbox']
+
+    def addcomma(self, T):
+        return True
+
+    def build(self):
+        return '\\boxed{' + self.output.strip() + '}'
+
+
+def test_custom_node():
+    specialnodes['box'] = Boxnode
+    try:
+        raw = 'qnt box frac 1 over 2; endbox; + x'
+        tree = parse_snippet(raw)
+        assert tree.children[0].args[0][1].kind == CUSTOM
+        assert tree.children[2].start == 31
+        assert translate_snippet(raw, emitter=tex_emitter) == translate_snippet(raw)
+    finally:
+        del specialnodes['box']
+
+
+class WordEmitter(Emitter):
+    """
+    Writes out the structure of a tree.
+    """
+
+    def leaf(self, leaf):
+        return '' if leaf.token.isspace() else leaf.token
+
+    def bracket(self, b):
+        items = [b.word.upper(), '(']
+        for i, arg in enumerate(b.args[:len(b.commas)]):
+            if i:
+                items.append(', ')
+            items.append(arg)
+        items.append(')')
+        return items
+
+
+def test_custom_emitter():
+    out = translate_snippet('@abs frac a over b; + 1;', keychar='@', emitter=WordEmitter())
+    assert out == 'ABS(FRAC(a, b)+1)'
+    assert translate_snippet('abs x;', keychar='@', emitter=WordEmitter()) == 'abs x;'
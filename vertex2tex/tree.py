@@ -0,0 +1,399 @@
+# VerTeX | Copyright (c) 2010-2022 Steve Kieffer | MIT license
+# SPDX-License-Identifier: MIT
+
+"""
+Parsing snippets into trees, and emitting the trees as TeX, or in any other
+format, in a separate pass.
+
+A tree is a `Snippet`, whose children are `Leaf`s (single tokens) and
+`Bracket`s (bracket words, like `frac` or `matrix`, with their arguments).
+The arguments of a bracket are the runs of children between its comma words,
+just as they were written; it is for the emitter to decide what each of them
+means. For example,
+
+    frac a over b;
+
+parses to a bracket for `frac`, with commas ['over', ';'] and args
+[[' ', a, ' '], [' ', b], []], where a and b are leaves.
+"""
+
+from vertex2tex.excep import *
+from vertex2tex.v2t import (
+    HTML, UNARY, BINARY, TERTIARY, RANGE, SPECIAL, BUILTIN, BSME, FONTWORD,
+    Matrixnode, Node, Padspnode, TokenStream,
+    cached_autosub, compress, flatten, get_tables, initial_letter, _MISSING,
+)
+
+# Kinds of leaf, besides the keyword kinds HTML, BUILTIN, BSME and FONTWORD:
+ESCAPE = 9    # a token beginning with a backslash
+AUTOSUB = 10  # a name, automatically subscripted
+PLAIN = 11    # anything else, passed through
+CUSTOM = 12   # a bracket word handled by a node class other than the built-in ones
+
+
+class Leaf:
+    """
+    A single token.
+
+    kind: see above.
+    token: the token.
+    tex: its translation into TeX.
+    start: its offset in the snippet.
+    """
+
+    __slots__ = ('kind', 'token', 'tex', 'start')
+
+    def __init__(self, kind, token, tex, start):
+        self.kind = kind
+        self.token = token
+        self.tex = tex
+        self.start = start
+
+    def __repr__(self):
+        return 'Leaf(%r)' % self.token
+
+
+class Bracket:
+    """
+    A bracket word, with its arguments.
+
+    kind: UNARY, BINARY, TERTIARY, RANGE or SPECIAL.
+    word: the keyword.
+    value: its entry in the keyword tables (wrappers, or node class).
+    args: the runs of children before, between, and after the comma words.
+    commas: the comma words, in order. (If the snippet ended before the
+        bracket was closed, the last of them is not the closing one.)
+    start: offset of the keyword in the snippet.
+    marks: offsets of the comma words in the snippet.
+    """
+
+    __slots__ = ('kind', 'word', 'value', 'args', 'commas', 'start', 'marks')
+
+    def __init__(self, kind, word, value, start):
+        self.kind = kind
+        self.word = word
+        self.value = value
+        self.args = [[]]
+        self.commas = []
+        self.start = start
+        self.marks = []
+
+    def __repr__(self):
+        return 'Bracket(%r, %r, %r)' % (self.word, self.commas, self.args)
+
+
+class Snippet:
+    """
+    The root of a tree.
+
+    children: the leaves and brackets at top level.
+    """
+
+    __slots__ = ('children',)
+
+    def __init__(self):
+        self.children = []
+
+    def __repr__(self):
+        return 'Snippet(%r)' % self.children
+
+
+def comma_words(kind, value):
+    """
+    :return: pair (comma words, closing word) for a bracket word, as in the
+        corresponding node class.
+    """
+    if kind == UNARY:
+        return [';'], ';'
+    elif kind == BINARY:
+        return [value[1], ';'], ';'
+    elif kind == TERTIARY:
+        return list(value[1]) + [';'], ';'
+    elif kind == RANGE:
+        return ['over', 'from', 'to', ';'], ';'
+    elif value is Matrixnode:
+        return ['cols', ';', 'endmatrix'], 'endmatrix'
+    else:
+        return [';', 'end'], 'end'
+
+# Number of args that can have children: a child beyond them is an error.
+# (Range nodes put children before the first comma into their last argument.)
+ARITY = {BINARY: 2, TERTIARY: 3, RANGE: 4}
+
+
+def parse(tokens, dialect=None):
+    """
+    Parse a list of tokens, in the way that `v2t.Node.xlat` translates them.
+
+    :param dialect: a `dialect.Dialect`, or None for the keyword tables of `config`.
+    :return: Snippet
+    """
+    tables = get_tables(dialect)
+    index = tables.index
+    root = Snippet()
+    ts = TokenStream(tokens, tables)
+    node = root
+    arg = root.children
+    stack = []  # The brackets enclosing `node`, with their comma words.
+    commawords, closer, arity = [], None, None
+    pos = 0
+    T = ts.next()
+    while T:
+        child = None
+        if T[0] == '\\':
+            s = T[2:] if len(T) >= 3 and T[1] == '\\' else T
+            child = Leaf(ESCAPE, T, s, pos)
+        else:
+            entry = index.get(T)
+            if entry is not None and entry[0] <= SPECIAL:
+                kind, value = entry
+                if kind == HTML:
+                    child = Leaf(HTML, T, value, pos)
+                elif kind == SPECIAL and value is not Matrixnode and value is not Padspnode:
+                    # A node class of the user's: let it translate itself.
+                    child = Leaf(CUSTOM, T, flatten(value(ts).xlat()), pos)
+                    # It read more tokens, so find our place again.
+                    pos = ts.offset(ts.getPtr()) - len(T)
+                else:
+                    b = Bracket(kind, T, value, pos)
+                    arg.append(b)
+                    stack.append((node, commawords, closer, arity))
+                    node, arg = b, b.args[0]
+                    commawords, closer = comma_words(kind, value)
+                    arity = ARITY.get(kind)
+            elif T in commawords:
+                node.commas.append(T)
+                node.marks.append(pos)
+                arg = []
+                node.args.append(arg)
+                if T == closer:
+                    close(node)
+                    node, commawords, closer, arity = stack.pop()
+                    arg = node.args[-1] if stack else node.children
+                    if arity is not None and len(node.args) > arity:
+                        raise too_many(node)
+            elif entry is not None:
+                child = Leaf(entry[0], T, entry[1], pos)
+            elif len(T) >= 2 and initial_letter(T) and T.find(' ') == -1:
+                child = Leaf(AUTOSUB, T, cached_autosub(T, tables), pos)
+            else:
+                child = Leaf(PLAIN, T, T, pos)
+        if child is not None:
+            if arity is not None and len(node.args) > arity:
+                raise too_many(node)
+            arg.append(child)
+        pos += len(T)
+        T = ts.next()
+    # Brackets left open are complete, as they are.
+    while stack:
+        close(node)
+        node, commawords, closer, arity = stack.pop()
+        if arity is not None and len(node.args) > arity:
+            raise too_many(node)
+    return root
+
+
+def close(b):
+    """
+    Check a bracket, once it is complete.
+    """
+    if b.value is Matrixnode:
+        cols, entries, err = matrix_layout(b)
+        if cols == 0 and entries and not err:
+            ve = VerTeXError("matrix has entries but no columns (write 'matrix N cols')")
+            ve.set_span((b.start, b.start + len(b.word)))
+            raise ve
+
+
+def matrix_layout(b):
+    """
+    Read the arguments of a matrix, as `v2t.Matrixnode` does.
+
+    :return: triple (number of columns, list of entries, error flag).
+    """
+    entries = []
+    cols = 0
+    err = False
+    for a, c in zip(b.args, b.commas):
+        if c == 'endmatrix':
+            if a: entries.append(a)
+        elif c == 'cols':
+            try: cols = int(tex_emitter.emit(spaced(a)))
+            except ValueError: err = True
+        else:
+            entries.append(a)
+    return cols, entries, err
+
+
+def too_many(node):
+    """
+    Make the error for a child beyond the last argument of a bracket, which
+    is blamed on the comma word before it.
+    """
+    T, a = node.commas[-1], node.marks[-1]
+    ve = VerTeXError("too many arguments: unexpected '%s' (missing ';'?)" % T)
+    ve.set_span((a, a + len(T)))
+    return ve
+
+
+def parse_snippet(text, dialect=None):
+    """
+    Parse a snippet, as `translate_snippet` would translate it with keychar None.
+
+    Trees are cached in `v2t.tree_cache` (or that of the dialect), like
+    translations. They should not be modified.
+
+    :return: Snippet
+    """
+    tables = get_tables(dialect)
+    tree = tables.tree_cache.get(text, _MISSING)
+    if tree is _MISSING:
+        tree = parse(tables.token_re.findall(text), dialect)
+        tables.tree_cache.put(text, tree)
+    return tree
+
+
+###########
+# Emitters
+
+class Emitter:
+    """
+    Base class for emitters.
+
+    The tree is walked without recursion. For each node, the emitter returns
+    a sequence of items, each of which is either a string, which is output
+    as is, or a node, or a sequence of items, each of which is emitted in
+    turn, in place.
+
+    Subclasses implement `leaf`, `bracket`, and optionally `root` and `finish`.
+    """
+
+    def emit(self, tree):
+        """
+        :param tree: a Snippet, or any node or sequence of items.
+        :return: the output, as a string.
+        """
+        out = []
+        stack = []
+        it = iter(self.root(tree) if isinstance(tree, Snippet) else [tree])
+        while True:
+            for x in it:
+                if type(x) is str:
+                    out.append(x)
+                elif type(x) is Leaf:
+                    out.append(self.leaf(x))
+                else:
+                    stack.append(it)
+                    it = iter(self.bracket(x) if type(x) is Bracket else x)
+                    break
+            else:
+                if not stack:
+                    break
+                it = stack.pop()
+        s = ''.join(out)
+        return self.finish(s) if isinstance(tree, Snippet) else s
+
+    def root(self, snippet):
+        return snippet.children
+
+    def leaf(self, leaf):
+        raise NotImplementedError
+
+    def bracket(self, bracket):
+        raise NotImplementedError
+
+    def finish(self, s):
+        return s
+
+
+def spaced(children):
+    """
+    The children of an argument, each one followed by a space, as in `v2t.argstr`.
+    """
+    for c in children:
+        yield c
+        yield ' '
+
+
+class TeXEmitter(Emitter):
+    """
+    Emits the TeX that `translate_snippet` makes.
+    """
+
+    def root(self, snippet):
+        children = snippet.children
+        for i, c in enumerate(children):
+            if i:
+                yield ' '
+            yield c
+
+    def finish(self, s):
+        return compress(s.strip())
+
+    def leaf(self, leaf):
+        return leaf.tex
+
+    def bracket(self, b):
+        kind, w, args = b.kind, b.value, b.args
+        if kind == UNARY:
+            return [w[0], spaced(args[0]), w[1]]
+        elif kind == BINARY:
+            w, c, order = w
+            a = [arg(args, i) for i in order]
+            return [w[0], spaced(a[0]), w[1], spaced(a[1]), w[2]]
+        elif kind == TERTIARY:
+            w, c, order = w
+            a = [arg(args, i) for i in order]
+            return [w[0], spaced(a[0]), w[1], spaced(a[1]), w[2], spaced(a[2]), w[3]]
+        elif kind == RANGE:
+            return self.range(b)
+        elif w is Matrixnode:
+            return self.matrix(b)
+        else:
+            return self.padsp(b)
+
+    def range(self, b):
+        c = b.value
+        args = b.args
+        if b.commas == [';']:
+            return [c, ' ']
+        elif b.commas == ['over', ';']:
+            return [c, '_{', spaced(args[1]), '} ']
+        elif b.commas == ['over', 'from', 'to', ';']:
+            # Children before the first comma belong to the last argument.
+            return [c, '_{', spaced(args[1]), '=', spaced(args[2]), '}^{',
+                    spaced(args[0] + args[3]), '} ']
+        else:
+            return ['--error in range operator--']
+
+    def matrix(self, b):
+        # (The parser has checked that there are columns, if there are entries.)
+        cols, entries, err = matrix_layout(b)
+        if err:
+            return ['-- error in matrix node --']
+        items = ['\\begin{array}{', 'c'*cols, '}']
+        for k, a in enumerate(entries):
+            r = k%cols
+            if r > 0: items.append(' & ')
+            items.append(spaced(a))
+            if r == cols-1: items.append('\\\\')
+        items.append('\n\\end{array}')
+        return items
+
+    def padsp(self, b):
+        entries = []
+        for a, c in zip(b.args, b.commas):
+            if c == ';' or a:
+                entries.append(a)
+        items = []
+        for a in entries:
+            if items: items.append('\\: ')
+            items.append(spaced(a))
+        return items
+
+
+def arg(args, i):
+    return args[i] if i < len(args) else []
+
+
+tex_emitter = TeXEmitter()
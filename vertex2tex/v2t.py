@@ -6,13 +6,46 @@ Translating math mode snippets from VerTeX to TeX.
 """
 
 import re
+from itertools import chain
 
+from vertex2tex import config, profiling, __version__
+from vertex2tex.cache import DiskCache, LRUCache
 from vertex2tex.config import *
+from vertex2tex.excep import *
 
 
 ###############
 # Node classes
 
+class Assigned(str):
+    """
+    A string assigned to `output` or `stuff` (see `ItemText`). Unlike an item,
+    it is not followed by a space.
+    """
+
+
+class ItemText:
+    """
+    The items given to a node (by `buildArg`), as a string in which each item
+    is followed by a space, as nodes have always kept them in `output` or
+    `stuff`. The items themselves are kept in a list, named `name`, which
+    assigning the string replaces, so that custom nodes may still build it up
+    with `+=`. An assigned string is kept as it is, as the first item, and
+    any items given after it follow it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, node, cls=None):
+        if node is None:
+            return self
+        return flatten(argstr(getattr(node, self.name)))
+
+    def __set__(self, node, s):
+        setattr(node, self.name, [Assigned(s)] if s else [])
+
+
 class Node:
     """
     The basic Node class, which contains the basic translation method (`xlat`).
@@ -21,9 +54,11 @@ class Node:
     `addcomma`, and `build`, as needed.
     """
 
+    output = ItemText('_output')
+
     def __init__(self, token_stream):
         self.toks = token_stream
-        self.output = ''
+        self._output = []
         # Subclasses should override self.commawords, if necessary.
         self.commawords = []  # Basic Node considers nothing to be a commaword.
 
@@ -33,7 +68,7 @@ class Node:
     # the following three methods.
 
     def buildArg(self, s):
-        self.output += s+' '
+        self._output.append(s)
 
     def addcomma(self, T):
         """
@@ -43,15 +78,65 @@ class Node:
         return False
 
     def build(self):
-        return self.output.strip()
+        return flatten(argstr(self._output)).strip()
 
     ###########################################################
 
+    def error(self, msg, i=None):
+        """
+        Make a VerTeXError, noting where in the snippet it occurred.
+
+        :param msg: the message.
+        :param i: the index of the token at fault. Default: the token most
+            recently read.
+        """
+        if i is None:
+            i = self.toks.getPtr() - 1
+        ve = VerTeXError(msg)
+        ve.set_span(self.toks.span(i))
+        return ve
+
+    def toomany(self):
+        """
+        Make the error for an argument beyond the last, which is blamed on the
+        comma word before it.
+        """
+        i = self.lastcomma
+        T = self.toks.getSlice(i, i + 1)[0]
+        return self.error("too many arguments: unexpected '%s' (missing ';'?)" % T, i)
+
     def xlat(self):
-        T = self.toks.next()
-        while T:
+        """
+        Translate tokens from the stream, until this node is complete.
+
+        Nested bracket words do not recurse: the nodes still open are kept on
+        an explicit stack, so that nesting depth is limited only by memory.
+        See also `pass_up`, which keeps the time linear in the depth.
+        """
+        toks = self.toks
+        tables = toks.tables or get_tables()
+        index = tables.index
+        node = self
+        stack = []  # The nodes enclosing `node`.
+        prof = profiling.active
+        if prof is not None:
+            clock = profiling.clock
+            opened = []  # The kinds of the nodes on the stack, and when they were opened.
+        T = toks.next()
+        while True:
+            if not T:
+                # The stream is exhausted, so all open nodes are complete.
+                if not stack:
+                    break
+                s = node.build()
+                node = stack.pop()
+                node.buildArg(pass_up(s, node))
+                if prof is not None:
+                    kind, t0 = opened.pop()
+                    prof.kind(KIND_NAMES[kind], clock() - t0)
+
             # First check if the token is escaped with a \.
-            if T[0] == '\\':
+            elif T[0] == '\\':
                 # Tokens beginning with double backslash and having at least one character beyond
                 # that are passed through after lopping off the backslashes.
                 if len(T) >= 3 and T[1] == '\\':
@@ -61,94 +146,164 @@ class Node:
                 # by nothing else, as is used in TeX arrays, for example.
                 else:
                     s = T
-                self.buildArg(s)
-
-            # Let HTML codes like &gt; and &lt; pass through unaltered.
-            elif T in html_exceptions:
-                s = T
-                self.buildArg(s)
-
-            elif T in unarynodes:
-                code = unarynodes[T]
-                lefty = UnaryNode(code, self.toks)
-                s = lefty.xlat()
-                self.buildArg(s)
-
-            elif T in binarynodes:
-                w, c, o = binarynodes[T]
-                lefty = BinaryNode(w, c, o, self.toks)
-                s = lefty.xlat()
-                self.buildArg(s)
-
-            elif T in tertiarynodes:
-                w, c, o = tertiarynodes[T]
-                lefty = TertiaryNode(w, c, o, self.toks)
-                s = lefty.xlat()
-                self.buildArg(s)
-
-            elif T in rangenodes:
-                symbol = rangenodes[T]
-                lefty = RangeNode(symbol,self.toks)
-                s = lefty.xlat()
-                self.buildArg(s)
-
-            elif T in specialnodes:
-                klass = specialnodes[T]
-                lefty = klass(self.toks)
-                s = lefty.xlat()
-                self.buildArg(s)
-
-            elif T in self.commawords:
-                tobreak = self.addcomma(T)
-                if tobreak: break
-
-            elif T in builtins:
-                s = builtins[T]
-                self.buildArg(s)
-
-            elif T in bsmes:
-                self.buildArg('\\'+T)
-
-            elif fontword(T):
-                s = fontword(T)
-                self.buildArg(s)
-
-            #Automatic subscripting
-            elif (len(T) >= 2 and
-                  re.match('[A-Za-z]', T) and
-                  T.find(' ') == -1):
-                s = autosub(T)
-                self.buildArg(s)
-
-            #Anything else just passes through.
+                node.buildArg(s)
+
             else:
-                self.buildArg(T)
+                entry = index.get(T)
+
+                # Keywords whose kind outranks the commawords.
+                if entry is not None and entry[0] <= SPECIAL:
+                    kind, value = entry
+                    # Let HTML codes like &gt; and &lt; pass through unaltered.
+                    if kind == HTML:
+                        node.buildArg(value)
+                        if prof is not None:
+                            prof.kind('html')
+                    else:
+                        if prof is not None:
+                            t0 = clock()
+                        child = bracket_node(kind, value, toks)
+                        if type(child).xlat is Node.xlat:
+                            # Open the child, and carry on with its tokens.
+                            stack.append(node)
+                            node = child
+                            if prof is not None:
+                                opened.append((kind, t0))
+                        else:
+                            node.buildArg(child.xlat())
+                            if prof is not None:
+                                prof.kind('special', clock() - t0)
+
+                elif T in node.commawords:
+                    if node.addcomma(T):
+                        if not stack:
+                            break
+                        s = node.build()
+                        node = stack.pop()
+                        node.buildArg(pass_up(s, node))
+                        if prof is not None:
+                            kind, t0 = opened.pop()
+                            prof.kind(KIND_NAMES[kind], clock() - t0)
+
+                # Built-ins, bsmes, and font words: the index already holds their output.
+                elif entry is not None:
+                    node.buildArg(entry[1])
+                    if prof is not None:
+                        prof.kind(KIND_NAMES[entry[0]])
+
+                #Automatic subscripting
+                elif (len(T) >= 2 and
+                      initial_letter(T) and
+                      T.find(' ') == -1):
+                    if prof is None:
+                        node.buildArg(cached_autosub(T, tables))
+                    else:
+                        t0 = clock()
+                        s = cached_autosub(T, tables)
+                        prof.kind('autosub', clock() - t0)
+                        node.buildArg(s)
+
+                #Anything else just passes through.
+                else:
+                    node.buildArg(T)
 
             #Get the next token.
-            T = self.toks.next()
+            T = toks.next()
+
+        return flatten(self.build())
 
-        s = self.build()
-        return s
+
+def argstr(parts):
+    """
+    Join the parts of a node argument, each one followed by a space.
+
+    If any of the parts is a list of parts (see `flatten`), then so is the result.
+    """
+    if not parts:
+        return ''
+    p = parts[0]
+    if type(p) is Assigned:
+        # A string assigned to the argument, which no space follows.
+        rest = argstr(parts[1:])
+        try:
+            return p + rest
+        except TypeError:
+            return [p, rest]
+    try:
+        return ' '.join(parts)+' '
+    except TypeError:
+        out = []
+        for p in parts:
+            out.append(p)
+            out.append(' ')
+        return out
+
+# Outputs of nested nodes longer than this are passed up without copying.
+ROPE_MIN = 256
+
+def pass_up(s, parent):
+    """
+    Prepare the output of a nested node to be passed to its parent.
+
+    Joining the output of each node into that of its parent would copy the
+    innermost output once per level of nesting, which is quadratic in the
+    depth. So a long output is passed up to the built-in node classes as a
+    list of parts (see `flatten`), which they join only as far as needed.
+    Other node classes receive strings, as always.
+    """
+    if type(parent) not in ROPE_NODES:
+        return flatten(s)
+    if type(s) is str and len(s) > ROPE_MIN:
+        return [s]
+    return s
+
+def flatten(parts):
+    """
+    Join a string, or a list of parts, where each part is itself a string or
+    a list of parts, and so on, to any depth.
+    """
+    if isinstance(parts, str):
+        return parts
+    out = []
+    stack = []
+    it = iter(parts)
+    while True:
+        for p in it:
+            if isinstance(p, str):
+                out.append(p)
+            else:
+                stack.append(it)
+                it = iter(p)
+                break
+        else:
+            if not stack:
+                return ''.join(out)
+            it = stack.pop()
 
 
 class UnaryNode(Node):
 
+    stuff = ItemText('_stuff')
+
     def __init__(self, wrappers, ts):
         self.toks = ts
         self.wrappers = wrappers
-        self.stuff = ''
+        self._stuff = []
         self.commawords = [';']
 
     def buildArg(self, s):
-        self.stuff += s+' '
+        self._stuff.append(s)
 
     def addcomma(self, T):
         return True
 
     def build(self):
-        a = self.stuff
+        a = argstr(self._stuff)
         w = self.wrappers
-        s = w[0]+a+w[1]
+        try:
+            s = w[0]+a+w[1]
+        except TypeError:
+            s = [w[0], a, w[1]]
         return s
 
 class BinaryNode(Node):
@@ -158,20 +313,27 @@ class BinaryNode(Node):
         self.wrappers = wrappers
         self.commawords = [comma,';']
         self.order = order
-        self.args = ['','']
+        self.args = [[], []]
         self.argptr = 0
 
     def buildArg(self, s):
-        self.args[self.argptr] += s+' '
+        try:
+            self.args[self.argptr].append(s)
+        except IndexError:
+            raise self.toomany() from None
 
     def addcomma(self, T):
         self.argptr += 1
+        self.lastcomma = self.toks.getPtr() - 1
         return T == ';'
 
     def build(self):
-        a, b = [self.args[i] for i in self.order]
+        a, b = [argstr(self.args[i]) for i in self.order]
         w = self.wrappers
-        s = w[0]+a+w[1]+b+w[2]
+        try:
+            s = w[0]+a+w[1]+b+w[2]
+        except TypeError:
+            s = [w[0], a, w[1], b, w[2]]
         return s
 
 class TertiaryNode(Node):
@@ -181,22 +343,29 @@ class TertiaryNode(Node):
         self.wrappers = wrappers
         self.commawords = list(comma)+[';']
         self.order = order
-        self.args = ['','','']
+        self.args = [[], [], []]
         self.argptr = 0
         self.commaseq = []
 
     def buildArg(self, s):
-        self.args[self.argptr] += s+' '
+        try:
+            self.args[self.argptr].append(s)
+        except IndexError:
+            raise self.toomany() from None
 
     def addcomma(self, T):
         self.argptr += 1
         self.commaseq.append(T)
+        self.lastcomma = self.toks.getPtr() - 1
         return T == ';'
 
     def build(self):
-        a, b, c = [self.args[i] for i in self.order]
+        a, b, c = [argstr(self.args[i]) for i in self.order]
         w = self.wrappers
-        s = w[0]+a+w[1]+b+w[2]+c+w[3]
+        try:
+            s = w[0]+a+w[1]+b+w[2]+c+w[3]
+        except TypeError:
+            s = [w[0], a, w[1], b, w[2], c, w[3]]
         return s
 
 class RangeNode(Node):
@@ -205,16 +374,20 @@ class RangeNode(Node):
         self.toks = ts
         self.symbol = symbol
         self.commawords = ['over', 'from', 'to', ';']
-        self.args = ['', '', '']
+        self.args = [[], [], []]
         self.argptr = -1
         self.commaseq = []
 
     def buildArg(self, s):
-        self.args[self.argptr] += s+' '
+        try:
+            self.args[self.argptr].append(s)
+        except IndexError:
+            raise self.toomany() from None
 
     def addcomma(self, T):
         self.argptr += 1
         self.commaseq.append(T)
+        self.lastcomma = self.toks.getPtr() - 1
         return T == ';'
 
     def build(self):
@@ -222,12 +395,18 @@ class RangeNode(Node):
             s = self.symbol+' '
         elif self.commaseq == ['over', ';']:
             c = self.symbol
-            r = self.args[0]
-            s = c+'_{'+r+'} '
+            r = argstr(self.args[0])
+            try:
+                s = c+'_{'+r+'} '
+            except TypeError:
+                s = [c, '_{', r, '} ']
         elif self.commaseq == ['over', 'from', 'to', ';']:
             c = self.symbol
-            v, a, b = self.args
-            s = c+'_{'+v+'='+a+'}^{'+b+'} '
+            v, a, b = [argstr(arg) for arg in self.args]
+            try:
+                s = c+'_{'+v+'='+a+'}^{'+b+'} '
+            except TypeError:
+                s = [c, '_{', v, '=', a, '}^{', b, '} ']
         else:
             s = '--error in range operator--'
         return s
@@ -250,29 +429,33 @@ class Matrixnode(Node):
      one blank row at the end of your matrix.)
     """
 
+    stuff = ItemText('_stuff')
+
     def __init__(self, ts):
         self.toks = ts
         self.commawords = ['cols', ';', 'endmatrix']
         self.args = []
-        self.stuff = ''
+        self._stuff = []
         self.cols = 0
         self.err = False
+        # Index of the 'matrix' token.
+        self.start = ts.getPtr() - 1
 
     def buildArg(self, s):
-        self.stuff += s+' '
+        self._stuff.append(s)
 
     def addcomma(self, c):
         if c == 'endmatrix':
-            if self.stuff: self.args.append(self.stuff)
+            if self._stuff: self.args.append(argstr(self._stuff))
             done = True
         elif c == 'cols':
-            try: self.cols = int(self.stuff)
+            try: self.cols = int(flatten(argstr(self._stuff)))
             except: self.err = True
-            self.stuff = ''
+            self._stuff = []
             done = False
         else: # c == ';'
-            self.args.append(self.stuff)
-            self.stuff = ''
+            self.args.append(argstr(self._stuff))
+            self._stuff = []
             done = False
         return done
 
@@ -280,17 +463,22 @@ class Matrixnode(Node):
         if self.err: s = '-- error in matrix node --'
         else:
             C = self.cols
-            s = '\\begin{array}{'
-            s += 'c'*C
-            s += '}'
             A = self.args
+            if C == 0 and A:
+                raise self.error("matrix has entries but no columns (write 'matrix N cols')", self.start)
+            parts = ['\\begin{array}{', 'c'*C, '}']
             for k in range(len(A)):
                 r = k%C
-                if r > 0: s += ' & '
-                s += A[k]
-                if r == C-1: s += '\\\\'
-            if s[-1] != '\n': s += '\n'
-            s += '\\end{array}'
+                if r > 0: parts.append(' & ')
+                parts.append(A[k])
+                if r == C-1: parts.append('\\\\')
+            # Each entry ends with a space (or is empty), so the array never
+            # ends with a newline here.
+            parts.append('\n\\end{array}')
+            try:
+                s = ''.join(parts)
+            except TypeError:
+                s = parts
         return s
 
 
@@ -307,59 +495,385 @@ class Padspnode(Node):
     write the keyword 'end'.
     """
 
+    stuff = ItemText('_stuff')
+
     def __init__(self, ts):
         self.toks = ts
         self.commawords = [';', 'end']
         self.args = []
-        self.stuff = ''
+        self._stuff = []
         self.spacer = '\\: '
         self.err = False
 
     def buildArg(self, s):
-        self.stuff += s+' '
+        self._stuff.append(s)
 
     def addcomma(self, c):
         if c == 'end':
-            if self.stuff: self.args.append(self.stuff)
+            if self._stuff: self.args.append(argstr(self._stuff))
             done = True
         else: # c == ';'
-            self.args.append(self.stuff)
-            self.stuff = ''
+            self.args.append(argstr(self._stuff))
+            self._stuff = []
             done = False
         return done
 
     def build(self):
         if self.err: s = '-- error in padsp node --'
         else:
-            s = self.spacer.join(self.args)
+            try:
+                s = self.spacer.join(self.args)
+            except TypeError:
+                s = []
+                for a in self.args:
+                    if s: s.append(self.spacer)
+                    s.append(a)
         return s
 
-specialnodes = {
+# The node classes whose `buildArg` accepts lists of parts (see `flatten`), as
+# well as strings. (Not their subclasses, which may expect only strings.)
+ROPE_NODES = {Node, UnaryNode, BinaryNode, TertiaryNode, RangeNode, Matrixnode, Padspnode}
+
+specialnodes = KeywordDict({
     'matrix': Matrixnode,
     'padsp': Padspnode
-}
+})
 
 ##########
-# Auto-subscripting
+# Keyword dispatch
+
+# Handler kinds, in order of precedence. A token that is a keyword of more
+# than one kind is handled as the first of these. The commawords of the
+# current node rank between SPECIAL and BUILTIN.
+HTML, UNARY, BINARY, TERTIARY, RANGE, SPECIAL, BUILTIN, BSME, FONTWORD = range(9)
+
+# Their names, as in `profiling`.
+KIND_NAMES = ['html', 'unary', 'binary', 'tertiary', 'range', 'special', 'builtin', 'bsme', 'fontword']
+
+# The keyword tables of each kind, by name.
+KIND_TABLES = [
+    (HTML, 'html_exceptions'),
+    (UNARY, 'unarynodes'),
+    (BINARY, 'binarynodes'),
+    (TERTIARY, 'tertiarynodes'),
+    (RANGE, 'rangenodes'),
+    (SPECIAL, 'specialnodes'),
+    (BUILTIN, 'builtins'),
+    (BSME, 'bsmes'),
+]
+
+def keyword_table(name):
+    """
+    :return: the keyword table of a name in `config` (or `specialnodes`). The
+        'letters' are those of `bsme_letters` and `Greek_three_letter`.
+    """
+    if name == 'specialnodes':
+        return specialnodes
+    if name == 'letters':
+        return list(bsme_letters) + list(Greek_three_letter)
+    return getattr(config, name)
 
-# Regular expressions to match letter sets and variations:
+def keyword_value(kind, T):
+    """
+    :return: the value in the dispatch index of a keyword T of a kind whose
+        table is a list: the HTML code itself, or the bsme with its backslash.
+    """
+    return T if kind == HTML else '\\' + T
 
-any_letter = all_letter_re_component+"|[A-Za-z]"
-letter_matcher = re.compile(any_letter)
+def build_dispatch_index(table=keyword_table):
+    """
+    Build the keyword dispatch index from the keyword tables.
 
-opt_font_any_letter = '(%s)?(%s)' % (
-    font_prefix_re_component, any_letter
-)
-letter_matcher_fonts = re.compile(opt_font_any_letter)
+    :param table: function giving the keyword table of a name.
+    :return: dict mapping each keyword to a pair (kind, value). For bracket words
+        the value is what the node class needs to be constructed; for HTML codes,
+        built-ins and bsmes it is the finished output.
+    """
+    index = {}
+    for kind, name in KIND_TABLES:
+        t = table(name)
+        for T in t:
+            if T not in index:
+                index[T] = (kind, t[T] if isinstance(t, dict) else keyword_value(kind, T))
+    return index
+
+def bracket_node(kind, value, ts):
+    """
+    Construct the node that handles a bracket word of the given kind.
+    """
+    if kind == UNARY:
+        return UnaryNode(value, ts)
+    elif kind == BINARY:
+        w, c, o = value
+        return BinaryNode(w, c, o, ts)
+    elif kind == TERTIARY:
+        w, c, o = value
+        return TertiaryNode(w, c, o, ts)
+    elif kind == RANGE:
+        return RangeNode(value, ts)
+    else:
+        return value(ts)
 
-r = '(%s|[0-9,+-])' % opt_font_any_letter
-sub_matcher = re.compile(r)
+class Tables:
+    """
+    What is derived from the keyword tables of `config`, or of a dialect (see
+    `dialect.Dialect`), to translate by them: the dispatch index, the font
+    words, the tokenizer, the letter matchers, and caches of translations.
+    See `get_tables`.
+    """
 
-r = r'(UU|uu|vv|\^\^\^|\^\^|__|%s|[0-9,+-])' % opt_font_any_letter
-uusub_matcher = re.compile(r)
+    def __init__(self, dialect=None, cache_size=10000):
+        self.dialect = dialect
+        # The version of the tables from which all this was built.
+        self.version = None
+        self.index = None
+        self.fontwords = None
+        self.token_re = None
+        self.letters = None
+        self.fonts = None
+        self.letter_matcher = None
+        self.letter_matcher_fonts = None
+        self.sub_matcher = None
+        self.uusub_matcher = None
+        # Translated snippets, keyed by (text, keychar).
+        self.snippet_cache = LRUCache(maxsize=cache_size)
+        # Parsed snippets (see `tree.parse_snippet`), keyed by text.
+        self.tree_cache = LRUCache(maxsize=1000)
+        # Translated identifiers.
+        self.autosub_cache = LRUCache(maxsize=cache_size)
+        # Translations of subscript pieces, which come from a finite set.
+        self.letter_words = {}
+        # See `fingerprint`.
+        self.fingerprint = None
+
+    def clear_caches(self):
+        self.snippet_cache.clear()
+        self.tree_cache.clear()
+        self.autosub_cache.clear()
+        self.letter_words.clear()
+
+    def build(self, table):
+        """
+        Build everything from the keyword tables.
 
+        :param table: function giving the keyword table of a name.
+        """
+        self.letters = sorted(table('letters'), key=len, reverse=True)
+        self.fonts = table('fonts')
+        self.build_letter_matchers()
+        keywords = build_dispatch_index(table)
+        self.fontwords = build_fontword_index(keywords, self.letters, self.fonts, self.letter_matcher)
+        index = dict(keywords)
+        for T, s in self.fontwords.items():
+            index.setdefault(T, (FONTWORD, s))
+        self.index = index
+        self.token_re = build_token_re(table('html_exceptions'))
+
+    def build_letter_matchers(self):
+        """
+        Compile `letter_matcher`, `letter_matcher_fonts`, `sub_matcher` and
+        `uusub_matcher`, for `letters` and `fonts`. Each alternation lists the
+        longer names first, so that the longest name is matched.
+        """
+        any_letter = '|'.join(self.letters + ['[A-Za-z]'])
+        prefixes = '|'.join(sorted(self.fonts, key=len, reverse=True))
+        opt_font_any_letter = '(%s)?(%s)' % (prefixes, any_letter)
+        self.letter_matcher = re.compile(any_letter)
+        self.letter_matcher_fonts = re.compile(opt_font_any_letter)
+        self.sub_matcher = re.compile('(%s|[0-9,+-])' % opt_font_any_letter)
+        self.uusub_matcher = re.compile(r'(UU|uu|vv|\^\^\^|\^\^|__|%s|[0-9,+-])' % opt_font_any_letter)
+
+    def layer(self, parent, dialect):
+        """
+        Build everything for a dialect from what was built for its parent,
+        looking up again only the keywords that the dialect changes. (If it
+        changes letters, fonts, or the keywords for letters, on which the font
+        words depend, everything is built from its tables instead. The letters
+        include the ASCII letters, as in `build_fontword_index`.)
+
+        :param parent: the Tables of the parent.
+        :param dialect: the dialect.
+        """
+        changes = dialect.changes()
+        changed = set().union(*changes.values())
+        if (changes['letters'] or changes['fonts'] or not changed.isdisjoint(parent.letters)
+                or not changed.isdisjoint(ASCII_LETTERS)):
+            self.build(dialect.merged)
+            return
+        self.letters, self.fonts = parent.letters, parent.fonts
+        self.letter_matcher = parent.letter_matcher
+        self.letter_matcher_fonts = parent.letter_matcher_fonts
+        self.sub_matcher = parent.sub_matcher
+        self.uusub_matcher = parent.uusub_matcher
+        self.fontwords = parent.fontwords
+        index = dict(parent.index)
+        for T in changed:
+            for kind, name in KIND_TABLES:
+                value = dialect.get(name, T)
+                if value is not None:
+                    if name in ('html_exceptions', 'bsmes'):
+                        value = keyword_value(kind, T)
+                    index[T] = (kind, value)
+                    break
+            else:
+                if T in self.fontwords:
+                    index[T] = (FONTWORD, self.fontwords[T])
+                else:
+                    index.pop(T, None)
+        self.index = index
+        if changes['html_exceptions']:
+            self.token_re = build_token_re(dialect.merged('html_exceptions'))
+        else:
+            self.token_re = parent.token_re
+
+# The Tables of `config`.
+default_tables = Tables()
+
+# Built lazily, by sync_tables: those of `default_tables`.
+dispatch_index = None
+fontword_index = None
+TOKEN_RE = None
+letter_matcher = None
+letter_matcher_fonts = None
+sub_matcher = None
+uusub_matcher = None
+
+# Translated snippets, keyed by (text, keychar).
+snippet_cache = default_tables.snippet_cache
 
-def autosub(s):
+# Parsed snippets (see `tree.parse_snippet`), keyed by text.
+tree_cache = default_tables.tree_cache
+
+# Translated snippets on disk, shared between processes and runs, if enabled
+# by `use_disk_cache`.
+disk_cache = None
+
+# Marks a cache miss.
+_MISSING = object()
+
+# The version of the keyword tables from which `dispatch_index` was built.
+_synced_version = None
+
+def sync_tables():
+    """
+    Bring the dispatch index and the tokenizer up to date with the keyword
+    tables, and drop any cached translations, if the tables have been changed
+    since last time.
+
+    :return: the dispatch index.
+    """
+    global dispatch_index, fontword_index, TOKEN_RE, _synced_version
+    global letter_matcher, letter_matcher_fonts, sub_matcher, uusub_matcher
+    if config._version != _synced_version:
+        version = config._version
+        t = default_tables
+        t.build(keyword_table)
+        dispatch_index, fontword_index, TOKEN_RE = t.index, t.fontwords, t.token_re
+        letter_matcher, letter_matcher_fonts = t.letter_matcher, t.letter_matcher_fonts
+        sub_matcher, uusub_matcher = t.sub_matcher, t.uusub_matcher
+        t.fingerprint = None
+        t.clear_caches()
+        t.version = _synced_version = version
+    return dispatch_index
+
+def get_tables(dialect=None):
+    """
+    :param dialect: a `dialect.Dialect`, or None for the tables of `config`.
+    :return: the Tables of the dialect, brought up to date with its keyword
+        tables (and any cached translations dropped), if they have been changed
+        since last time.
+    """
+    if dialect is None:
+        if config._version != _synced_version:
+            sync_tables()
+        return default_tables
+    tables = dialect.tables
+    if tables is None or tables.version != dialect.version:
+        parent = get_tables(dialect.parent)
+        version = dialect.version
+        if tables is None:
+            tables = dialect.tables = Tables(dialect, dialect.cache_size)
+        tables.layer(parent, dialect)
+        tables.fingerprint = None
+        tables.clear_caches()
+        tables.version = version
+    return tables
+
+def clear_caches(dialect=None):
+    """
+    Drop all cached translations (of a dialect, or of `config`).
+    """
+    tables = default_tables if dialect is None else dialect.tables
+    if tables is not None:
+        tables.clear_caches()
+
+def use_disk_cache(directory, max_bytes=1 << 28):
+    """
+    Keep translated snippets in a database in a directory, in addition to
+    `snippet_cache`, so that they outlast this process. Any number of
+    processes may share the directory.
+
+    Entries are keyed by the snippet, the keychar, the keyword tables (see
+    `fingerprint`) and the version of this package, so they never go stale.
+    Dialects share the disk cache.
+
+    :param directory: the directory, or None to stop using a disk cache.
+    :param max_bytes: the size to which the database is bounded.
+    :return: the `cache.DiskCache`, or None.
+    """
+    global disk_cache
+    if disk_cache is not None:
+        disk_cache.close()
+    disk_cache = None if directory is None else DiskCache(directory, max_bytes=max_bytes)
+    return disk_cache
+
+def fingerprint(dialect=None):
+    """
+    :param dialect: a `dialect.Dialect`, or None for the tables of `config`.
+    :return: a hash of all the keyword tables, as a hex string.
+    """
+    t = get_tables(dialect)
+    if t.fingerprint is None:
+        import hashlib
+        if dialect is None:
+            h = hashlib.sha256()
+            tables = [(name, t) for name, t in vars(config).items()
+                      if isinstance(t, (KeywordDict, KeywordList))]
+            tables.append(('specialnodes', specialnodes))
+        else:
+            # The parent's, and the dialect's own changes.
+            h = hashlib.sha256(fingerprint(dialect.parent).encode('ascii'))
+            tables = [(name, getattr(dialect, name)) for name in sorted(dialect.removed)]
+            tables += [('-' + name, sorted(keys)) for name, keys in dialect.removed.items()]
+        for name, table in sorted(tables, key=lambda p: p[0]):
+            items = sorted(table.items()) if isinstance(table, dict) else list(enumerate(table))
+            h.update(repr((name, [(k, _fingerprint_value(v)) for k, v in items])).encode('utf-8'))
+        t.fingerprint = h.hexdigest()
+    return t.fingerprint
+
+def _fingerprint_value(v):
+    if isinstance(v, type):
+        return '%s.%s' % (v.__module__, v.__qualname__)
+    return v
+
+def disk_key(text, keychar, dialect=None):
+    """
+    :return: the key for a snippet in the disk cache.
+    """
+    import hashlib
+    parts = [__version__, fingerprint(dialect), keychar or '', text]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8', 'surrogatepass')).hexdigest()
+
+##########
+# Auto-subscripting
+
+# The regular expressions to match letter sets and variations are built with
+# the other tables (see `Tables.build_letter_matchers`).
+
+initial_letter = re.compile('[A-Za-z]').match
+
+
+def autosub(s, dialect=None):
     r"""
     Autosubscripting (and superscripting).
 
@@ -389,85 +903,144 @@ def autosub(s):
     """
     #Make sure s starts with a letter, and has no spaces.
     #If it is not so, then return the empty string.
-    if not re.match('[A-Za-z]', s) or s.find(' ') >= 0: return ''
-
-    #translator class
-    class Xlator:
-
-        def __init__(self):
-            self.vvcount = 0
-            self.state = 0
+    if not initial_letter(s) or s.find(' ') >= 0: return ''
 
-        def reset(self):
-            self.vvcount = 0; self.state = 0
-
-        def xlat(self,t):
-            s = ''
-
-            if t in ['uu', '^^']: s = '}^{'
-            elif t in ['UU', '^^^']:
-                if self.vvcount == 0:
-                    s = t
-                else:
-                    self.vvcount -= 1
-                    s = '}}^{'
-            elif t in ['vv', '__']:
-                # If 'vv' is the very first token, do not raise vvcount.
-                if self.state > 0: self.vvcount += 1
-                s = '_{'
-            else: s = Node(TokenStream([t])).xlat()
-
-            if self.state == 0: self.state = 1
-            return s
-
-        def getvvcount(self):
-            return self.vvcount
-
-    #create translator instance
-    X = Xlator()
+    return cached_autosub(s, get_tables(dialect))
 
+def cached_autosub(s, tables):
+    """
+    :return: the output of `autosub`, for a string that `autosub` accepts, by
+        the given Tables, which are already up to date.
+    """
+    out = tables.autosub_cache.get(s, _MISSING)
+    if out is _MISSING:
+        prof = profiling.active
+        if prof is not None:
+            t0 = profiling.clock()
+        out = _autosub(s, tables)
+        tables.autosub_cache.put(s, out)
+        if prof is not None:
+            prof.stage('autosub', profiling.clock() - t0)
+    return out
+
+def _autosub(s, tables):
     #Match the longest initial vertex letter.
-    M = letter_matcher_fonts.match(s)
-    L = X.xlat(M.group())
-    s = s[M.end():]
+    M = tables.letter_matcher_fonts.match(s)
+    L = letter_word(M.group(), tables)
 
     #Parse and translate the subscript.
-    X.reset()
-    A = uusub_matcher.findall(s)
-    sub = ' '.join([X.xlat(x[0]) for x in A])
-    sub = '_{'+sub+'}'
-    sub += '}'*X.getvvcount()
+    #A 'vv' deepens the subscript, unless it is the very first piece.
+    vvcount = 0
+    first = True
+    pieces = []
+    for x in tables.uusub_matcher.findall(s, M.end()):
+        t = x[0]
+        if t == 'uu' or t == '^^':
+            t = '}^{'
+        elif t == 'UU' or t == '^^^':
+            if vvcount > 0:
+                vvcount -= 1
+                t = '}}^{'
+        elif t == 'vv' or t == '__':
+            if not first: vvcount += 1
+            t = '_{'
+        else:
+            t = letter_word(t, tables)
+        pieces.append(t)
+        first = False
+    sub = '_{'+' '.join(pieces)+'}'
+    sub += '}'*vvcount
     if sub[:3] == '_{}': sub = sub[3:] # in case started with uu
     elif sub[:3] == '_{_': sub = sub[2:] # in case started with vv
 
     return L+sub
 
+def letter_word(t, tables):
+    """
+    Translate a piece of an automatic subscript: a letter name (with or
+    without font prefix), a digit, or one of the characters [+-,].
+
+    This is what a Node would make of the piece on its own, except that a
+    font prefix and letter which `fontword` does not recognize as such (like
+    'calp', which it reads as 'c' followed by 'alp') is still given its font,
+    instead of being sent back to `autosub`.
+    """
+    out = tables.letter_words.get(t)
+    if out is None:
+        M = tables.letter_matcher_fonts.fullmatch(t)
+        if M is None or t in tables.index:
+            out = Node(TokenStream([t], tables)).xlat()
+        elif M.group(1):
+            out = '\\%s{%s}' % (tables.fonts[M.group(1)], letter_word(M.group(2), tables))
+        else:
+            out = t
+        tables.letter_words[t] = out
+    return out
+
+# Those of `default_tables`.
+letter_words = default_tables.letter_words
+autosub_cache = default_tables.autosub_cache
+
 ##########
 
-def fontword(T):
+def fontword(T, dialect=None):
     """
     Check whether T is of the form <font><letter>.
     If so, return the string that should be passed to
     the parsing node's buildArg method. If not, return
     an empty string.
     """
-    #translation function
-    def xlat(t):
-        return Node(TokenStream([t])).xlat()
-
-    s = ''
-    if len(T) > 0 and letter_matcher.split(T)[-1] == '':
-        letter = letter_matcher.findall(T)[-1]
-        prefix = T[:-len(letter)]
-        if prefix in fonts:
-            font = fonts[prefix]
-            letter = xlat(letter)
-            s = '\\%s{%s}'%(font,letter)
-    return s
+    return get_tables(dialect).fontwords.get(T, '')
+
+# As in the string module, which is slow to import.
+ascii_letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+ASCII_LETTERS = frozenset(ascii_letters)
+
+def build_fontword_index(keywords, letters, fonts, letter_matcher):
+    """
+    Find all tokens of the form <font><letter>, and their translations.
+
+    A token counts as such if the last letter that `letter_matcher` finds in it
+    is preceded by a font prefix, and nothing else. Since the candidates are
+    just the font prefixes followed by the letter names, we can try them all.
+
+    :param keywords: the dispatch index, without font words, by which to
+        translate the letters.
+    :param letters: the letter names.
+    :param fonts: dict mapping the font prefixes to the fonts.
+    :param letter_matcher: compiled regex matching a letter.
+    :return: dict mapping each font word to its translation.
+    """
+    letters = list(letters) + list(ascii_letters)
+    index = {}
+    for prefix in fonts:
+        for letter in letters:
+            T = prefix + letter
+            if T in index or letter_matcher.split(T)[-1] != '':
+                continue
+            last = letter_matcher.findall(T)[-1]
+            font = fonts.get(T[:-len(last)])
+            if font:
+                # Translate the letter as a Node would.
+                entry = keywords.get(last)
+                if entry is None:
+                    s = last
+                elif entry[0] == HTML or entry[0] >= BUILTIN:
+                    s = entry[1]
+                else:
+                    s = bracket_node(*entry, TokenStream([])).build()
+                index[T] = '\\%s{%s}' % (font, s.strip())
+    return index
 
 class TokenStream:
 
-    def __init__(self,token_list):
+    def __init__(self, token_list, tables=None):
+        """
+        :param token_list: the list of tokens.
+        :param tables: the Tables by which to translate the tokens (see
+            `get_tables`), or None for those of `config`.
+        """
+        self.tables = tables
         self.token_list = token_list
         self.k = 0
         self.N = len(token_list)
@@ -476,12 +1049,26 @@ class TokenStream:
         """
         Return the next token, or None if none remain.
         """
-        if self.k < self.N:
-            T = self.token_list[self.k]
-            self.k += 1
-            return T
-        else:
-            return None
+        k = self.k
+        if k < self.N:
+            self.k = k + 1
+            return self.token_list[k]
+        return None
+
+    def offset(self, i):
+        """
+        :return: the offset in the snippet at which token i begins. (This is
+            computed by adding up the lengths of the tokens before it, which is
+            fine for reporting errors.)
+        """
+        return sum(map(len, self.token_list[:i]))
+
+    def span(self, i):
+        """
+        :return: pair (start, end), the offsets of token i in the snippet.
+        """
+        a = self.offset(i)
+        return a, a + len(self.token_list[i])
 
     def showRest(self):
         """
@@ -505,19 +1092,70 @@ class TokenStream:
         return self.token_list[a:b]
 
 
+##########
+# Tokenizing
 
-TOKEN_RE = re.compile(
-    (r'\\{' +
-     r'|\\[^{\s]*' +
-     r'|[A-Za-z](?:[A-Za-z0-9+\-,]|\^\^\^|\^\^|__)*[A-Za-z0-9]' +
-     r'|#\d+' +
-    "|"+"|".join(html_exceptions) +
-     r'|\S' +
-     r'|\s+')
+def trie_pattern(words):
+    """
+    Make a regular expression matching any of the given words, factored by
+    common prefixes, so that no character is tested against more than one
+    branch at a time.
+
+    :return: the pattern, or '' if there are no words.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for c in w:
+            node = node.setdefault(c, {})
+        node[''] = {}
+
+    def pattern(node):
+        alts = [re.escape(c) + pattern(child) for c, child in sorted(node.items()) if c]
+        if not alts:
+            return ''
+        p = alts[0] if len(alts) == 1 else '(?:%s)' % '|'.join(alts)
+        if '' in node:
+            p = '(?:%s)?' % p
+        return p
+
+    return pattern(trie)
+
+# Names, like `zetauu2r-1`: a letter, then letters, digits, the signs + - and ,
+# and the subscript and superscript marks ^^, ^^^ and __, ending with a letter
+# or digit. A run of carets is read as a single mark (any run of two or more can
+# be split into ^^ and ^^^), and a run of underscores must be of even length.
+# Each mark is read to the end of its run, so the only backtracking is back to
+# the last letter or digit, and no string takes more than linear time.
+NAME_RE_COMPONENT = (
+    r'[A-Za-z][A-Za-z0-9]*'
+    r'(?:(?:[+\-,]|\^\^+(?!\^)|(?:__)+(?!_))+[A-Za-z0-9]+)*'
 )
 
-def tokenize(text):
-    return re.findall(TOKEN_RE, text)
+def build_token_re(html):
+    """
+    Build the tokenizer's regular expression.
+
+    :param html: the HTML codes which are to be single tokens.
+    """
+    branches = [
+        r'\\{',
+        r'\\[^{\s]*',
+        NAME_RE_COMPONENT,
+        r'#\d+',
+        trie_pattern(html),
+        r'\S',
+        r'\s+',
+    ]
+    return re.compile('|'.join(b for b in branches if b))
+
+def tokenize(text, dialect=None):
+    """
+    :return: list of the tokens of the text, including runs of whitespace.
+    """
+    return get_tables(dialect).token_re.findall(text)
+
+space_re = re.compile(r'\s+(?![a-zA-Z])')
 
 def compress(text):
     """
@@ -525,15 +1163,38 @@ def compress(text):
     :param text: The text to be compressed.
     :return: The compressed text.
     """
-    return re.sub(r'\s+(?![a-zA-Z])', '', text)
-
-def translate_snippet(text, keychar=None):
+    prof = profiling.active
+    if prof is None:
+        return space_re.sub('', text)
+    t0 = profiling.clock()
+    out = space_re.sub('', text)
+    prof.stage('compress', profiling.clock() - t0)
+    return out
+
+def compress_many(texts):
+    """
+    Compress a list of texts, in a single pass if possible.
+    :param texts: The texts to be compressed.
+    :return: list of the compressed texts.
+    """
+    joined = '\0'.join(texts)
+    if joined.count('\0') == len(texts) - 1:
+        # No text contains the separator, which is not whitespace, so it
+        # bounds the runs of whitespace just as the ends of the texts do.
+        return compress(joined).split('\0')
+    return [compress(t) for t in texts]
+
+def translate_snippet(text, keychar=None, emitter=None, dialect=None):
     """
     Translate a single "snippet" (i.e. the contents of a TeX math mode) from
     VerTeX into plain TeX.
 
     If you have not yet checked keychars, you should pass keychar.
 
+    Results are cached in `snippet_cache` (or that of the dialect), which is
+    cleared automatically whenever the keyword tables are changed, and on disk,
+    if `use_disk_cache` has been called.
+
     :param text: The text of the snippet.
     :param keychar: Must be either None or a single character (but not $ or \).
                     Pass None if you want VerTeX to be applied directly to `text`,
@@ -541,25 +1202,210 @@ def translate_snippet(text, keychar=None):
                     Otherwise VerTeX is applied only when `text` begins or ends
                     with the keychar (or both), and after stripping any
                     occurrences of it.
+    :param emitter: An emitter (see `tree.Emitter`), to translate into something
+                    other than TeX. The snippet is then parsed into a tree
+                    (cached in `tree_cache`), which the emitter turns into the
+                    output. Its output is not cached.
+    :param dialect: A `dialect.Dialect`, to translate by its keyword tables
+                    instead of those of `config`.
     :return: The translated text.
     """
     if not text:
         return ''
+    if emitter is not None:
+        return _emit_snippet(text, keychar, emitter, dialect)
+
+    tables = get_tables(dialect)
+    key = (text, keychar)
+    out = tables.snippet_cache.get(key, _MISSING)
+    if out is _MISSING:
+        prof = profiling.active
+        if prof is not None:
+            t0 = profiling.clock()
+        try:
+            if disk_cache is None:
+                out = _translate_snippet(text, keychar, tables)
+            else:
+                out = _disk_translate_snippet(text, keychar, tables)
+        finally:
+            if prof is not None:
+                prof.stage('translate_snippet', profiling.clock() - t0)
+        tables.snippet_cache.put(key, out)
+    return out
+
+def _translate_snippet(text, keychar, tables):
+    if keychar is None:
+        prof = profiling.active
+        if prof is None:
+            return compress(Node(TokenStream(tables.token_re.findall(text), tables)).xlat())
+        t0 = profiling.clock()
+        tokens = tables.token_re.findall(text)
+        t1 = profiling.clock()
+        prof.stage('tokenize', t1 - t0)
+        try:
+            out = Node(TokenStream(tokens, tables)).xlat()
+        finally:
+            prof.stage('xlat', profiling.clock() - t1)
+        return compress(out)
+    elif text.startswith(keychar) or text.endswith(keychar):
+        stripped = text.strip(keychar)
+        if not stripped:
+            return ''
+        try:
+            return _translate_snippet(stripped, None, tables)
+        except VerTeXError as ve:
+            # Offsets are to be in the snippet as given.
+            ve.shift_span(len(text) - len(text.lstrip(keychar)))
+            raise ve
+    else:
+        return text
 
+def _disk_translate_snippet(text, keychar, tables):
+    if keychar is not None and not (text.startswith(keychar) or text.endswith(keychar)):
+        # Passed through as is: not worth a trip to the disk.
+        return text
+    prof = profiling.active
+    if prof is not None:
+        t0 = profiling.clock()
+    dkey = disk_key(text, keychar, tables.dialect)
+    out = disk_cache.get(dkey)
+    if prof is not None:
+        prof.stage('disk_cache', profiling.clock() - t0)
+    if out is None:
+        out = _translate_snippet(text, keychar, tables)
+        if prof is not None:
+            t0 = profiling.clock()
+        disk_cache.put(dkey, out)
+        if prof is not None:
+            prof.stage('disk_cache', profiling.clock() - t0)
+    return out
+
+def _emit_snippet(text, keychar, emitter, dialect):
+    from vertex2tex.tree import parse_snippet
     if keychar is None:
-        tokens = tokenize(text)
-        ts = TokenStream(tokens)
-        root = Node(ts)
-        out = root.xlat()
-        out = compress(out)
-        return out
+        return emitter.emit(parse_snippet(text, dialect))
     elif text.startswith(keychar) or text.endswith(keychar):
-        text = text.strip(keychar)
-        return translate_snippet(text, keychar=None)
+        stripped = text.strip(keychar)
+        if not stripped:
+            return ''
+        try:
+            return emitter.emit(parse_snippet(stripped, dialect))
+        except VerTeXError as ve:
+            ve.shift_span(len(text) - len(text.lstrip(keychar)))
+            raise ve
     else:
         return text
 
 
+def translate_snippets(snippets, keychar=None, jobs=1, chunk_size=5000, dialect=None):
+    """
+    Translate many snippets, as `translate_snippet` would translate each one.
+
+    Each distinct snippet is translated only once. Those not found in the
+    caches are translated together, and may be spread over worker processes.
+
+    :param snippets: iterable of snippets.
+    :param keychar: As for `translate_snippet`.
+    :param jobs: number of worker processes. None means one per CPU; 1 means
+                 translate everything in this process.
+    :param chunk_size: number of snippets given to a worker at a time.
+    :param dialect: As for `translate_snippet`.
+    :return: list of the translations, in order.
+    :raises VerTeXError: for the first snippet that cannot be translated.
+    """
+    tables = get_tables(dialect)
+    snippet_cache = tables.snippet_cache
+    if not isinstance(snippets, list):
+        snippets = list(snippets)
+    done = {}
+    # Snippets still to be translated, and what is to be translated of each.
+    texts, bodies = [], []
+    for text in dict.fromkeys(snippets):
+        out = snippet_cache.get((text, keychar), _MISSING) if text else ''
+        if out is not _MISSING:
+            done[text] = out
+        elif keychar is None:
+            texts.append(text)
+            bodies.append(text)
+        elif text.startswith(keychar) or text.endswith(keychar):
+            stripped = text.strip(keychar)
+            if stripped:
+                texts.append(text)
+                bodies.append(stripped)
+            else:
+                done[text] = ''
+        else:
+            done[text] = text
+
+    if disk_cache is not None and texts:
+        keys = {text: disk_key(text, keychar, dialect) for text in texts}
+        found = disk_cache.get_many(keys.values())
+        if found:
+            misses = [(t, b) for t, b in zip(texts, bodies) if keys[t] not in found]
+            for text in texts:
+                out = found.get(keys[text])
+                if out is not None:
+                    done[text] = out
+                    snippet_cache.put((text, keychar), out)
+            texts, bodies = [t for t, b in misses], [b for t, b in misses]
+
+    if jobs == 1 or len(bodies) <= chunk_size:
+        results = _translate_bodies(bodies, dialect)
+    else:
+        from functools import partial
+        from vertex2tex.batch import ordered_map
+        chunks = [bodies[i:i + chunk_size] for i in range(0, len(bodies), chunk_size)]
+        work = partial(_translate_bodies, dialect=dialect)
+        results = chain.from_iterable(ordered_map(work, chunks, jobs=jobs))
+
+    new = []
+    for text, out in zip(texts, results):
+        if isinstance(out, VerTeXError):
+            if keychar is not None:
+                out.shift_span(len(text) - len(text.lstrip(keychar)))
+            raise out
+        done[text] = out
+        new.append((text, out))
+    # Only so many of them would stay in memory.
+    for text, out in new[-snippet_cache.maxsize:] if snippet_cache.maxsize > 0 else []:
+        snippet_cache.put((text, keychar), out)
+    if disk_cache is not None and new:
+        disk_cache.put_many([(disk_key(text, keychar, dialect), out) for text, out in new])
+    return [done[text] for text in snippets]
+
+def _translate_bodies(bodies, dialect=None):
+    """
+    Translate snippets with no keychar, compressing all of the outputs at once.
+
+    :return: list of the translations. If a snippet cannot be translated, the
+             list ends with its VerTeXError, in place of its translation.
+    """
+    tables = get_tables(dialect)
+    findall = tables.token_re.findall
+    prof = profiling.active
+    raw = []
+    err = None
+    for body in bodies:
+        try:
+            if prof is None:
+                raw.append(Node(TokenStream(findall(body), tables)).xlat())
+            else:
+                t0 = profiling.clock()
+                tokens = findall(body)
+                t1 = profiling.clock()
+                prof.stage('tokenize', t1 - t0)
+                try:
+                    raw.append(Node(TokenStream(tokens, tables)).xlat())
+                finally:
+                    prof.stage('xlat', profiling.clock() - t1)
+        except VerTeXError as ve:
+            err = ve
+            break
+    out = compress_many(raw)
+    if err is not None:
+        out.append(err)
+    return out
+
 def cond_translate_snippet(text):
     """
     Convenience function to translate math mode contents conditionally, i.e.